@@ -1,16 +1,22 @@
-from langchain_openai import ChatOpenAI
+import json
+import time
+from functools import cache
 from langchain_core.messages import SystemMessage
-from app.core.config import OPENROUTER_API_KEY
+from app.agents.model_router import account_phase, phase_model, phase_tools, tier_stats
+from app.core.llm import build_chat_model
+from app.core.resilience import is_fallback, llm_guard
 from app.workflows.account_state import AccountState
 from app.tools.account import submit_account_opening, transfer_back_to_loan_assistant
 
-llm = ChatOpenAI(
-    model="gpt-4o-mini",
-    api_key=OPENROUTER_API_KEY,
-    base_url="https://openrouter.ai/api/v1",
-).bind_tools([submit_account_opening, transfer_back_to_loan_assistant])
+ACCOUNT_TOOLS = [submit_account_opening, transfer_back_to_loan_assistant]
 
-def account_assistant(state: AccountState):
+@cache
+def get_llm(phase: str = "default"):
+    tools = phase_tools(phase, ACCOUNT_TOOLS)
+    tier_stats.register_tools("account", phase, tools)
+    return build_chat_model(model=phase_model(phase), max_retries=llm_guard.client_retries).bind_tools(tools)
+
+async def account_assistant(state: AccountState):
     system = SystemMessage(content="""
 You are a Bank Account Opening Assistant.
 Your goal is to collect details and open a bank account.
@@ -20,4 +26,13 @@ IMPORTANT:
 2. If the user wants to CANCEL or go back to the loan process, use the `transfer_back_to_loan_assistant` tool.
 3. Once the account is successfully created using `submit_account_opening`, inform the user.
 """)
-    return {"messages": [llm.invoke([system] + state["messages"])]}
\ No newline at end of file
+    known = SystemMessage(content=(
+        "Details already collected (do not ask for these again): "
+        + json.dumps(state.get("collected_data") or {}, ensure_ascii=False)
+    ))
+    phase = account_phase(state)
+    started = time.perf_counter()
+    response = await llm_guard.ainvoke(get_llm(phase), [system, known] + state["messages"], phase_model(phase))
+    if not is_fallback(response):
+        tier_stats.record(phase, time.perf_counter() - started, response)
+    return {"messages": [response]}
\ No newline at end of file
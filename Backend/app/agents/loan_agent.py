@@ -1,117 +1,66 @@
-from langchain_openai import ChatOpenAI
-from langchain_core.messages import SystemMessage
-from app.core.config import OPENROUTER_API_KEY
+import time
+from functools import cache
+from langchain_core.messages import AIMessage, HumanMessage
+from app.core.config import LLM_TIERING, RESPONSE_CACHE_ENABLED
+from app.core.llm import build_chat_model
+from app.core.resilience import is_fallback, llm_guard
+from app.core.response_cache import response_cache
+from app.agents.model_router import LOAN_PHASES, loan_phase, phase_model, phase_tools, tier_stats
+from app.agents.prompts import LOAN_SYSTEM_MESSAGE, PromptStats, session_state_message
 from app.workflows.loan_state import LoanState
+from app.workflows.prefetch import prefetcher
 from app.tools import LOAN_TOOLS
 
-llm = ChatOpenAI(
-    model="gpt-4o-mini",
-    temperature=0.7,
-    api_key=OPENROUTER_API_KEY,
-    base_url="https://openrouter.ai/api/v1",
-).bind_tools(LOAN_TOOLS)
+@cache
+def get_llm(phase: str = "default"):
+    """One client per phase: the phase's model tier with only the tools it needs."""
+    tools = phase_tools(phase, LOAN_TOOLS)
+    tier_stats.register_tools("loan", phase, tools)
+    return build_chat_model(
+        model=phase_model(phase), temperature=0.7, max_retries=llm_guard.client_retries,
+    ).bind_tools(tools)
 
 
-def loan_assistant(state: LoanState):
-    """
-    Assistant to handle new loan application and refinance
-    """
-
-    is_verified = state.get("is_verified", False)
-    account = state.get("user_account", {})
-    reqs = state.get("required_fields", [])
-    account_exists = state.get("account_exists")
-
-    # Create a string representation of known data to make it clear for the LLM
-    known_info_str = ", ".join([f"{k}: {v}" for k, v in account.items()]) if account else "None"
-
-    # 🔴 FULL ORIGINAL SYSTEM PROMPT + SMALL EXTENSIONS
-    system_content = f"""
-You are a Banking Assistant.
-
-=====================================
-PHASE 1: VERIFICATION
-=====================================
-- Status: {'Verified' if is_verified else 'WAITING'}
-- If not verified:
-  - Ask for mobile number
-  - Send OTP (four digit)
-  - Verify OTP
-  - Show account info if found: {account}
-- IMPORTANT:
-  - You MUST get the user to confirm
-    "Yes, this is me"
-    before moving to loans
-
-=====================================
-ACCOUNT EXISTENCE CHECK
-=====================================
-- Account Exists: {account_exists}
-- If Account Exists is False:
-  - Inform the user that no bank account exists
-  - Ask for consent to open a new bank account
-  - Say exactly: "I will now transfer you to our Account Opening specialist."
-  - Do NOT ask any more questions.
-  - Once account is opened, resume loan flow automatically
-
-=====================================
-PHASE 2: LOANS
-=====================================
-- Start ONLY if:
-  - Verified is True
-  - Account Exists is True
+# Each phase's request starts with its own tool subset on its own model: one cacheable prefix per phase
+loan_prompt_stats = PromptStats(LOAN_SYSTEM_MESSAGE.content, phases={
+    phase: (phase_model(phase), phase_tools(phase, LOAN_TOOLS))
+    for phase in (LOAN_PHASES if LLM_TIERING else ("default",))
+})
 
-- User Account Data (Already Known):
-  {known_info_str}
 
-- Ask user whether they want:
-  - New Loan
-  - Refinance Loan
-  - Or to know about their existing loan applications(if any)
-
-- Call `get_loan_requirements`
-- Required info for this loan: {reqs}
-
-=====================================
-EMPLOYMENT RULES
-=====================================
-- Ask for employment_type if not known
-- employment_type must be ONE of:
-  - Salaried
-  - Self Employed
-  - Business Owner
-  - Other
-
-=====================================
-SELF-EMPLOYED / BUSINESS OWNER HANDLING
-=====================================
-- If employment_type is Self Employed OR Business Owner:
-  - DO NOT ask for employer name
-  - DO NOT auto-finalize eligibility
-  - Inform user that a local bank agent will contact them
-  - Use bank agent info derived from tool `verify_us_zip_code`
-  - Clearly state income source verification is required
-
-=====================================
-DATA COLLECTION STRATEGY
-=====================================
-1. Look at "User Account Data"
-2. Do NOT ask for fields already present
-3. Ask ONLY missing required fields
-4. You MAY suggest document upload
+def build_loan_prompt(state: LoanState):
+    """
+    Static system prefix + history + trailing session state block.
+    Keeping the volatile values last lets the provider cache everything before them.
+    """
+    return [LOAN_SYSTEM_MESSAGE] + state["messages"] + [session_state_message(state)]
 
-=====================================
-ELIGIBILITY RULES
-=====================================
-- Once all required fields are available:
-  - Call `check_loan_eligibility`
-- If eligible:
-  - Ask confirmation for the collected data before calling `submit_loan_application`
-- If requested_amount > Maximum Eligible Loan Amount:
-  - Ask user to reduce the amount below maximum
-- If employment_type is Self Employed:
-  - Clearly explain next steps and agent involvement
-"""
 
-    prompt = [SystemMessage(content=system_content)] + state["messages"]
-    return {"messages": [llm.invoke(prompt)]}
+async def loan_assistant(state: LoanState):
+    """
+    Assistant to handle new loan application and refinance
+    """
+    # Only the first LLM call of a turn answers the user's question directly
+    last = state["messages"][-1]
+    question = last.content if isinstance(last, HumanMessage) and isinstance(last.content, str) else None
+
+    if RESPONSE_CACHE_ENABLED and question:
+        cached = response_cache.get(state, question)
+        if cached is not None:
+            return {"messages": [AIMessage(content=cached)]}
+
+    if question:
+        # Account / ZIP lookups for numbers in the message run while the LLM decides
+        prefetcher.start(state["messages"])
+
+    phase = loan_phase(state)
+    started = time.perf_counter()
+    response = await llm_guard.ainvoke(get_llm(phase), build_loan_prompt(state), phase_model(phase))
+    if is_fallback(response):
+        return {"messages": [response]}
+    tier_stats.record(phase, time.perf_counter() - started, response)
+    loan_prompt_stats.record(response, phase)
+
+    if RESPONSE_CACHE_ENABLED and question and not response.tool_calls and isinstance(response.content, str):
+        response_cache.put(state, question, response.content)
+    return {"messages": [response]}
@@ -0,0 +1,185 @@
+"""
+Phase-aware model tiers for the loan and account agents.
+
+Each LLM call is routed by the conversation phase read from LoanState:
+
+  verification    not verified yet (OTP, account confirmation)       fast
+  collection      verified, gathering loan type / required fields     fast
+  eligibility     a check_loan_eligibility result is waiting to be
+                  explained or submitted (eligibility_pending)        strong
+  self_employed   employment_type is Self Employed / Business Owner:
+                  agent handoff                                       strong
+  account_opening the account sub-graph                               fast
+
+Every phase binds only the tools it can use, so the tool schemas sent with
+each request stay small. The tool nodes still hold the full tool sets, so a
+call outside the phase's subset (e.g. from the response of a previous phase)
+still runs.
+
+Latency, tokens and cost (LLM_PRICE_FAST / LLM_PRICE_STRONG, USD per 1M
+input,output tokens) per tier and phase: GET /models/stats and GET /metrics.
+"""
+import json
+import re
+import threading
+from collections import deque
+
+from langchain_core.utils.function_calling import convert_to_openai_tool
+
+from app.agents.prompts import count_tokens
+from app.core.config import LLM_MODEL_FAST, LLM_MODEL_STRONG, LLM_PRICE_FAST, LLM_PRICE_STRONG, LLM_TIERING
+from app.core.metrics import Counter, Histogram, registry
+
+llm_tier_duration = registry.register(Histogram(
+    "llm_tier_seconds", "LLM call latency by model tier and conversation phase", ("tier", "phase")))
+llm_tier_tokens = registry.register(Counter(
+    "llm_tier_tokens_total", "LLM tokens by model tier", ("tier", "kind")))
+llm_tier_cost = registry.register(Counter(
+    "llm_tier_cost_usd_total", "Estimated LLM cost in USD by model tier", ("tier",)))
+
+
+def parse_price(value: str) -> tuple[float, float]:
+    """"input,output" USD per 1M tokens."""
+    prices = [float(p) for p in value.split(",")]
+    return prices[0], prices[-1]
+
+
+TIERS = {
+    "fast": {"model": LLM_MODEL_FAST, "price": parse_price(LLM_PRICE_FAST)},
+    "strong": {"model": LLM_MODEL_STRONG, "price": parse_price(LLM_PRICE_STRONG)},
+}
+
+# phase -> (tier, tool names); None binds the agent's full tool set
+PHASES = {
+    "default": ("fast", None),
+    "verification": ("fast", ("send_otp", "verify_otp_and_fetch_account")),
+    "collection": ("fast", (
+        "get_loan_requirements", "check_loan_eligibility", "verify_us_zip_code", "get_agent_info",
+        "get_user_loan_requests", "get_loan_details",
+    )),
+    "eligibility": ("strong", (
+        "check_loan_eligibility", "submit_loan_application", "get_loan_requirements",
+        "get_user_loan_requests", "get_loan_details",
+    )),
+    "self_employed": ("strong", (
+        "verify_us_zip_code", "get_agent_info", "get_loan_requirements", "check_loan_eligibility",
+    )),
+    "account_opening": ("fast", None),
+}
+
+LOAN_PHASES = ("default", "verification", "collection", "eligibility", "self_employed")
+
+SELF_EMPLOYED_RE = re.compile(r"\b(self[\s-]?employed|business\s+owner)\b", re.IGNORECASE)
+
+
+def loan_phase(state) -> str:
+    if not LLM_TIERING:
+        return "default"
+    if not state.get("is_verified") or not state.get("account_exists") or state.get("active_agent") == "account":
+        return "verification"
+    # The answered employment question (fast_path) or the account record; never free text
+    employment_type = state.get("employment_type") or (state.get("user_account") or {}).get("employment_type")
+    if SELF_EMPLOYED_RE.search(str(employment_type or "")):
+        return "self_employed"
+    return "eligibility" if state.get("eligibility_pending") else "collection"
+
+
+def account_phase(state) -> str:
+    return "account_opening" if LLM_TIERING else "default"
+
+
+def phase_tier(phase: str) -> str:
+    return PHASES[phase][0]
+
+
+def phase_model(phase: str) -> str:
+    return TIERS[phase_tier(phase)]["model"]
+
+
+def phase_tools(phase: str, tools) -> list:
+    names = PHASES[phase][1]
+    return list(tools) if names is None else [t for t in tools if t.name in names]
+
+
+class TierStats:
+    """Per-tier / per-phase call count, latency, tokens and cost."""
+
+    def __init__(self, samples: int = 1000):
+        self._lock = threading.Lock()
+        self.samples = samples
+        self.tiers = {}
+        self.phases = {}
+        self.schema_tokens = {}     # (agent, phase) -> size of the tool schemas bound for that phase
+
+    def _entry(self, table: dict, key: str) -> dict:
+        entry = table.get(key)
+        if entry is None:
+            entry = table[key] = {
+                "calls": 0, "input_tokens": 0, "output_tokens": 0, "cost_usd": 0.0,
+                "times": deque(maxlen=self.samples),
+            }
+        return entry
+
+    def record(self, phase: str, seconds: float, response):
+        tier = phase_tier(phase)
+        usage = getattr(response, "usage_metadata", None) or {}
+        input_tokens, output_tokens = usage.get("input_tokens", 0), usage.get("output_tokens", 0)
+        price_in, price_out = TIERS[tier]["price"]
+        cost = (input_tokens * price_in + output_tokens * price_out) / 1_000_000
+
+        with self._lock:
+            for entry in (self._entry(self.tiers, tier), self._entry(self.phases, phase)):
+                entry["calls"] += 1
+                entry["input_tokens"] += input_tokens
+                entry["output_tokens"] += output_tokens
+                entry["cost_usd"] += cost
+                entry["times"].append(seconds)
+
+        llm_tier_duration.observe(seconds, tier, phase)
+        llm_tier_tokens.inc(tier, "input", amount=input_tokens)
+        llm_tier_tokens.inc(tier, "output", amount=output_tokens)
+        llm_tier_cost.inc(tier, amount=cost)
+
+    def register_tools(self, agent: str, phase: str, tools):
+        """
+        Called when a phase's client is built (app warm-up, in a worker thread):
+        tokenizing blocks, so it happens here once and stats() only reads the result.
+        """
+        schema = json.dumps([convert_to_openai_tool(t) for t in tools]) if tools else ""
+        entry = {"tools": len(tools), "schema_tokens": count_tokens(schema)}
+        with self._lock:
+            self.schema_tokens[(agent, phase)] = entry
+
+    def stats(self) -> dict:
+        def summary(entry):
+            times = sorted(entry["times"])
+
+            def ms(q):
+                return round(times[min(len(times) - 1, int(len(times) * q))] * 1000, 2) if times else 0.0
+
+            return {
+                "calls": entry["calls"],
+                "latency_ms_p50": ms(0.5),
+                "latency_ms_p95": ms(0.95),
+                "input_tokens": entry["input_tokens"],
+                "output_tokens": entry["output_tokens"],
+                "cost_usd": round(entry["cost_usd"], 6),
+                "cost_usd_per_call": round(entry["cost_usd"] / entry["calls"], 6) if entry["calls"] else 0.0,
+            }
+
+        with self._lock:
+            return {
+                "tiering": LLM_TIERING,
+                "tiers": {
+                    tier: {"model": TIERS[tier]["model"], "price_per_mtok": TIERS[tier]["price"],
+                           **summary(self._entry(self.tiers, tier))}
+                    for tier in TIERS
+                },
+                "phases": {phase: {"tier": phase_tier(phase), **summary(entry)}
+                           for phase, entry in self.phases.items()},
+                "bound_tools": {f"{agent}/{phase}": dict(entry)
+                                for (agent, phase), entry in self.schema_tokens.items()},
+            }
+
+
+tier_stats = TierStats()
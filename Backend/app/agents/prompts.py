@@ -0,0 +1,206 @@
+import json
+import threading
+from langchain_core.messages import SystemMessage
+from langchain_core.utils.function_calling import convert_to_openai_tool
+from app.workflows.history import estimate_tokens
+
+# Provider-side prompt caching matches on an exact prefix (OpenAI: >= 1024 tokens,
+# in 128 token steps). Everything here must stay byte-stable between calls, so the
+# per-session values live in SESSION STATE, which is sent after the conversation.
+LOAN_SYSTEM_PREFIX = """
+You are a Banking Assistant.
+The current values for this session are in the SESSION STATE block at the end of the conversation.
+
+=====================================
+PHASE 1: VERIFICATION
+=====================================
+- Status: see `verified` in SESSION STATE
+- If not verified:
+  - Ask for mobile number
+  - Send OTP (four digit)
+  - Verify OTP
+  - Show account info if found (`account` in SESSION STATE)
+- IMPORTANT:
+  - You MUST get the user to confirm
+    "Yes, this is me"
+    before moving to loans
+
+=====================================
+ACCOUNT EXISTENCE CHECK
+=====================================
+- Account Exists: see `account_exists` in SESSION STATE
+- If Account Exists is False:
+  - Inform the user that no bank account exists
+  - Ask for consent to open a new bank account
+  - Say exactly: "I will now transfer you to our Account Opening specialist."
+  - Do NOT ask any more questions.
+  - Once account is opened, resume loan flow automatically
+
+=====================================
+PHASE 2: LOANS
+=====================================
+- Start ONLY if:
+  - Verified is True
+  - Account Exists is True
+
+- User Account Data (Already Known): `account` in SESSION STATE
+
+- Ask user whether they want:
+  - New Loan
+  - Refinance Loan
+  - Or to know about their existing loan applications(if any)
+
+- Call `get_loan_requirements`
+- Required info for this loan: `required_fields` in SESSION STATE
+
+=====================================
+EMPLOYMENT RULES
+=====================================
+- Ask for employment_type if not known
+- employment_type must be ONE of:
+  - Salaried
+  - Self Employed
+  - Business Owner
+  - Other
+
+=====================================
+SELF-EMPLOYED / BUSINESS OWNER HANDLING
+=====================================
+- If employment_type is Self Employed OR Business Owner:
+  - DO NOT ask for employer name
+  - DO NOT auto-finalize eligibility
+  - Inform user that a local bank agent will contact them
+  - Use bank agent info derived from tool `verify_us_zip_code`
+  - Clearly state income source verification is required
+
+=====================================
+DATA COLLECTION STRATEGY
+=====================================
+1. Look at "User Account Data"
+2. Do NOT ask for fields already present
+3. Ask ONLY missing required fields
+4. You MAY suggest document upload
+
+=====================================
+ELIGIBILITY RULES
+=====================================
+- Once all required fields are available:
+  - Call `check_loan_eligibility`
+- If eligible:
+  - Ask confirmation for the collected data before calling `submit_loan_application`
+- If requested_amount > Maximum Eligible Loan Amount:
+  - Ask user to reduce the amount below maximum
+- If employment_type is Self Employed:
+  - Clearly explain next steps and agent involvement
+"""
+
+LOAN_SYSTEM_MESSAGE = SystemMessage(content=LOAN_SYSTEM_PREFIX)
+
+# Precompiled trailing block with the volatile per-session values
+render_state = """SESSION STATE
+verified: {verified}
+account_exists: {account_exists}
+account: {account}
+required_fields: {required_fields}{summary}""".format
+
+SUMMARY_SECTION = "\nearlier_conversation:\n"
+
+
+def session_state_message(state) -> SystemMessage:
+    account = state.get("user_account") or {}
+    summary = state.get("history_summary")
+    return SystemMessage(content=render_state(
+        verified="True" if state.get("is_verified") else "False (WAITING)",
+        account_exists=state.get("account_exists"),
+        account="; ".join(f"{k}={v}" for k, v in account.items()) if account else "None",
+        required_fields=", ".join(state.get("required_fields") or []) or "None",
+        summary=SUMMARY_SECTION + summary if summary else "",
+    ))
+
+
+def count_tokens(text: str) -> int:
+    """Exact count with tiktoken when its encoding is available locally, estimate otherwise."""
+    try:
+        import tiktoken
+        return len(tiktoken.get_encoding("o200k_base").encode(text))
+    except Exception:
+        return estimate_tokens(text)
+
+
+class PromptStats:
+    """
+    Per-call token accounting from the provider's usage metadata.
+    The cacheable prefix is the tool schemas followed by the static system prompt.
+    With model tiers each phase sends its own tool subset to its own model, and
+    providers cache prefixes per model, so prefixes and cache hits are tracked
+    per phase: calls of different phases never share a cache entry.
+    """
+
+    def __init__(self, prefix: str, tools=(), phases=None):
+        self.prefix = prefix
+        # phase -> (model, tools); one unnamed prefix when calls aren't split
+        self.phases = phases or {"default": (None, tools)}
+        self._prefixes = {}
+        self._lock = threading.Lock()
+        self.counts = {phase: {"calls": 0, "input_tokens": 0, "output_tokens": 0, "cached_tokens": 0}
+                       for phase in self.phases}
+        self.last_call = {}
+
+    def record(self, response, phase: str = "default"):
+        usage = getattr(response, "usage_metadata", None) or {}
+        cached = (usage.get("input_token_details") or {}).get("cache_read", 0) or 0
+        with self._lock:
+            counts = self.counts[phase]
+            counts["calls"] += 1
+            counts["input_tokens"] += usage.get("input_tokens", 0)
+            counts["output_tokens"] += usage.get("output_tokens", 0)
+            counts["cached_tokens"] += cached
+            self.last_call = {
+                "phase": phase,
+                "input_tokens": usage.get("input_tokens", 0),
+                "output_tokens": usage.get("output_tokens", 0),
+                "cached_tokens": cached,
+            }
+
+    def warm_up(self):
+        """
+        Tokenizes every phase's prefix. Blocking (tiktoken may need to load its
+        encoding), so the app lifespan runs it in a worker thread before
+        readiness; stats() then only reads the cached counts.
+        """
+        for phase in self.phases:
+            self._prefix(phase)
+
+    def _prefix(self, phase: str) -> dict:
+        if phase not in self._prefixes:
+            model, tools = self.phases[phase]
+            tools_schema = json.dumps([convert_to_openai_tool(t) for t in tools])
+            tokens = count_tokens(tools_schema) + count_tokens(self.prefix)
+            self._prefixes[phase] = {
+                "model": model,
+                "tools": len(tools),
+                "prefix_chars": len(tools_schema) + len(self.prefix),
+                "prefix_tokens": tokens,
+                "cache_eligible_prefix_tokens": tokens // 128 * 128 if tokens >= 1024 else 0,
+            }
+        return self._prefixes[phase]
+
+    def stats(self) -> dict:
+        def ratio(counts):
+            return round(counts["cached_tokens"] / counts["input_tokens"], 4) if counts["input_tokens"] else 0.0
+
+        # Outside the lock: only counts (and blocks) for a phase warm_up() didn't cover
+        prefixes = {phase: self._prefix(phase) for phase in self.phases}
+        with self._lock:
+            phases = {phase: {**prefixes[phase], **counts, "cached_ratio": ratio(counts)}
+                      for phase, counts in self.counts.items()}
+            totals = {key: sum(counts[key] for counts in self.counts.values())
+                      for key in ("calls", "input_tokens", "output_tokens", "cached_tokens")}
+            return {
+                **totals,
+                "cached_ratio": ratio(totals),
+                # Distinct (model, tool set) prefixes the provider has to cache separately
+                "distinct_prefixes": len({(p["model"], p["prefix_chars"]) for p in phases.values()}),
+                "phases": phases,
+                "last_call": self.last_call,
+            }
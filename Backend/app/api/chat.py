@@ -1,39 +1,334 @@
+import asyncio
+import json
+import time
+from collections import deque
+from contextlib import asynccontextmanager
 from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
-from langchain_core.messages import HumanMessage
-from app.workflows.loan_graph import loan_graph
+from langchain_core.messages import AIMessage, HumanMessage
+from app.workflows.loan_graph import get_loan_graph
+from app.core.memory import checkpointer
+from app.workflows.fast_path import fast_path_stats
+from app.workflows.prefetch import prefetcher
+from app.agents.loan_agent import loan_prompt_stats
+from app.agents.model_router import tier_stats
+from app.core.response_cache import response_cache
+from app.core.metrics import Gauge, TurnMetrics, registry
+from app.core.resilience import llm_guard, start_turn
 
 router = APIRouter()
 
+# Human readable progress labels pushed to the client while a tool runs
+TOOL_PROGRESS = {
+    "send_otp": "Sending verification code…",
+    "verify_otp_and_fetch_account": "Verifying OTP…",
+    "get_loan_requirements": "Fetching loan requirements…",
+    "check_loan_eligibility": "Checking loan eligibility…",
+    "submit_loan_application": "Submitting loan application…",
+    "get_agent_info": "Finding your local bank agent…",
+    "verify_us_zip_code": "Verifying ZIP…",
+    "get_user_loan_requests": "Fetching your loan applications…",
+    "get_loan_details": "Fetching loan application details…",
+}
+
 class ChatInput(BaseModel):
     user_id: str
     text: str
 
-@router.post("/chat")
-async def chat(input: ChatInput):
-    config = {"configurable": {"thread_id": input.user_id}}
+async def session_exists(config: dict) -> bool:
+    return bool((await get_loan_graph().aget_state(config)).values)
 
-    # 1️⃣ Fetch existing state
-    existing_state = await loan_graph.aget_state(config)
+async def build_input_payload(texts: list[str], config: dict, seeded: bool | None = None) -> dict:
+    # 1️⃣ Fetch existing state (callers that already know, like a WebSocket, pass seeded)
+    if seeded is None:
+        seeded = await session_exists(config)
 
-    # 2️⃣ Always pass the new user message
+    # 2️⃣ Always pass the new user message(s)
     input_payload = {
-        "messages": [HumanMessage(content=input.text)]
+        "messages": [HumanMessage(content=text) for text in texts]
     }
 
     # 3️⃣ Initialize state ONLY for new sessions
-    if not existing_state.values:
+    if not seeded:
         input_payload.update({
             "is_verified": False,
             "account_exists": None,
             "user_account": {},
             "required_fields": [],
-            "active_agent": "loan" 
+            "active_agent": "loan"
         })
 
-    # 4️⃣ Invoke graph
-    result = await loan_graph.ainvoke(input_payload, config)
+    return input_payload
+
+class SessionQueue:
+    """
+    Per-thread work queue for chat turns.
+
+    Only one graph invocation runs per thread_id at a time. Messages that arrive
+    while a turn is running are buffered and the whole burst is sent as a single
+    invocation once the current turn finishes; every caller in the burst gets
+    that invocation's reply.
+    """
+
+    def __init__(self, wait_samples: int = 1000):
+        self.sessions = {}
+        self.locks = {}
+        # The loop only keeps weak references to tasks: hold the drains until they finish
+        self.tasks = set()
+        self.wait_times = deque(maxlen=wait_samples)
+        self.turns = 0
+        self.messages = 0
+        self.max_depth = 0
+
+    @asynccontextmanager
+    async def exclusive(self, thread_id: str):
+        """
+        Holds the session's turn lock; the lock is dropped once nobody uses it.
+        With SESSION_SHARED the session is also locked across workers for the turn.
+        """
+        entry = self.locks.get(thread_id)
+        if entry is None:
+            entry = self.locks[thread_id] = [asyncio.Lock(), 0]
+        entry[1] += 1
+        try:
+            async with entry[0], checkpointer.hold(thread_id):
+                yield
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0:
+                del self.locks[thread_id]
+
+    async def submit(self, thread_id: str, text: str) -> str:
+        future = asyncio.get_running_loop().create_future()
+        pending = self.sessions.get(thread_id)
+        if pending is None:
+            pending = self.sessions[thread_id] = []
+            task = asyncio.create_task(self._drain(thread_id))
+            self.tasks.add(task)
+            task.add_done_callback(self.tasks.discard)
+        pending.append((text, future, time.perf_counter()))
+        self.messages += 1
+        self.max_depth = max(self.max_depth, len(pending))
+        return await future
+
+    async def _drain(self, thread_id: str):
+        pending = self.sessions[thread_id]
+        try:
+            while pending:
+                batch = None
+                try:
+                    # Taking the lock can fail too (shared backend timeout / release error)
+                    async with self.exclusive(thread_id):
+                        batch = pending[:]
+                        del pending[:]
+                        started = time.perf_counter()
+                        self.wait_times.extend(started - enqueued for _, _, enqueued in batch)
+                        self.turns += 1
+                        response = await self._run_turn(thread_id, [text for text, _, _ in batch])
+                except Exception as e:
+                    if batch is None:
+                        batch = pending[:]
+                        del pending[:]
+                    for _, future, _ in batch:
+                        if not future.done():
+                            future.set_exception(e)
+                else:
+                    for _, future, _ in batch:
+                        if not future.done():
+                            future.set_result(response)
+        finally:
+            # Never leave the entry behind: later submits would queue behind a dead drain
+            del self.sessions[thread_id]
+            for _, future, _ in pending:
+                if not future.done():
+                    future.set_exception(RuntimeError("chat turn was cancelled"))
+
+    async def _run_turn(self, thread_id: str, texts: list[str]) -> str:
+        metrics = TurnMetrics()
+        config = {"configurable": {"thread_id": thread_id}, "callbacks": [metrics]}
+        input_payload = await build_input_payload(texts, config)
 
+        # 4️⃣ Invoke graph
+        start_turn()
+        try:
+            result = await get_loan_graph().ainvoke(input_payload, config)
+        except Exception:
+            metrics.finish("error")
+            raise
+        metrics.finish()
+        return result["messages"][-1].content
+
+    def stats(self) -> dict:
+        waits = sorted(self.wait_times)
+
+        def wait_ms(q):
+            return round(waits[min(len(waits) - 1, int(len(waits) * q))] * 1000, 2) if waits else 0.0
+
+        queued = sum(len(pending) for pending in self.sessions.values())
+        return {
+            "active_sessions": len(self.sessions),
+            "queue_depth": queued,
+            "max_queue_depth": self.max_depth,
+            "messages": self.messages,
+            "turns": self.turns,
+            "coalesced_messages": self.messages - queued - self.turns,
+            "wait_ms_avg": round(sum(waits) / len(waits) * 1000, 2) if waits else 0.0,
+            "wait_ms_p50": wait_ms(0.5),
+            "wait_ms_p95": wait_ms(0.95),
+            "wait_ms_max": wait_ms(1.0),
+        }
+
+session_queue = SessionQueue()
+
+registry.register(Gauge("chat_queue_depth", "Messages waiting for their session's turn",
+                        lambda: sum(len(p) for p in session_queue.sessions.values())))
+registry.register(Gauge("chat_active_sessions", "Sessions with a turn running or queued",
+                        lambda: len(session_queue.sessions)))
+
+@router.post("/chat")
+async def chat(input: ChatInput):
     return {
-        "response": result["messages"][-1].content
+        "response": await session_queue.submit(input.user_id, input.text)
     }
+
+async def stream_turn(input: ChatInput, seeded: bool | None = None):
+    """
+    Drives one graph turn and yields (event, data) pairs:
+      - token:    assistant text deltas as they arrive from the LLM (the whole
+                  reply at once when it wasn't streamed: fast path, cache,
+                  fallback, or a hedged duplicate call that won)
+      - reset:    the tokens streamed for the current reply are superseded (its
+                  call was cancelled or timed out); the final reply follows
+      - progress: a tool started / finished
+      - done:     the final assistant message (same as /chat response)
+      - error:    the turn failed
+    """
+    config = {"configurable": {"thread_id": input.user_id}}
+
+    # Streaming turns are serialized with queued /chat turns of the same session
+    async with session_queue.exclusive(input.user_id):
+        async for item in _stream_turn(input, config, seeded):
+            yield item
+
+async def _stream_turn(input: ChatInput, config: dict, seeded: bool | None = None):
+    input_payload = await build_input_payload([input.text], config, seeded)
+    metrics = TurnMetrics()
+    config = {**config, "callbacks": [metrics]}
+    final_messages = None
+    streamed = set()        # ids of the messages whose text went out as tokens
+    start_turn()
+
+    try:
+        # astream instead of astream_events: LLM tokens ("messages"), tool progress
+        # reported by the tool executor ("custom") and the state ("values", for the
+        # final reply), without a callback event for every runnable in the graph
+        async for namespace, mode, chunk in get_loan_graph().astream(
+            input_payload, config, stream_mode=["messages", "custom", "values"], subgraphs=True
+        ):
+            if mode == "messages":
+                message, metadata = chunk
+                # Tool-call chunks carry no text, only forward what the user sees
+                if (
+                    metadata.get("langgraph_node") in ("assistant", "account_opening")
+                    and isinstance(message, AIMessage)
+                    and isinstance(message.content, str)
+                    and message.content
+                ):
+                    streamed.add(message.id)
+                    yield "token", {"text": message.content}
+
+            elif mode == "custom" and isinstance(chunk, dict) and "tool" in chunk:
+                name = chunk["tool"]
+                if chunk["status"] == "started":
+                    yield "progress", {
+                        "tool": name,
+                        "status": "started",
+                        "message": TOOL_PROGRESS.get(name, f"Running {name}…"),
+                    }
+                else:
+                    yield "progress", {"tool": name, "status": "finished"}
+
+            elif mode == "values" and not namespace:
+                final_messages = chunk["messages"]
+
+        metrics.finish()
+        final = final_messages[-1]
+        reply = final.content
+        if final.id not in streamed and reply:
+            # Streamed text that didn't make it into the history was a cancelled / timed out call
+            if streamed - {m.id for m in final_messages}:
+                yield "reset", {}
+            yield "token", {"text": reply}
+        yield "done", {"response": reply}
+
+    except Exception as e:
+        metrics.finish("error")
+        yield "error", {"message": str(e)}
+
+async def sse_stream(input: ChatInput):
+    async for event, data in stream_turn(input):
+        yield f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+async def text_stream(input: ChatInput):
+    async for event, data in stream_turn(input):
+        if event == "token":
+            yield data["text"]
+        elif event == "reset":
+            # Plain text can't take back what was sent: start the final reply on its own line
+            yield "\n\n"
+        elif event == "error":
+            yield f"\nERROR: {data['message']}"
+
+@router.post("/chat/stream")
+async def chat_stream(input: ChatInput, format: str = "sse"):
+    """
+    Streaming variant of /chat.
+    format=sse   -> Server-Sent Events (token / reset / progress / done / error)
+    format=text  -> plain chunked text with only the assistant tokens
+    """
+    if format == "text":
+        return StreamingResponse(text_stream(input), media_type="text/plain; charset=utf-8")
+
+    return StreamingResponse(
+        sse_stream(input),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@router.get("/sessions/stats")
+async def session_stats():
+    # Counts the hibernated sessions in the backend: blocking I/O
+    return await asyncio.to_thread(checkpointer.stats)
+
+@router.get("/fast-path/stats")
+async def fast_path_metrics():
+    return fast_path_stats()
+
+@router.get("/prompt/stats")
+async def prompt_stats():
+    return loan_prompt_stats.stats()
+
+@router.get("/models/stats")
+async def model_stats():
+    return tier_stats.stats()
+
+@router.get("/prefetch/stats")
+async def prefetch_stats():
+    return prefetcher.stats()
+
+@router.get("/resilience/stats")
+async def resilience_stats():
+    return llm_guard.stats()
+
+@router.get("/cache/stats")
+async def cache_stats():
+    return response_cache.stats()
+
+@router.get("/chat/queue/stats")
+async def queue_stats():
+    return session_queue.stats()
+
+@router.get("/metrics")
+async def metrics():
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
@@ -0,0 +1,120 @@
+import asyncio
+import json
+import tempfile
+from fastapi import APIRouter, Request
+from fastapi.responses import StreamingResponse
+from app.core.eligibility import evaluate, format_amount
+from app.db.refdata import get_refdata
+
+router = APIRouter()
+
+BATCH_SIZE = 10000
+SPOOL_MAX_BYTES = 8 * 1024 * 1024
+
+def _risk_zone(zip_code):
+    zip_data = get_refdata().zip_info(str(zip_code)) if zip_code else None
+    return zip_data["risk_zone"] if zip_data else None
+
+JSON_TYPES = {list: "an array", str: "a string", int: "a number", float: "a number", bool: "a boolean",
+              type(None): "null"}
+
+def _parse_line(line: bytes) -> tuple[dict | None, str | None]:
+    """(row, None) for a JSON object, (None, what's wrong) for anything else."""
+    try:
+        text = line.decode("utf-8")
+    except UnicodeDecodeError:
+        return None, "line is not valid UTF-8"
+    try:
+        row = json.loads(text)
+    except ValueError as e:
+        return None, f"invalid JSON: {e}"
+    if not isinstance(row, dict):
+        return None, f"expected a JSON object, got {JSON_TYPES.get(type(row), 'something else')}"
+    return row, None
+
+def _evaluate_batch(entries: list[tuple[int, dict | None, str | None]], risk_adjust: bool) -> str:
+    """entries: (line number, row, parse error) per input line; rows that didn't parse are reported as is."""
+    rows = [row for _, row, _ in entries if row is not None]
+    risk_zone = [_risk_zone(row.get("zip_code")) for row in rows] if risk_adjust else None
+    result = evaluate(
+        [row.get("annual_income", "") for row in rows],
+        [row.get("annual_expense", "") for row in rows],
+        [row.get("property_value", "") for row in rows],
+        [row.get("requested_amount", "") for row in rows],
+        risk_zone=risk_zone,
+    ) if rows else None
+
+    lines = []
+    i = 0
+    for line_no, row, error in entries:
+        if row is None:
+            out = {"id": None, "line": line_no, "error": error}
+        elif not result["valid"][i]:
+            out = {"id": row.get("id"), "line": line_no, "error": "invalid numeric input"}
+        else:
+            out = {
+                "id": row.get("id"),
+                "eligible": bool(result["eligible"][i]),
+                "disposable_income": format_amount(result["disposable_income"][i]),
+                "max_loan_amount": format_amount(result["max_loan_amount"][i]),
+                "requested_amount_exceeds_limit": bool(result["requested_amount_exceeds_limit"][i]),
+            }
+            if risk_zone is not None:
+                out["risk_zone"] = risk_zone[i]
+        if row is not None:
+            i += 1
+        lines.append(json.dumps(out))
+    return "\n".join(lines) + "\n"
+
+async def _ndjson_lines(request: Request):
+    """Yields (line number, line) for the non-blank lines of the body; numbers count from 1."""
+    buffer = b""
+    line_no = 0
+    async for chunk in request.stream():
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            line_no += 1
+            if line.strip():
+                yield line_no, line
+    if buffer.strip():
+        yield line_no + 1, buffer
+
+@router.post("/eligibility/batch")
+async def eligibility_batch(request: Request, risk_adjust: bool = False):
+    """
+    Pre-screens many applications at once.
+
+    Body: NDJSON, one application per line:
+      {"id": ..., "annual_income": ..., "annual_expense": ..., "property_value": ...,
+       "requested_amount": ..., "zip_code": ...}
+    Response: NDJSON, one result per non-blank input line in the same order.
+    A line that can't be evaluated gets {"id", "line", "error"} instead, where
+    line is its 1-based line number in the body and error says what is wrong
+    (invalid JSON, not a JSON object, invalid numeric input).
+    risk_adjust=true scales the maximum loan by the ZIP's risk_zone.
+
+    Nothing is sent until the whole body has been received. While it arrives,
+    rows are evaluated BATCH_SIZE at a time and the results are spooled (to disk
+    past SPOOL_MAX_BYTES); the response then streams the spool back, so memory
+    stays flat regardless of the input size.
+    """
+    # The request body has to be fully consumed before the streaming response
+    # starts: Starlette listens on the same receive channel for disconnects.
+    spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES, mode="w+b")
+    entries = []
+    async for line_no, line in _ndjson_lines(request):
+        entries.append((line_no, *_parse_line(line)))
+        if len(entries) >= BATCH_SIZE:
+            spool.write((await asyncio.to_thread(_evaluate_batch, entries, risk_adjust)).encode())
+            entries = []
+    if entries:
+        spool.write((await asyncio.to_thread(_evaluate_batch, entries, risk_adjust)).encode())
+    spool.seek(0)
+
+    def results():
+        with spool:
+            while chunk := spool.read(64 * 1024):
+                yield chunk
+
+    return StreamingResponse(results(), media_type="application/x-ndjson")
@@ -0,0 +1,74 @@
+import csv
+import io
+import json
+import secrets
+from typing import Optional
+from fastapi import APIRouter, Depends, Header, HTTPException
+from fastapi.responses import StreamingResponse
+from app.core.config import ADMIN_TOKEN
+from app.db.models import iter_loans, loan_ref
+from app.db.write_behind import loan_writer
+
+async def require_admin(authorization: Optional[str] = Header(None)):
+    """Ops-only endpoints (applicant PII): `Authorization: Bearer <ADMIN_TOKEN>`; disabled when unset."""
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=503, detail="admin endpoints are disabled (ADMIN_TOKEN is not set)")
+    scheme, _, token = (authorization or "").partition(" ")
+    if scheme.lower() != "bearer" or not secrets.compare_digest(token.encode(), ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=401, detail="admin token required", headers={"WWW-Authenticate": "Bearer"})
+
+router = APIRouter(dependencies=[Depends(require_admin)])
+
+EXPORT_COLUMNS = ["loan_id", "user_id", "status", "submission_date", "details"]
+
+async def _ndjson_export(rows):
+    async for chunk in rows:
+        yield "".join(
+            '{"loan_id":%s,"user_id":%s,"status":%s,"submission_date":%s,"details":%s}\n' % (
+                json.dumps(loan_ref(loan_id)), json.dumps(user_id), json.dumps(status),
+                json.dumps(submitted), details,    # details is already a JSON object
+            )
+            for loan_id, user_id, status, submitted, details, _ in chunk
+        )
+
+async def _csv_export(rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    async for chunk in rows:
+        writer.writerows(
+            (loan_ref(loan_id), user_id, status, submitted, details)
+            for loan_id, user_id, status, submitted, details, _ in chunk
+        )
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+@router.get("/loans/export")
+async def export_loans(
+    format: str = "ndjson",
+    status: Optional[str] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+):
+    """
+    Streams loan_applications as NDJSON (default) or CSV.
+    Optional filters: status, since / until (submission_date, e.g. 2024-01-31).
+    Rows are read in fixed-size keyset chunks, so memory use does not grow with the table.
+    """
+    rows = iter_loans(status=status, since=since, until=until)
+    if format == "ndjson":
+        return StreamingResponse(_ndjson_export(rows), media_type="application/x-ndjson")
+    if format == "csv":
+        return StreamingResponse(
+            _csv_export(rows),
+            media_type="text/csv",
+            headers={"Content-Disposition": "attachment; filename=loan_applications.csv"},
+        )
+    raise HTTPException(status_code=400, detail="format must be ndjson or csv")
+
+@router.get("/loans/writer/stats")
+async def loan_writer_stats():
+    return loan_writer.stats()
@@ -0,0 +1,256 @@
+"""
+WebSocket chat: /ws/chat/{user_id} binds one connection to one thread_id.
+
+Client frames:  {"text": "...", "request_id": "..." (optional)}
+Server frames:  {"event": ..., "data": {...}}
+  ready         connection bound to the thread (resumed: existing session)
+  token / reset / progress / done / error
+                one turn, same events as /chat/stream
+  otp_expiring  pushed when a code sent on this connection is still unused
+                WS_OTP_WARNING_SECONDS before it expires
+  otp_expired   pushed when it expired unused
+
+The connection checks once whether the session exists and remembers it, so
+turns skip the aget_state round trip that /chat does to decide whether to seed
+a new LoanState. Turns still go through the session queue lock, so they are
+serialized with /chat and /chat/stream turns of the same user.
+
+A newer connection for the same user replaces the older one (closed with
+4000). Beyond WS_MAX_CONNECTIONS per worker new connections are closed with
+1013 (try again later). Connections idle for WS_IDLE_TIMEOUT_SECONDS are
+closed. Counts and turn latency: GET /ws/stats and GET /metrics.
+"""
+import asyncio
+import json
+import time
+from collections import defaultdict, deque
+from contextlib import aclosing
+
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+
+from app.api.chat import ChatInput, session_exists, session_queue, stream_turn
+from app.core.config import OTP_TTL_SECONDS, WS_IDLE_TIMEOUT_SECONDS, WS_MAX_CONNECTIONS, WS_OTP_WARNING_SECONDS
+from app.core.metrics import Counter, Gauge, Histogram, new_trace_id, registry, trace_id_var
+from app.core.state_backend import get_state_backend
+from app.tools.otp import otp_key
+from app.workflows.fast_path import pending_mobile
+from app.workflows.loan_graph import get_loan_graph
+
+router = APIRouter()
+
+ws_connections_total = registry.register(Counter(
+    "ws_connections_total", "WebSocket chat connection attempts by outcome", ("result",)))
+ws_turn_duration = registry.register(Histogram(
+    "ws_turn_seconds", "WebSocket chat turn, message received -> done"))
+ws_first_event = registry.register(Histogram(
+    "ws_first_event_seconds", "WebSocket chat turn, message received -> first token / progress event"))
+
+
+class ChatConnection:
+    def __init__(self, websocket: WebSocket, thread_id: str):
+        self.websocket = websocket
+        self.thread_id = thread_id
+        self.seeded = None
+        self.closed = False
+        self.timers = {}
+        self._send_lock = asyncio.Lock()
+
+    async def send(self, event: str, data: dict) -> bool:
+        """Sends one event; False once the socket is gone."""
+        if self.closed:
+            return False
+        async with self._send_lock:
+            try:
+                await self.websocket.send_json({"event": event, "data": data})
+            except Exception:
+                self.closed = True
+                return False
+        return True
+
+    def schedule(self, name: str, coro):
+        """Runs a server push task, replacing the previous one with the same name."""
+        previous = self.timers.pop(name, None)
+        if previous is not None:
+            previous.cancel()
+        self.timers[name] = asyncio.create_task(coro)
+
+    def cancel_timers(self):
+        for task in self.timers.values():
+            task.cancel()
+        self.timers.clear()
+
+    async def close(self, code: int, reason: str):
+        self.cancel_timers()
+        if not self.closed:
+            self.closed = True
+            try:
+                await self.websocket.close(code=code, reason=reason)
+            except Exception:
+                pass
+
+
+class ConnectionManager:
+    def __init__(self, max_connections: int = WS_MAX_CONNECTIONS, samples: int = 1000):
+        self.max_connections = max_connections
+        self.connections = {}
+        self.counts = defaultdict(int)
+        self.turn_times = deque(maxlen=samples)
+        self.first_event_times = deque(maxlen=samples)
+
+    async def connect(self, websocket: WebSocket, thread_id: str) -> ChatConnection | None:
+        await websocket.accept()
+        previous = self.connections.get(thread_id)
+        if previous is None and len(self.connections) >= self.max_connections:
+            self._count("rejected")
+            await websocket.close(code=1013, reason="connection limit reached")
+            return None
+        if previous is not None:
+            self._count("replaced")
+            await previous.close(4000, "replaced by a newer connection")
+
+        conn = self.connections[thread_id] = ChatConnection(websocket, thread_id)
+        self._count("accepted")
+        return conn
+
+    def disconnect(self, conn: ChatConnection):
+        conn.cancel_timers()
+        if self.connections.get(conn.thread_id) is conn:
+            del self.connections[conn.thread_id]
+
+    async def push(self, thread_id: str, event: str, data: dict) -> bool:
+        """Server-initiated event to the user's open connection, if there is one."""
+        conn = self.connections.get(thread_id)
+        return conn is not None and await conn.send(event, data)
+
+    def _count(self, result: str):
+        self.counts[result] += 1
+        ws_connections_total.inc(result)
+
+    def stats(self) -> dict:
+        def ms(samples, q):
+            values = sorted(samples)
+            return round(values[min(len(values) - 1, int(len(values) * q))] * 1000, 2) if values else 0.0
+
+        return {
+            "connections": len(self.connections),
+            "max_connections": self.max_connections,
+            **self.counts,
+            "turns": len(self.turn_times),
+            "turn_ms_p50": ms(self.turn_times, 0.5),
+            "turn_ms_p95": ms(self.turn_times, 0.95),
+            "first_event_ms_p50": ms(self.first_event_times, 0.5),
+            "first_event_ms_p95": ms(self.first_event_times, 0.95),
+        }
+
+
+manager = ConnectionManager()
+
+registry.register(Gauge("ws_connections", "Open WebSocket chat connections", lambda: len(manager.connections)))
+
+
+async def otp_expiry_pushes(conn: ChatConnection, mobile: str, sent_at: float):
+    """Warns before an unused code expires, then says when it has."""
+    backend = get_state_backend()
+    key = otp_key(mobile)
+    expires_at = sent_at + OTP_TTL_SECONDS
+
+    await asyncio.sleep(max(0.0, expires_at - WS_OTP_WARNING_SECONDS - time.monotonic()))
+    if await asyncio.to_thread(backend.get, key) is None:
+        return      # verified (or replaced) in the meantime
+    expires_in = round(max(0.0, expires_at - time.monotonic()))
+    await conn.send("otp_expiring", {
+        "expires_in": expires_in,
+        "message": f"Your verification code expires in {expires_in} seconds.",
+    })
+
+    await asyncio.sleep(max(0.0, expires_at - 1 - time.monotonic()))
+    if await asyncio.to_thread(backend.get, key) is None:
+        return
+    await asyncio.sleep(max(0.0, expires_at - time.monotonic()))
+    await conn.send("otp_expired", {"message": "Your verification code has expired. Ask me to send a new one."})
+
+
+async def watch_otp(conn: ChatConnection, sent_at: float):
+    config = {"configurable": {"thread_id": conn.thread_id}}
+    async with session_queue.exclusive(conn.thread_id):
+        state = await get_loan_graph().aget_state(config)
+    mobile = pending_mobile(state.values) if state.values else None
+    if mobile:
+        conn.schedule("otp", otp_expiry_pushes(conn, mobile, sent_at))
+
+
+async def run_turn(conn: ChatConnection, text: str):
+    received = time.perf_counter()
+    first_event = None
+    otp_sent_at = None
+
+    async with aclosing(stream_turn(ChatInput(user_id=conn.thread_id, text=text), conn.seeded)) as events:
+        async for event, data in events:
+            if first_event is None:
+                first_event = time.perf_counter() - received
+                manager.first_event_times.append(first_event)
+                ws_first_event.observe(first_event)
+            if event == "progress" and data["tool"] == "send_otp" and data["status"] == "finished":
+                otp_sent_at = time.monotonic()
+            if event == "done":
+                conn.seeded = True
+            if not await conn.send(event, data):
+                return      # client went away; aclosing ends the turn's stream
+
+    elapsed = time.perf_counter() - received
+    manager.turn_times.append(elapsed)
+    ws_turn_duration.observe(elapsed)
+    if otp_sent_at is not None:
+        await watch_otp(conn, otp_sent_at)
+
+
+def parse_message(message: str) -> tuple[str, str | None]:
+    """(text, request_id) from a client frame; plain text frames are accepted too."""
+    try:
+        payload = json.loads(message)
+    except ValueError:
+        return message.strip(), None
+    if not isinstance(payload, dict):
+        return "", None
+    return str(payload.get("text") or "").strip(), payload.get("request_id")
+
+
+@router.websocket("/ws/chat/{user_id}")
+async def chat_socket(websocket: WebSocket, user_id: str):
+    conn = await manager.connect(websocket, user_id)
+    if conn is None:
+        return
+
+    try:
+        # Checked once per connection (under the turn lock, so a shared session is written back)
+        async with session_queue.exclusive(user_id):
+            conn.seeded = await session_exists({"configurable": {"thread_id": user_id}})
+        await conn.send("ready", {"thread_id": user_id, "resumed": conn.seeded})
+
+        while not conn.closed:
+            try:
+                message = await asyncio.wait_for(websocket.receive_text(), WS_IDLE_TIMEOUT_SECONDS)
+            except asyncio.TimeoutError:
+                await conn.close(1000, "idle timeout")
+                break
+
+            text, request_id = parse_message(message)
+            if not text:
+                await conn.send("error", {"message": 'expected {"text": "..."}'})
+                continue
+
+            token = trace_id_var.set(request_id or new_trace_id())
+            try:
+                await run_turn(conn, text)
+            finally:
+                trace_id_var.reset(token)
+    except (WebSocketDisconnect, RuntimeError):
+        # RuntimeError: receive on a socket that was replaced / closed meanwhile
+        pass
+    finally:
+        manager.disconnect(conn)
+
+
+@router.get("/ws/stats")
+async def ws_stats():
+    return manager.stats()
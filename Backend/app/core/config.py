@@ -5,3 +5,127 @@ load_dotenv()
 
 OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY")
 DB_PATH = "loans.db"
+
+# Session store (LangGraph checkpointer) limits
+SESSION_STORE_PATH = os.getenv("SESSION_STORE_PATH", "sessions.db")
+SESSION_IDLE_TTL_SECONDS = float(os.getenv("SESSION_IDLE_TTL_SECONDS", "900"))
+SESSION_MAX_CHECKPOINTS = int(os.getenv("SESSION_MAX_CHECKPOINTS", "1"))
+SESSION_MAX_IN_MEMORY = int(os.getenv("SESSION_MAX_IN_MEMORY", "5000"))
+SESSION_SWEEP_INTERVAL_SECONDS = float(os.getenv("SESSION_SWEEP_INTERVAL_SECONDS", "60"))
+
+# Conversation history compaction (loan graph)
+HISTORY_KEEP_TURNS = int(os.getenv("HISTORY_KEEP_TURNS", "4"))
+HISTORY_SUMMARY_MAX_CHARS = int(os.getenv("HISTORY_SUMMARY_MAX_CHARS", "2000"))
+
+# SQLite connection pool (number of DB worker threads / connections)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "4"))
+
+# LLM provider (OpenAI compatible) and shared HTTP connection pool
+LLM_BASE_URL = os.getenv("LLM_BASE_URL", "https://openrouter.ai/api/v1")
+LLM_POOL_SIZE = int(os.getenv("LLM_POOL_SIZE", "100"))
+LLM_KEEPALIVE_SECONDS = float(os.getenv("LLM_KEEPALIVE_SECONDS", "30"))
+LLM_CONNECT_TIMEOUT = float(os.getenv("LLM_CONNECT_TIMEOUT", "5"))
+LLM_READ_TIMEOUT = float(os.getenv("LLM_READ_TIMEOUT", "60"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+
+# Memory-mapped ZIP / agent reference data (falls back to app/mock/data.py if missing)
+REFDATA_PATH = os.getenv("REFDATA_PATH", "data/refdata.bin")
+REFDATA_CACHE_SIZE = int(os.getenv("REFDATA_CACHE_SIZE", "2048"))
+
+# Testing only: makes send_otp always issue this code (used by benchmarks/loadtest.py)
+OTP_FIXED_CODE = os.getenv("OTP_FIXED_CODE")
+
+# Log every node / tool / LLM call of a turn with the request's trace id
+METRICS_TRACE_LOGS = os.getenv("METRICS_TRACE_LOGS", "0") == "1"
+
+# Tool calls from one assistant step run concurrently; at most TOOL_CONCURRENCY
+# tools run at once per worker (across sessions) and each call has a timeout
+TOOL_CONCURRENCY = int(os.getenv("TOOL_CONCURRENCY", "16"))
+TOOL_TIMEOUT_SECONDS = float(os.getenv("TOOL_TIMEOUT_SECONDS", "15"))
+
+# Response cache for repeated informational questions (loan assistant)
+RESPONSE_CACHE_ENABLED = os.getenv("RESPONSE_CACHE_ENABLED", "1") == "1"
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "1000"))
+RESPONSE_CACHE_TTL_SECONDS = float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "3600"))
+RESPONSE_CACHE_SIMILARITY = float(os.getenv("RESPONSE_CACHE_SIMILARITY", "0.8"))
+
+# Shared state (sessions, OTPs, per-session locks) for multi-worker deployments:
+#   sqlite  one SQLite file shared by every worker on this host (default)
+#   redis   any Redis-protocol server at STATE_REDIS_URL, for several hosts / pods
+STATE_BACKEND = os.getenv("STATE_BACKEND", "sqlite")
+STATE_REDIS_URL = os.getenv("STATE_REDIS_URL", "redis://127.0.0.1:6379/0")
+STATE_REDIS_POOL_SIZE = int(os.getenv("STATE_REDIS_POOL_SIZE", "16"))
+STATE_SWEEP_INTERVAL_SECONDS = float(os.getenv("STATE_SWEEP_INTERVAL_SECONDS", "30"))
+OTP_TTL_SECONDS = int(os.getenv("OTP_TTL_SECONDS", "300"))
+
+# Required with uvicorn --workers N > 1: every turn locks its session in the
+# shared backend and writes it back when done, so any worker can serve the next one
+SESSION_SHARED = os.getenv("SESSION_SHARED", "0") == "1"
+SESSION_LOCK_TTL_SECONDS = float(os.getenv("SESSION_LOCK_TTL_SECONDS", "180"))
+
+# WebSocket chat (/ws/chat/{user_id}), limits are per worker
+WS_MAX_CONNECTIONS = int(os.getenv("WS_MAX_CONNECTIONS", "1000"))
+WS_IDLE_TIMEOUT_SECONDS = float(os.getenv("WS_IDLE_TIMEOUT_SECONDS", "600"))
+WS_OTP_WARNING_SECONDS = float(os.getenv("WS_OTP_WARNING_SECONDS", "60"))
+
+# Loan submissions: write-behind queue, group-committed in batches of up to
+# LOAN_WRITE_BATCH_SIZE rows or LOAN_WRITE_MAX_DELAY_MS. By default a submission
+# is only acknowledged (the customer gets a reference) once its batch has
+# committed. LOAN_WRITE_DURABLE=0 returns the reference right away: faster, but
+# a failed row is only logged and a crash loses whatever is still queued.
+LOAN_WRITE_BATCH_SIZE = int(os.getenv("LOAN_WRITE_BATCH_SIZE", "200"))
+LOAN_WRITE_MAX_DELAY_MS = float(os.getenv("LOAN_WRITE_MAX_DELAY_MS", "20"))
+LOAN_WRITE_DURABLE = os.getenv("LOAN_WRITE_DURABLE", "1") == "1"
+LOAN_ID_BLOCK_SIZE = int(os.getenv("LOAN_ID_BLOCK_SIZE", "100"))
+
+# Model tiers (app/agents/model_router.py): the fast tier handles verification
+# and data collection, the strong tier eligibility and self-employed handoff.
+# Prices are USD per 1M input / output tokens, for the per-tier cost report.
+# LLM_TIERING=0 sends every call to the fast tier with the full tool set.
+LLM_TIERING = os.getenv("LLM_TIERING", "1") == "1"
+LLM_MODEL_FAST = os.getenv("LLM_MODEL_FAST", "gpt-4o-mini")
+LLM_MODEL_STRONG = os.getenv("LLM_MODEL_STRONG", "gpt-4o")
+LLM_PRICE_FAST = os.getenv("LLM_PRICE_FAST", "0.15,0.60")
+LLM_PRICE_STRONG = os.getenv("LLM_PRICE_STRONG", "2.50,10.00")
+
+# Speculative prefetch (app/workflows/prefetch.py): mobile numbers and ZIP codes
+# in the user's message start the account / ZIP / agent lookups while the LLM
+# is still deciding; results are kept per session for PREFETCH_TTL_SECONDS.
+PREFETCH_ENABLED = os.getenv("PREFETCH_ENABLED", "1") == "1"
+PREFETCH_TTL_SECONDS = float(os.getenv("PREFETCH_TTL_SECONDS", "300"))
+PREFETCH_MAX_SESSIONS = int(os.getenv("PREFETCH_MAX_SESSIONS", "10000"))
+
+# LLM resilience (app/core/resilience.py) for the agents' LLM calls: one deadline
+# per turn shared by every call in it, a hedged duplicate request once a call
+# runs past the recent LLM_HEDGE_QUANTILE latency, LLM_MAX_RETRIES retries of
+# 429 / 5xx / connection errors with jittered backoff, and a circuit breaker
+# that answers with LLM_FALLBACK_MESSAGE while the provider is failing.
+LLM_GUARD_ENABLED = os.getenv("LLM_GUARD_ENABLED", "1") == "1"
+LLM_TURN_DEADLINE_SECONDS = float(os.getenv("LLM_TURN_DEADLINE_SECONDS", "30"))
+LLM_HEDGE_ENABLED = os.getenv("LLM_HEDGE_ENABLED", "1") == "1"
+LLM_HEDGE_QUANTILE = float(os.getenv("LLM_HEDGE_QUANTILE", "0.95"))
+LLM_HEDGE_MIN_DELAY_MS = float(os.getenv("LLM_HEDGE_MIN_DELAY_MS", "200"))
+LLM_HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
+LLM_RETRY_BASE_MS = float(os.getenv("LLM_RETRY_BASE_MS", "200"))
+LLM_RETRY_MAX_MS = float(os.getenv("LLM_RETRY_MAX_MS", "4000"))
+LLM_BREAKER_FAILURES = int(os.getenv("LLM_BREAKER_FAILURES", "5"))
+LLM_BREAKER_COOLDOWN_SECONDS = float(os.getenv("LLM_BREAKER_COOLDOWN_SECONDS", "30"))
+LLM_FALLBACK_MESSAGE = os.getenv(
+    "LLM_FALLBACK_MESSAGE",
+    "Sorry, I'm having trouble responding right now. Please try again in a moment.",
+)
+
+# Delta checkpoints (off by default): LoanState.messages becomes a LangGraph
+# DeltaChannel, so a checkpoint stores only the messages written in that
+# superstep; the full list is rebuilt from the log since the last snapshot,
+# written every CHECKPOINT_SNAPSHOT_EVERY updates. The session store then has to
+# keep (and hibernate) every checkpoint back to that snapshot, up to
+# CHECKPOINT_SNAPSHOT_EVERY per session instead of SESSION_MAX_CHECKPOINTS. With
+# the history compactor keeping conversations short that costs more memory than
+# it saves; it pays off for long, uncompacted histories.
+CHECKPOINT_DELTA_MESSAGES = os.getenv("CHECKPOINT_DELTA_MESSAGES", "0") == "1"
+CHECKPOINT_SNAPSHOT_EVERY = int(os.getenv("CHECKPOINT_SNAPSHOT_EVERY", "50"))
+
+# Bearer token for the ops-only endpoints (/loans/export, /loans/writer/stats);
+# they answer 503 while it is unset
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
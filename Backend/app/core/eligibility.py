@@ -0,0 +1,85 @@
+"""
+Loan eligibility policy, evaluated over whole columns of applications.
+
+    disposable income = annual income - annual expense
+    eligible          = disposable income >= MIN_DISPOSABLE_INCOME
+    maximum loan      = min(disposable income * LOAN_MULTIPLIER, MAX_LTV * property value)
+                        (optionally scaled by the ZIP's risk_zone)
+
+Used by the chat tool for one application and by /eligibility/batch for many.
+"""
+import re
+import numpy as np
+
+MIN_DISPOSABLE_INCOME = 50000
+LOAN_MULTIPLIER = 10
+MAX_LTV = 0.8
+
+# Multiplier on the maximum loan amount per ZIP risk zone (only when requested)
+RISK_ZONE_ADJUSTMENT = {
+    "LOW": 1.0,
+    "MEDIUM": 0.9,
+    "HIGH": 0.75,
+}
+
+_NON_DIGITS = re.compile(r"\D")
+
+
+def parse_amounts(values) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Cleans amounts the same way the chat tool always has: numbers pass through,
+    strings keep only their digits (so "$120,000" -> 120000).
+    Returns (amounts as float64, valid mask).
+    """
+    column = np.asarray(values)
+    if column.dtype.kind in "iuf":
+        return column.astype(np.float64), ~np.isnan(column.astype(np.float64))
+
+    amounts = np.zeros(len(values), dtype=np.float64)
+    valid = np.ones(len(values), dtype=bool)
+    for i, value in enumerate(values):
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            amounts[i] = value
+            continue
+        digits = _NON_DIGITS.sub("", str(value))
+        if digits:
+            amounts[i] = int(digits)
+        else:
+            valid[i] = False
+    return amounts, valid
+
+
+def evaluate(income, expense, property_value, requested, risk_zone=None) -> dict:
+    """
+    Evaluates arrays of applications. All inputs are equal-length sequences;
+    risk_zone (optional) holds "LOW" / "MEDIUM" / "HIGH" / None per application.
+    """
+    income, income_ok = parse_amounts(income)
+    expense, expense_ok = parse_amounts(expense)
+    property_value, property_ok = parse_amounts(property_value)
+    requested, requested_ok = parse_amounts(requested)
+    valid = income_ok & expense_ok & property_ok & requested_ok
+
+    disposable = income - expense
+    eligible = valid & (disposable >= MIN_DISPOSABLE_INCOME)
+    max_loan = np.minimum(disposable * LOAN_MULTIPLIER, MAX_LTV * property_value)
+
+    if risk_zone is not None:
+        adjustment = np.array([RISK_ZONE_ADJUSTMENT.get(zone, 1.0) for zone in risk_zone])
+        max_loan = max_loan * adjustment
+
+    max_loan = np.where(eligible, max_loan, 0.0)
+
+    return {
+        "valid": valid,
+        "income": income,
+        "expense": expense,
+        "disposable_income": disposable,
+        "eligible": eligible,
+        "max_loan_amount": max_loan,
+        "requested_amount_exceeds_limit": eligible & (requested > max_loan),
+    }
+
+
+def format_amount(value: float):
+    return int(value) if float(value).is_integer() else round(float(value), 2)
@@ -0,0 +1,58 @@
+from functools import cache
+import httpx
+from app.core.config import (
+    OPENROUTER_API_KEY,
+    LLM_BASE_URL,
+    LLM_POOL_SIZE,
+    LLM_KEEPALIVE_SECONDS,
+    LLM_CONNECT_TIMEOUT,
+    LLM_READ_TIMEOUT,
+    LLM_MAX_RETRIES,
+)
+
+# One keep-alive connection pool shared by every agent, so concurrent
+# conversations reuse warm TLS connections to the LLM provider.
+limits = httpx.Limits(
+    max_connections=LLM_POOL_SIZE,
+    max_keepalive_connections=LLM_POOL_SIZE,
+    keepalive_expiry=LLM_KEEPALIVE_SECONDS,
+)
+timeout = httpx.Timeout(LLM_READ_TIMEOUT, connect=LLM_CONNECT_TIMEOUT)
+
+
+# Clients are built on first use: creating the SSL contexts is slow enough to
+# show up in worker start time.
+@cache
+def get_http_client() -> httpx.Client:
+    return httpx.Client(limits=limits, timeout=timeout)
+
+
+@cache
+def get_http_async_client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(limits=limits, timeout=timeout)
+
+
+def build_chat_model(model: str = "gpt-4o-mini", max_retries: int = LLM_MAX_RETRIES, **kwargs):
+    """ChatOpenAI client backed by the shared connection pool."""
+    # Imported here: langchain_openai pulls in the whole openai SDK
+    from langchain_openai import ChatOpenAI
+
+    return ChatOpenAI(
+        model=model,
+        api_key=OPENROUTER_API_KEY,
+        base_url=LLM_BASE_URL,
+        timeout=timeout,
+        max_retries=max_retries,
+        http_client=get_http_client(),
+        http_async_client=get_http_async_client(),
+        **kwargs,
+    )
+
+
+async def warm_up_llm():
+    """Opens a pooled connection to the provider so the first user turn skips the TLS handshake."""
+    client = get_http_async_client()
+    try:
+        await client.get(f"{LLM_BASE_URL}/models", headers={"Authorization": f"Bearer {OPENROUTER_API_KEY}"})
+    except httpx.HTTPError as e:
+        print(f"LLM warm-up failed: {e}")
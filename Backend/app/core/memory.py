@@ -1,3 +1,434 @@
+import asyncio
+import pickle
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from contextlib import asynccontextmanager
+
 from langgraph.checkpoint.memory import MemorySaver
 
-checkpointer = MemorySaver()
\ No newline at end of file
+from app.core.config import (
+    SESSION_IDLE_TTL_SECONDS,
+    SESSION_LOCK_TTL_SECONDS,
+    SESSION_MAX_CHECKPOINTS,
+    SESSION_MAX_IN_MEMORY,
+    SESSION_SHARED,
+    SESSION_SWEEP_INTERVAL_SECONDS,
+)
+from app.core.state_backend import get_state_backend
+
+# DeltaChannel-backed channels (LoanState.messages): rebuilt from the writes of
+# every checkpoint since the last snapshot, so pruning has to keep that chain
+DELTA_CHANNELS = ("messages",)
+
+
+def session_key(thread_id: str) -> str:
+    return f"session:{thread_id}"
+
+
+class SessionStore(MemorySaver):
+    """
+    Bounded checkpointer for loan_graph.
+
+    - Keeps only the latest `max_checkpoints` checkpoints per thread (older
+      checkpoints, their pending writes and unreferenced channel blobs are dropped),
+      plus, for delta channels, every checkpoint back to the newest one they
+      can be rebuilt from (a snapshot). Once a newer snapshot is written the
+      older chain is dropped in one go: that is the log's compaction.
+    - Sessions idle for longer than `idle_ttl` (the background sweep_forever task)
+      or beyond `max_sessions` (LRU first) are hibernated to the shared state
+      backend and removed from memory.
+    - A hibernated session is transparently rehydrated on its next access.
+    - shared=True (several workers): `hold()` locks a session across workers for
+      one turn and writes it back afterwards, so no worker keeps a stale copy.
+    """
+
+    def __init__(
+        self,
+        backend=None,
+        shared: bool = SESSION_SHARED,
+        idle_ttl: float = SESSION_IDLE_TTL_SECONDS,
+        max_checkpoints: int = SESSION_MAX_CHECKPOINTS,
+        max_sessions: int = SESSION_MAX_IN_MEMORY,
+        sweep_interval: float = SESSION_SWEEP_INTERVAL_SECONDS,
+        delta_channels: tuple = DELTA_CHANNELS,
+    ):
+        super().__init__()
+        # Resolved on first use, so importing this module opens no files / sockets
+        self._backend = backend
+        self.shared = shared
+        self.idle_ttl = idle_ttl
+        self.max_checkpoints = max(1, max_checkpoints)
+        self.max_sessions = max_sessions
+        self.sweep_interval = sweep_interval
+        self.delta_channels = delta_channels
+
+        self._lock = threading.RLock()
+        # thread_id -> last access (monotonic), ordered least -> most recently used
+        self._last_access = OrderedDict()
+        # thread_id -> {(checkpoint_ns, channel, version)} resident in self.blobs
+        self._thread_blobs = defaultdict(set)
+        # (thread_id, checkpoint_ns) -> newest checkpoint the delta channels can be rebuilt from
+        self._bases = {}
+        # thread_id -> detached session whose backend write hasn't landed yet
+        self._hibernating = {}
+        self._io_lock = threading.Lock()
+        self._counters = {
+            "pruned_checkpoints": 0,
+            "pruned_blobs": 0,
+            "evictions_idle": 0,
+            "evictions_capacity": 0,
+            "rehydrations": 0,
+            "releases": 0,
+        }
+
+    @property
+    def backend(self):
+        if self._backend is None:
+            self._backend = get_state_backend()
+        return self._backend
+
+    # --- hibernation to the state backend ---
+    # Detaching / attaching a session only touches memory and runs under _lock.
+    # Pickling and backend I/O run outside it (off the event loop for the async
+    # API), with writes serialized by _io_lock. A detached session stays in
+    # _hibernating until its write lands, so an access in between takes it back
+    # from there instead of reading a stale (or missing) backend copy.
+
+    def _detach(self, thread_id: str):
+        """Moves a resident session out of the checkpointer into _hibernating."""
+        self._last_access.pop(thread_id, None)
+        for key in [k for k in self._bases if k[0] == thread_id]:
+            del self._bases[key]
+        storage = self.storage.pop(thread_id, None) or {}
+        blob_keys = self._thread_blobs.pop(thread_id, set())
+
+        writes = {}
+        for checkpoint_ns, checkpoints in storage.items():
+            for checkpoint_id in checkpoints:
+                key = (thread_id, checkpoint_ns, checkpoint_id)
+                if key in self.writes:
+                    writes[key] = self.writes.pop(key)
+
+        blobs = {}
+        for checkpoint_ns, channel, version in blob_keys:
+            key = (thread_id, checkpoint_ns, channel, version)
+            if key in self.blobs:
+                blobs[key] = self.blobs.pop(key)
+
+        # Sessions that never produced a checkpoint (e.g. a bare aget_state) are just dropped
+        if any(storage.values()):
+            self._hibernating[thread_id] = ({ns: dict(cps) for ns, cps in storage.items()}, writes, blobs)
+
+    def _write_back(self, thread_ids):
+        """Stores detached sessions in the backend. Blocking I/O: call without _lock held."""
+        with self._io_lock:
+            for thread_id in thread_ids:
+                with self._lock:
+                    detached = self._hibernating.get(thread_id)
+                if detached is None:
+                    continue        # taken back (or deleted) before it was written
+                self.backend.set(session_key(thread_id), pickle.dumps(detached, protocol=pickle.HIGHEST_PROTOCOL))
+                with self._lock:
+                    if self._hibernating.get(thread_id) is detached:
+                        del self._hibernating[thread_id]
+
+    def _attach(self, thread_id: str, detached) -> bool:
+        """Makes a session resident again; True if its backend copy should now be deleted."""
+        from_backend = thread_id not in self._hibernating
+        detached = self._hibernating.pop(thread_id, detached)
+        self._last_access[thread_id] = time.monotonic()
+        if detached is None:
+            return False
+
+        storage, writes, blobs = detached
+        for checkpoint_ns, checkpoints in storage.items():
+            self.storage[thread_id][checkpoint_ns].update(checkpoints)
+        for key, value in writes.items():
+            self.writes[key].update(value)
+        self.blobs.update(blobs)
+        self._thread_blobs[thread_id] = {key[1:] for key in blobs}
+        self._counters["rehydrations"] += 1
+        # Shared sessions keep their stored copy until the turn writes the new one
+        return from_backend and not self.shared
+
+    def _drop_stored(self, thread_id: str):
+        with self._io_lock:
+            with self._lock:
+                # Hibernated again in the meantime: the stored copy is the newer one
+                if thread_id not in self._last_access or thread_id in self._hibernating:
+                    return
+            self.backend.delete(session_key(thread_id))
+
+    def _fetch(self, thread_id: str):
+        payload = self.backend.get(session_key(thread_id))
+        return pickle.loads(payload) if payload is not None else None
+
+    async def _aload(self, thread_id: str):
+        """Async API: rehydrates a hibernated session off the event loop, before taking _lock."""
+        with self._lock:
+            if thread_id in self._last_access or thread_id in self._hibernating:
+                return
+        detached = await asyncio.to_thread(self._fetch, thread_id)
+        with self._lock:
+            if thread_id in self._last_access:
+                return      # loaded by a concurrent call
+            drop = self._attach(thread_id, detached)
+        if drop:
+            await asyncio.to_thread(self._drop_stored, thread_id)
+
+    # --- residency / eviction ---
+
+    def _touch(self, thread_id: str) -> list:
+        """Marks thread_id as used (rehydrating it if needed); returns the sessions evicted for capacity."""
+        if thread_id not in self._last_access:
+            # Sync API only: the async one has already loaded it with _aload
+            detached = None if thread_id in self._hibernating else self._fetch(thread_id)
+            if self._attach(thread_id, detached):
+                self.backend.delete(session_key(thread_id))
+        self._last_access[thread_id] = time.monotonic()
+        self._last_access.move_to_end(thread_id)
+
+        evicted = []
+        while len(self._last_access) > self.max_sessions:
+            oldest = next(iter(self._last_access))
+            self._detach(oldest)
+            evicted.append(oldest)
+            self._counters["evictions_capacity"] += 1
+        return evicted
+
+    def sweep(self) -> int:
+        """Hibernates every session idle for longer than idle_ttl. Returns how many were evicted."""
+        with self._lock:
+            now = time.monotonic()
+            idle = []
+            for thread_id, last_access in self._last_access.items():
+                if now - last_access <= self.idle_ttl:
+                    break
+                idle.append(thread_id)
+
+            for thread_id in idle:
+                self._detach(thread_id)
+            self._counters["evictions_idle"] += len(idle)
+        self._write_back(idle)
+        return len(idle)
+
+    async def sweep_forever(self):
+        """Background task started in the app lifespan: the idle sweep, off the event loop."""
+        while True:
+            await asyncio.sleep(self.sweep_interval)
+            try:
+                await asyncio.to_thread(self.sweep)
+            except Exception as e:
+                print(f"⚠️ session sweep failed: {e}")
+
+    def release(self, thread_id: str):
+        """Writes thread_id (and its sub-graph threads, "<thread_id>:...") back to the backend."""
+        with self._lock:
+            prefix = f"{thread_id}:"
+            released = [t for t in self._last_access if t == thread_id or t.startswith(prefix)]
+            for resident in released:
+                self._detach(resident)
+                self._counters["releases"] += 1
+        self._write_back(released)
+
+    @asynccontextmanager
+    async def hold(self, thread_id: str):
+        """
+        Wraps one turn. Single worker: nothing to do, the session stays resident.
+        Shared: takes the session's lock in the backend (a turn for the same user on
+        another worker waits), loads the latest copy on first access and writes
+        it back before unlocking.
+        """
+        if not self.shared:
+            yield
+            return
+        async with self.backend.lock(session_key(thread_id), ttl=SESSION_LOCK_TTL_SECONDS):
+            try:
+                yield
+            finally:
+                await asyncio.to_thread(self.release, thread_id)
+
+    # --- delta channel chains ---
+
+    def _is_base(self, channel_versions: dict, has_value) -> bool:
+        """True if no delta channel needs this checkpoint's ancestors to be rebuilt."""
+        return all(ch not in channel_versions or has_value(ch) for ch in self.delta_channels)
+
+    def _find_base(self, thread_id: str, checkpoint_ns: str, ordered: list) -> str:
+        # After a rehydration: newest checkpoint with a stored value for every delta channel
+        ns_storage = self.storage[thread_id][checkpoint_ns]
+        for checkpoint_id in reversed(ordered):
+            versions = self.serde.loads_typed(ns_storage[checkpoint_id][0])["channel_versions"]
+
+            def has_value(ch):
+                blob = self.blobs.get((thread_id, checkpoint_ns, ch, versions[ch]))
+                return blob is not None and blob[0] != "empty"
+
+            if self._is_base(versions, has_value):
+                return checkpoint_id
+        return ordered[0]       # the chain goes back to the thread's first checkpoint
+
+    def _prune(self, thread_id: str, checkpoint_ns: str, latest_versions: dict):
+        ns_storage = self.storage[thread_id][checkpoint_ns]
+        if len(ns_storage) <= self.max_checkpoints:
+            return
+
+        # Checkpoint ids are time ordered (uuid6), so sorting keeps the newest at the end
+        ordered = sorted(ns_storage)
+        base = self._bases.get((thread_id, checkpoint_ns))
+        if base is None or base not in ns_storage:
+            base = self._bases[(thread_id, checkpoint_ns)] = self._find_base(thread_id, checkpoint_ns, ordered)
+        keep_from = min(base, ordered[-self.max_checkpoints])
+        stale = [checkpoint_id for checkpoint_id in ordered if checkpoint_id < keep_from]
+        if not stale:
+            return
+        kept = ordered[len(stale):]
+        for checkpoint_id in stale:
+            del ns_storage[checkpoint_id]
+            self.writes.pop((thread_id, checkpoint_ns, checkpoint_id), None)
+        self._counters["pruned_checkpoints"] += len(stale)
+
+        referenced = set(latest_versions.items())
+        for checkpoint_id in kept[:-1]:
+            checkpoint = self.serde.loads_typed(ns_storage[checkpoint_id][0])
+            referenced.update(checkpoint["channel_versions"].items())
+
+        blob_keys = self._thread_blobs[thread_id]
+        for key in [k for k in blob_keys if k[0] == checkpoint_ns and k[1:] not in referenced]:
+            blob_keys.discard(key)
+            self.blobs.pop((thread_id, *key), None)
+            self._counters["pruned_blobs"] += 1
+
+    # --- checkpointer API ---
+    # Sync methods may block on the backend when a session has to be rehydrated;
+    # the async ones (used by the graphs) do that I/O in a worker thread.
+
+    def _locked(self, thread_id, call):
+        with self._lock:
+            evicted = self._touch(thread_id) if thread_id is not None else []
+            return call(), evicted
+
+    def _run(self, thread_id, call):
+        result, evicted = self._locked(thread_id, call)
+        self._write_back(evicted)
+        return result
+
+    async def _arun(self, thread_id, call):
+        if thread_id is not None:
+            await self._aload(thread_id)
+        result, evicted = self._locked(thread_id, call)
+        if evicted:
+            await asyncio.to_thread(self._write_back, evicted)
+        return result
+
+    def _put(self, config, checkpoint, metadata, new_versions):
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        next_config = super().put(config, checkpoint, metadata, new_versions)
+        self._thread_blobs[thread_id].update(
+            (checkpoint_ns, channel, version) for channel, version in new_versions.items()
+        )
+        # Snapshot steps put the delta channels' full value in channel_values
+        if self._is_base(checkpoint["channel_versions"], checkpoint["channel_values"].__contains__):
+            self._bases[(thread_id, checkpoint_ns)] = checkpoint["id"]
+        self._prune(thread_id, checkpoint_ns, checkpoint["channel_versions"])
+        return next_config
+
+    def get_tuple(self, config):
+        return self._run(config["configurable"]["thread_id"], lambda: super(SessionStore, self).get_tuple(config))
+
+    async def aget_tuple(self, config):
+        return await self._arun(config["configurable"]["thread_id"],
+                                lambda: super(SessionStore, self).get_tuple(config))
+
+    def list(self, config, *, filter=None, before=None, limit=None):
+        # Only resident sessions are listed when no thread_id is given
+        yield from self._run(config["configurable"]["thread_id"] if config else None, lambda: list(
+            super(SessionStore, self).list(config, filter=filter, before=before, limit=limit)))
+
+    async def alist(self, config, *, filter=None, before=None, limit=None):
+        items = await self._arun(config["configurable"]["thread_id"] if config else None, lambda: list(
+            super(SessionStore, self).list(config, filter=filter, before=before, limit=limit)))
+        for item in items:
+            yield item
+
+    def get_delta_channel_history(self, *, config, channels):
+        return self._run(config["configurable"]["thread_id"], lambda: super(
+            SessionStore, self).get_delta_channel_history(config=config, channels=channels))
+
+    async def aget_delta_channel_history(self, *, config, channels):
+        return await self._arun(config["configurable"]["thread_id"], lambda: super(
+            SessionStore, self).get_delta_channel_history(config=config, channels=channels))
+
+    def put(self, config, checkpoint, metadata, new_versions):
+        return self._run(config["configurable"]["thread_id"],
+                         lambda: self._put(config, checkpoint, metadata, new_versions))
+
+    async def aput(self, config, checkpoint, metadata, new_versions):
+        return await self._arun(config["configurable"]["thread_id"],
+                                lambda: self._put(config, checkpoint, metadata, new_versions))
+
+    def put_writes(self, config, writes, task_id, task_path=""):
+        return self._run(config["configurable"]["thread_id"],
+                         lambda: super(SessionStore, self).put_writes(config, writes, task_id, task_path))
+
+    async def aput_writes(self, config, writes, task_id, task_path=""):
+        return await self._arun(config["configurable"]["thread_id"],
+                                lambda: super(SessionStore, self).put_writes(config, writes, task_id, task_path))
+
+    def delete_thread(self, thread_id: str):
+        with self._lock:
+            self._last_access.pop(thread_id, None)
+            self._hibernating.pop(thread_id, None)
+            self._thread_blobs.pop(thread_id, None)
+            for key in [k for k in self._bases if k[0] == thread_id]:
+                del self._bases[key]
+            super().delete_thread(thread_id)
+        with self._io_lock:
+            self.backend.delete(session_key(thread_id))
+
+    async def adelete_thread(self, thread_id: str):
+        await asyncio.to_thread(self.delete_thread, thread_id)
+
+    def stats(self) -> dict:
+        """Memory and eviction statistics for the session store."""
+        with self._lock:
+            checkpoint_count = 0
+            resident_bytes = 0
+            for namespaces in self.storage.values():
+                for checkpoints in namespaces.values():
+                    checkpoint_count += len(checkpoints)
+                    for checkpoint, metadata, _ in checkpoints.values():
+                        resident_bytes += len(checkpoint[1]) + len(metadata[1])
+            for _, data in self.blobs.values():
+                resident_bytes += len(data)
+            for task_writes in self.writes.values():
+                for _, _, (_, data), _ in task_writes.values():
+                    resident_bytes += len(data)
+
+            counters = dict(self._counters)
+            resident_sessions = len(self._last_access)
+            resident_blobs = len(self.blobs)
+            pending_writes = len(self._hibernating)
+
+        hibernated, hibernated_bytes = self.backend.count("session:")
+        return {
+            "resident_sessions": resident_sessions,
+            "resident_checkpoints": checkpoint_count,
+            "resident_blobs": resident_blobs,
+            "resident_bytes": resident_bytes,
+            "hibernated_sessions": hibernated,
+            "hibernated_bytes": hibernated_bytes,
+            "pending_writes": pending_writes,
+            "idle_ttl_seconds": self.idle_ttl,
+            "max_checkpoints_per_thread": self.max_checkpoints,
+            "delta_channels": list(self.delta_channels),
+            "max_resident_sessions": self.max_sessions,
+            "backend": self.backend.name,
+            "shared": self.shared,
+            **counters,
+        }
+
+
+checkpointer = SessionStore()
@@ -0,0 +1,254 @@
+"""
+Per-node / per-tool / per-LLM-call instrumentation, exported in the Prometheus
+text format by GET /metrics.
+
+Every graph turn runs with a TurnMetrics callback handler. LangGraph reports
+each node run (with its node name and superstep in the run metadata), each tool
+call and each chat model call to it, so nodes and tools don't need wrapping.
+The account sub-graph runs as its own root graph (own thread) from the
+account_opening node, tagged with metadata {"subgraph": "account_opening"}, so
+its nodes show up as "account_opening/<node>" and its supersteps are counted
+apart from the loan graph's.
+
+Trace IDs: each HTTP request gets one (from X-Request-ID or generated), sent back
+as X-Trace-ID. With METRICS_TRACE_LOGS=1 every node, tool and LLM call is
+logged with it.
+"""
+import bisect
+import threading
+import time
+import uuid
+from contextvars import ContextVar
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+from app.core.config import METRICS_TRACE_LOGS
+
+trace_id_var: ContextVar[str] = ContextVar("trace_id", default="-")
+
+DURATION_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+COUNT_BUCKETS = (0, 1, 2, 3, 4, 5, 6, 8, 10, 15, 20, 30)
+
+
+def new_trace_id() -> str:
+    return uuid.uuid4().hex[:16]
+
+
+def _format_labels(names: tuple, values: tuple, extra: str = "") -> str:
+    pairs = ['%s="%s"' % (name, str(value).replace('"', "'")) for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labels: tuple = ()):
+        self.name, self.help, self.labels = name, help, labels
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labels, labels)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, labels: tuple = (), buckets: tuple = DURATION_BUCKETS):
+        self.name, self.help, self.labels, self.buckets = name, help, labels, buckets
+        self._series = {}       # labels -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 2)
+            if index < len(self.buckets):
+                series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for labels, series in sorted(self._series.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets, series):
+                    cumulative += count
+                    le = 'le="%s"' % bound
+                    lines.append(f"{self.name}_bucket{_format_labels(self.labels, labels, le)} {cumulative}")
+                le = 'le="+Inf"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labels, labels, le)} {series[-1]}")
+                lines.append(f"{self.name}_sum{_format_labels(self.labels, labels)} {round(series[-2], 6)}")
+                lines.append(f"{self.name}_count{_format_labels(self.labels, labels)} {series[-1]}")
+        return lines
+
+
+class Gauge:
+    """Read at scrape time from a callback, e.g. lambda: len(sessions)."""
+
+    def __init__(self, name: str, help: str, read):
+        self.name, self.help, self.read = name, help, read
+
+    def render(self) -> list[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge", f"{self.name} {self.read()}"]
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+turn_duration = registry.register(Histogram(
+    "chat_turn_duration_seconds", "Wall time of one graph turn", ("status",)))
+node_duration = registry.register(Histogram(
+    "chat_node_duration_seconds", "Wall time of one graph node run", ("node",)))
+tool_duration = registry.register(Histogram(
+    "chat_tool_duration_seconds", "Wall time of one tool call", ("tool", "status")))
+llm_duration = registry.register(Histogram(
+    "chat_llm_duration_seconds", "Wall time of one chat model call", ("node",)))
+llm_tokens = registry.register(Counter(
+    "chat_llm_tokens_total", "LLM tokens reported by the provider", ("node", "type")))
+tool_calls_per_turn = registry.register(Histogram(
+    "chat_tool_calls_per_turn", "Tool calls made during one turn", buckets=COUNT_BUCKETS))
+supersteps_per_turn = registry.register(Histogram(
+    "chat_graph_supersteps_per_turn", "LangGraph supersteps executed during one turn", buckets=COUNT_BUCKETS))
+
+
+def _graph_prefix(metadata: dict) -> str:
+    # Sub-graphs run as their own root graph are tagged by their caller; nested
+    # sub-graphs carry the parent node in their checkpoint namespace: "account_opening:<id>|assistant"
+    if metadata.get("subgraph"):
+        return metadata["subgraph"]
+    namespace = metadata.get("langgraph_checkpoint_ns", "")
+    return namespace.split(":", 1)[0] if "|" in namespace else ""
+
+
+def _node_name(metadata: dict) -> str | None:
+    node = metadata.get("langgraph_node")
+    if node is None:
+        return None
+    prefix = _graph_prefix(metadata)
+    return f"{prefix}/{node}" if prefix else node
+
+
+class TurnMetrics(BaseCallbackHandler):
+    """Collects one turn's metrics; pass it as a callback to the graph invocation."""
+
+    run_inline = True       # plain bookkeeping, no need for an executor hop
+
+    def __init__(self, trace_id: str | None = None):
+        self.trace_id = trace_id or trace_id_var.get()
+        self.started = time.perf_counter()
+        self.tool_calls = 0
+        self.steps = set()
+        self._runs = {}     # run_id -> (kind, label, started)
+
+    def _log(self, message: str):
+        if METRICS_TRACE_LOGS:
+            print(f"[trace={self.trace_id}] {message}")
+
+    # --- graph nodes ---
+
+    def on_chain_start(self, serialized, inputs, *, run_id, metadata=None, **kwargs):
+        metadata = metadata or {}
+        node = _node_name(metadata)
+        # Nested runnables inside a node share its metadata; only time the node itself
+        if node is None or kwargs.get("name") != metadata.get("langgraph_node"):
+            return
+        self.steps.add((_graph_prefix(metadata), metadata.get("langgraph_step")))
+        self._runs[run_id] = ("node", node, time.perf_counter())
+
+    def _end_node(self, run_id, status: str):
+        run = self._runs.pop(run_id, None)
+        if run is None or run[0] != "node":
+            return
+        elapsed = time.perf_counter() - run[2]
+        node_duration.observe(elapsed, run[1])
+        self._log(f"node={run[1]} status={status} {elapsed * 1000:.1f}ms")
+
+    def on_chain_end(self, outputs, *, run_id, **kwargs):
+        self._end_node(run_id, "ok")
+
+    def on_chain_error(self, error, *, run_id, **kwargs):
+        self._end_node(run_id, "error")
+
+    # --- tools ---
+
+    def on_tool_start(self, serialized, input_str, *, run_id, **kwargs):
+        self.tool_calls += 1
+        name = kwargs.get("name") or (serialized or {}).get("name", "unknown")
+        self._runs[run_id] = ("tool", name, time.perf_counter())
+
+    def _end_tool(self, run_id, status: str):
+        run = self._runs.pop(run_id, None)
+        if run is None:
+            return
+        elapsed = time.perf_counter() - run[2]
+        tool_duration.observe(elapsed, run[1], status)
+        self._log(f"tool={run[1]} status={status} {elapsed * 1000:.1f}ms")
+
+    def on_tool_end(self, output, *, run_id, **kwargs):
+        self._end_tool(run_id, "ok")
+
+    def on_tool_error(self, error, *, run_id, **kwargs):
+        self._end_tool(run_id, "error")
+
+    # --- LLM calls ---
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, metadata=None, **kwargs):
+        self._runs[run_id] = ("llm", _node_name(metadata or {}) or "unknown", time.perf_counter())
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        run = self._runs.pop(run_id, None)
+        if run is None:
+            return
+        elapsed = time.perf_counter() - run[2]
+        node = run[1]
+        llm_duration.observe(elapsed, node)
+
+        usage = {}
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None) or usage
+        prompt, completion = usage.get("input_tokens", 0), usage.get("output_tokens", 0)
+        cached = (usage.get("input_token_details") or {}).get("cache_read", 0)
+        llm_tokens.inc(node, "prompt", amount=prompt)
+        llm_tokens.inc(node, "completion", amount=completion)
+        if cached:
+            llm_tokens.inc(node, "cache_read", amount=cached)
+        self._log(f"llm node={node} prompt_tokens={prompt} completion_tokens={completion} {elapsed * 1000:.1f}ms")
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        run = self._runs.pop(run_id, None)
+        if run is not None:
+            self._log(f"llm node={run[1]} status=error {type(error).__name__}")
+
+    # --- turn summary ---
+
+    def finish(self, status: str = "ok"):
+        elapsed = time.perf_counter() - self.started
+        turn_duration.observe(elapsed, status)
+        tool_calls_per_turn.observe(self.tool_calls)
+        supersteps_per_turn.observe(len(self.steps))
+        self._log(f"turn status={status} tools={self.tool_calls} supersteps={len(self.steps)} {elapsed * 1000:.1f}ms")
@@ -0,0 +1,289 @@
+"""
+Resilience layer for the agents' LLM calls (llm_guard.ainvoke).
+
+- Turn deadline: every chat turn starts a LLM_TURN_DEADLINE_SECONDS budget
+  (start_turn()). All LLM calls of the turn, across graph supersteps and the
+  account sub-graph, share it; a call that would run past it is cancelled and
+  answered with the fallback message.
+- Hedging: once a call has run longer than the model's recent
+  LLM_HEDGE_QUANTILE latency (at least LLM_HEDGE_MIN_DELAY_MS, and only after
+  LLM_HEDGE_MIN_SAMPLES calls), a duplicate request is sent. The first one to
+  succeed wins and the other is cancelled. The duplicate runs without the
+  turn's callbacks, so it doesn't stream tokens or count in the LLM metrics; if
+  it wins, /chat/stream sends a `reset` event and then the reply as one token
+  (the same happens when a partly streamed call ends in the fallback).
+- Retries: 429, 5xx and connection errors are retried up to LLM_MAX_RETRIES
+  times with full-jitter exponential backoff (LLM_RETRY_BASE_MS..MAX_MS, or the
+  provider's Retry-After), within the deadline. The SDK's own retries are off.
+- Circuit breaker, per model: LLM_BREAKER_FAILURES failed calls in a row open
+  it. While open, calls return the fallback at once. After
+  LLM_BREAKER_COOLDOWN_SECONDS one trial call goes through: success closes the
+  breaker, failure keeps it open for another cooldown.
+
+The fallback is an AIMessage with response_metadata["fallback"] set to the
+reason (deadline / breaker_open / timeout / error). It isn't cached.
+Counters: GET /resilience/stats and GET /metrics.
+"""
+import asyncio
+import random
+import time
+from collections import Counter as Counts, deque
+from contextvars import ContextVar
+
+from langchain_core.messages import AIMessage
+
+from app.core.config import (
+    LLM_BREAKER_COOLDOWN_SECONDS,
+    LLM_BREAKER_FAILURES,
+    LLM_FALLBACK_MESSAGE,
+    LLM_GUARD_ENABLED,
+    LLM_HEDGE_ENABLED,
+    LLM_HEDGE_MIN_DELAY_MS,
+    LLM_HEDGE_MIN_SAMPLES,
+    LLM_HEDGE_QUANTILE,
+    LLM_MAX_RETRIES,
+    LLM_RETRY_BASE_MS,
+    LLM_RETRY_MAX_MS,
+    LLM_TURN_DEADLINE_SECONDS,
+)
+from app.core.metrics import Counter, Gauge, registry
+
+llm_guard_events = registry.register(Counter(
+    "llm_guard_events_total", "LLM resilience events (hedged / hedge_won / retried / timeout / fallback ...)",
+    ("model", "event")))
+
+turn_deadline_var: ContextVar[float | None] = ContextVar("turn_deadline", default=None)
+
+
+def start_turn(budget: float = LLM_TURN_DEADLINE_SECONDS):
+    """Starts the LLM deadline budget of a chat turn (inherited by the graph's tasks)."""
+    turn_deadline_var.set(time.monotonic() + budget)
+
+
+def is_retryable(error: Exception) -> bool:
+    status = getattr(error, "status_code", None)
+    if status is not None:
+        return status == 429 or status >= 500
+    import openai       # already loaded by the client that raised
+    return isinstance(error, openai.APIConnectionError)     # includes APITimeoutError
+
+
+def retry_after(error: Exception) -> float | None:
+    response = getattr(error, "response", None)
+    try:
+        return float(response.headers["retry-after"])
+    except (AttributeError, KeyError, TypeError, ValueError):
+        return None
+
+
+def is_fallback(message) -> bool:
+    return bool(getattr(message, "response_metadata", {}).get("fallback"))
+
+
+class CircuitBreaker:
+    def __init__(self, failures: int = LLM_BREAKER_FAILURES, cooldown: float = LLM_BREAKER_COOLDOWN_SECONDS):
+        self.failures = failures
+        self.cooldown = cooldown
+        self.consecutive = 0
+        self.open = False
+        self.retry_at = 0.0
+        self.opened = 0
+
+    def allow(self) -> bool:
+        if not self.open:
+            return True
+        now = time.monotonic()
+        if now < self.retry_at:
+            return False
+        # Half-open: one trial call per cooldown
+        self.retry_at = now + self.cooldown
+        return True
+
+    def record_success(self):
+        self.consecutive = 0
+        self.open = False
+
+    def record_failure(self):
+        self.consecutive += 1
+        if self.open or self.consecutive >= self.failures:
+            if not self.open:
+                self.opened += 1
+                print(f"⚠️ LLM circuit breaker open after {self.consecutive} failures")
+            self.open = True
+            self.retry_at = time.monotonic() + self.cooldown
+
+    def stats(self) -> dict:
+        return {
+            "state": "open" if self.open else "closed",
+            "consecutive_failures": self.consecutive,
+            "opened": self.opened,
+            "retry_in_s": round(max(0.0, self.retry_at - time.monotonic()), 1) if self.open else 0.0,
+        }
+
+
+class LLMGuard:
+    def __init__(
+        self,
+        enabled: bool = LLM_GUARD_ENABLED,
+        hedge: bool = LLM_HEDGE_ENABLED,
+        hedge_quantile: float = LLM_HEDGE_QUANTILE,
+        hedge_min_delay_ms: float = LLM_HEDGE_MIN_DELAY_MS,
+        hedge_min_samples: int = LLM_HEDGE_MIN_SAMPLES,
+        max_retries: int = LLM_MAX_RETRIES,
+        retry_base_ms: float = LLM_RETRY_BASE_MS,
+        retry_max_ms: float = LLM_RETRY_MAX_MS,
+        samples: int = 200,
+    ):
+        self.enabled = enabled
+        self.hedge = hedge
+        self.hedge_quantile = hedge_quantile
+        self.hedge_min_delay = hedge_min_delay_ms / 1000
+        self.hedge_min_samples = hedge_min_samples
+        self.max_retries = max_retries
+        self.retry_base = retry_base_ms / 1000
+        self.retry_max = retry_max_ms / 1000
+        self.samples = samples
+        self.breakers = {}      # model -> CircuitBreaker
+        self.latencies = {}     # model -> recent successful call latencies
+        self.counts = Counts()
+
+    @property
+    def client_retries(self) -> int:
+        """max_retries for the ChatOpenAI clients: the guard does the retrying."""
+        return 0 if self.enabled else self.max_retries
+
+    def _count(self, model: str, event: str):
+        self.counts[event] += 1
+        llm_guard_events.inc(model, event)
+
+    def _breaker(self, model: str) -> CircuitBreaker:
+        breaker = self.breakers.get(model)
+        if breaker is None:
+            breaker = self.breakers[model] = CircuitBreaker()
+        return breaker
+
+    def hedge_delay(self, model: str) -> float | None:
+        times = self.latencies.get(model)
+        if not self.hedge or not times or len(times) < self.hedge_min_samples:
+            return None
+        values = sorted(times)
+        return max(self.hedge_min_delay, values[min(len(values) - 1, int(len(values) * self.hedge_quantile))])
+
+    def backoff(self, attempt: int, error: Exception) -> float:
+        delay = random.uniform(0, min(self.retry_max, self.retry_base * 2 ** attempt))
+        return max(delay, retry_after(error) or 0.0)
+
+    def fallback(self, model: str, reason: str) -> AIMessage:
+        self._count(model, "fallback")
+        return AIMessage(content=LLM_FALLBACK_MESSAGE, response_metadata={"fallback": reason})
+
+    async def ainvoke(self, llm, messages, model: str):
+        """llm.ainvoke(messages) with deadline, hedging, retries and the circuit breaker."""
+        if not self.enabled:
+            return await llm.ainvoke(messages)
+
+        self._count(model, "calls")
+        deadline = turn_deadline_var.get() or time.monotonic() + LLM_TURN_DEADLINE_SECONDS
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            self._count(model, "deadline")
+            return self.fallback(model, "deadline")
+        breaker = self._breaker(model)
+        if not breaker.allow():
+            self._count(model, "short_circuited")
+            return self.fallback(model, "breaker_open")
+
+        try:
+            response = await asyncio.wait_for(self._hedged(llm, messages, model, deadline), remaining)
+        except asyncio.TimeoutError:
+            self._count(model, "timeout")
+            breaker.record_failure()
+            return self.fallback(model, "timeout")
+        except Exception as e:
+            if not is_retryable(e):
+                raise       # a bad request is a bug, not an outage
+            self._count(model, "failed")
+            breaker.record_failure()
+            print(f"⚠️ LLM call to {model} failed: {type(e).__name__}: {e}")
+            return self.fallback(model, "error")
+        breaker.record_success()
+        return response
+
+    async def _hedged(self, llm, messages, model: str, deadline: float):
+        primary = asyncio.ensure_future(self._with_retries(llm, messages, model, deadline))
+        delay = self.hedge_delay(model)
+        if delay is None:
+            return await primary
+
+        pending = {primary}
+        try:
+            done, pending = await asyncio.wait(pending, timeout=delay)
+            if not done:
+                self._count(model, "hedged")
+                pending.add(asyncio.ensure_future(
+                    self._with_retries(llm, messages, model, deadline, silent=True)))
+            error = None
+            while pending or done:
+                for task in done:
+                    if task.exception() is None:
+                        if task is not primary:
+                            self._count(model, "hedge_won")
+                        return task.result()
+                    error = task.exception()
+                if not pending:
+                    break
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()       # the loser
+
+    async def _with_retries(self, llm, messages, model: str, deadline: float, silent: bool = False):
+        # The hedge runs without the turn's callbacks: no duplicate tokens or metrics
+        config = {"callbacks": []} if silent else None
+        attempt = 0
+        while True:
+            started = time.monotonic()
+            try:
+                response = await llm.ainvoke(messages, config)
+            except Exception as e:
+                if attempt >= self.max_retries or not is_retryable(e):
+                    raise
+                delay = self.backoff(attempt, e)
+                if time.monotonic() + delay >= deadline:
+                    raise
+                self._count(model, "retried")
+                attempt += 1
+                await asyncio.sleep(delay)
+                continue
+            times = self.latencies.get(model)
+            if times is None:
+                times = self.latencies[model] = deque(maxlen=self.samples)
+            times.append(time.monotonic() - started)
+            return response
+
+    def stats(self) -> dict:
+        models = {}
+        for model in sorted(set(self.breakers) | set(self.latencies)):
+            delay = self.hedge_delay(model)
+            models[model] = {
+                **self._breaker(model).stats(),
+                "hedge_delay_ms": round(delay * 1000, 1) if delay is not None else None,
+                "samples": len(self.latencies.get(model) or ()),
+            }
+        return {
+            "enabled": self.enabled,
+            "hedging": self.hedge,
+            "turn_deadline_s": LLM_TURN_DEADLINE_SECONDS,
+            "max_retries": self.max_retries,
+            **{event: self.counts[event] for event in (
+                "calls", "hedged", "hedge_won", "retried", "timeout", "failed", "deadline",
+                "short_circuited", "fallback")},
+            "models": models,
+        }
+
+
+llm_guard = LLMGuard()
+
+registry.register(Gauge("llm_breakers_open", "LLM circuit breakers currently open",
+                        lambda: sum(b.open for b in llm_guard.breakers.values())))
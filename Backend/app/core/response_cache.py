@@ -0,0 +1,241 @@
+"""
+Local cache of loan assistant answers to repeated general questions
+("what documents do I need for a refinance?", "how does the process work?").
+
+Only questions that match one of the FAQ_INTENTS allow-list are cached: the
+answer must not depend on the conversation. A question that refers back to the
+user ("my ...", "what did I say ...") or asks about their own figures
+("how much can I borrow?", "am I eligible?") is never looked up or stored.
+
+Entries are keyed on the intent and normalized question plus the phase of the
+session (verified, account exists, which loan's required fields, employment
+type, pending eligibility result, history summary), so the same words get a
+different answer before and after verification. A question matches an entry
+exactly, or fuzzily within the same intent when the content words of both
+overlap by at least RESPONSE_CACHE_SIMILARITY (Jaccard), all in-process.
+
+An answer is refused if it contains any figure (digits, amounts), anything that
+looks like an e-mail / phone number, or any value from the session state
+(name, e-mail, ids, agent details, mobile, employment type ...).
+"""
+import re
+import threading
+import time
+from collections import Counter, OrderedDict
+
+from app.core.config import (
+    RESPONSE_CACHE_ENABLED,
+    RESPONSE_CACHE_SIMILARITY,
+    RESPONSE_CACHE_SIZE,
+    RESPONSE_CACHE_TTL_SECONDS,
+)
+
+QUESTION_WORDS = {
+    "what", "whats", "which", "how", "why", "when", "where", "who",
+    "can", "could", "do", "does", "is", "are", "should", "will", "tell", "explain",
+}
+
+STOPWORDS = {
+    "a", "an", "the", "i", "me", "my", "we", "you", "your", "it", "its", "is", "are", "am",
+    "do", "does", "did", "to", "for", "of", "in", "on", "at", "with", "and", "or", "be",
+    "can", "could", "would", "should", "will", "please", "tell", "about", "there", "this",
+    "that", "what", "whats", "which", "how", "hi", "hey", "hello", "so", "just", "any", "s",
+}
+
+EMAIL_RE = re.compile(r"[\w.+-]+@[\w-]+\.[\w.]+")
+PHONE_RE = re.compile(r"(?:\d[\s().-]*){10}")
+# Amounts, percentages, dates, references: anything with a figure is about someone
+FIGURE_RE = re.compile(r"[\d$€£₹%]")
+
+# Session fields holding the user's (and their agent's) data, nested values included
+PERSONAL_STATE_KEYS = ("user_account", "bank_agent", "pending_mobile")
+
+# Questions about the user's own data or results: the answer depends on the conversation
+PERSONAL_WORDS = {
+    "my", "mine", "myself", "am", "say", "said", "told", "gave", "entered", "provided",
+    "much", "max", "maximum", "borrow", "afford", "qualify", "eligible", "approved", "status",
+    "owe", "income", "salary", "expenses", "submitted", "reference",
+}
+
+
+def normalize(text: str) -> str:
+    text = text.strip().lower().replace("’", "'").replace("'", "")
+    text = re.sub(r"[^\w\s]", " ", text)
+    return " ".join(text.split())
+
+
+def _stem(word: str) -> str:
+    for suffix in ("ing", "ed", "es", "s", "e"):
+        if len(word) > len(suffix) + 2 and word.endswith(suffix):
+            return word[:-len(suffix)]
+    return word
+
+
+def content_words(normalized: str) -> frozenset:
+    return frozenset(_stem(word) for word in normalized.split() if word not in STOPWORDS)
+
+
+# General questions whose answer is the same for everyone in a phase: intent -> trigger words
+FAQ_INTENTS = {
+    intent: frozenset(_stem(word) for word in words)
+    for intent, words in {
+        "documents": ("document", "documents", "paperwork", "requirements", "required", "proof"),
+        "loan_types": ("types", "kinds", "options", "offer", "products"),
+        "refinance": ("refinance", "refinancing"),
+        "process": ("process", "steps", "apply"),
+        "verification": ("verify", "verification", "otp", "code"),
+        "eligibility_rules": ("criteria", "decided", "calculated", "checked"),
+    }.items()
+}
+
+
+def phase_key(state) -> tuple:
+    """Session fields that change what the right answer is."""
+    return (
+        bool(state.get("is_verified")),
+        state.get("account_exists"),
+        tuple(state.get("required_fields") or ()),
+        state.get("employment_type") or "",
+        bool(state.get("eligibility_pending")),
+        state.get("history_summary") or "",
+    )
+
+
+def is_informational(text: str) -> bool:
+    normalized = normalize(text)
+    words = normalized.split()
+    if len(words) < 3 or any(ch.isdigit() for ch in normalized) or EMAIL_RE.search(text):
+        return False
+    return text.strip().endswith("?") or words[0] in QUESTION_WORDS
+
+
+def faq_intent(text: str) -> str | None:
+    """The allow-listed FAQ intent of a general question, None for anything else."""
+    if not is_informational(text):
+        return None
+    normalized = normalize(text)
+    if PERSONAL_WORDS.intersection(normalized.split()):
+        return None
+    words = content_words(normalized)
+    return next((intent for intent, triggers in FAQ_INTENTS.items() if words & triggers), None)
+
+
+def _scalars(value):
+    if isinstance(value, dict):
+        for item in value.values():
+            yield from _scalars(item)
+    elif isinstance(value, (list, tuple, set)):
+        for item in value:
+            yield from _scalars(item)
+    elif isinstance(value, (str, int, float)) and not isinstance(value, bool):
+        yield str(value)
+
+
+def personal_values(state) -> list[str]:
+    """The user's and their agent's values held in the session, lowercased."""
+    values = []
+    for key in PERSONAL_STATE_KEYS:
+        for item in _scalars(state.get(key)):
+            values.append(item.lower())
+            # Individual parts too ("Hi John" must not be cached)
+            values.extend(part.lower() for part in item.split())
+    return [value for value in values if len(value) >= 3]
+
+
+def contains_personal_data(answer: str, state) -> bool:
+    if EMAIL_RE.search(answer) or PHONE_RE.search(answer):
+        return True
+    lowered = answer.lower()
+    return any(value in lowered for value in personal_values(state))
+
+
+class ResponseCache:
+    """LRU + TTL map of (phase, intent, question) -> answer, with fuzzy lookup inside a phase and intent."""
+
+    def __init__(self, max_entries: int = RESPONSE_CACHE_SIZE, ttl: float = RESPONSE_CACHE_TTL_SECONDS,
+                 similarity: float = RESPONSE_CACHE_SIMILARITY):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.similarity = similarity
+        self._entries = OrderedDict()     # (phase, intent, normalized) -> (answer, words, stored_at)
+        self._lock = threading.Lock()
+        self.counts = Counter()
+
+    def _expired(self, stored_at: float, now: float) -> bool:
+        return now - stored_at > self.ttl
+
+    def get(self, state, question: str) -> str | None:
+        intent = faq_intent(question)
+        if intent is None:
+            self.counts["skipped"] += 1
+            return None
+
+        self.counts["lookups"] += 1
+        key = (phase_key(state), intent, normalize(question))
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and not self._expired(entry[2], now):
+                self._entries.move_to_end(key)
+                self.counts["exact_hits"] += 1
+                return entry[0]
+
+            words = content_words(key[2])
+            best, best_score = None, 0.0
+            for other, (answer, entry_words, stored_at) in self._entries.items():
+                if other[:2] != key[:2] or self._expired(stored_at, now) or not (words and entry_words):
+                    continue
+                score = len(words & entry_words) / len(words | entry_words)
+                if score > best_score:
+                    best, best_score = other, score
+
+            if best is not None and best_score >= self.similarity:
+                self._entries.move_to_end(best)
+                self.counts["fuzzy_hits"] += 1
+                return self._entries[best][0]
+
+        self.counts["misses"] += 1
+        return None
+
+    def put(self, state, question: str, answer: str) -> bool:
+        intent = faq_intent(question)
+        if not answer or intent is None:
+            return False
+        if FIGURE_RE.search(answer):
+            self.counts["rejected_figures"] += 1
+            return False
+        if contains_personal_data(answer, state):
+            self.counts["rejected_personal_data"] += 1
+            return False
+
+        key = (phase_key(state), intent, normalize(question))
+        now = time.monotonic()
+        with self._lock:
+            self._entries[key] = (answer, content_words(key[2]), now)
+            self._entries.move_to_end(key)
+            self.counts["stores"] += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.counts["evictions"] += 1
+            # Drop expired entries from the cold end
+            while self._entries:
+                key, (_, _, stored_at) = next(iter(self._entries.items()))
+                if not self._expired(stored_at, now):
+                    break
+                del self._entries[key]
+                self.counts["expired"] += 1
+        return True
+
+    def stats(self) -> dict:
+        hits = self.counts["exact_hits"] + self.counts["fuzzy_hits"]
+        lookups = self.counts["lookups"]
+        return {
+            "enabled": RESPONSE_CACHE_ENABLED,
+            "entries": len(self._entries),
+            **self.counts,
+            "hits": hits,
+            "hit_ratio": round(hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+response_cache = ResponseCache()
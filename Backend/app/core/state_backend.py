@@ -0,0 +1,343 @@
+"""
+Shared key/value state for everything that must outlive one worker process:
+hibernated / released sessions ("session:<thread_id>"), OTPs ("otp:<mobile>")
+and per-session turn locks ("lock:<name>").
+
+Two implementations with the same small API:
+
+  SQLiteStateBackend  one SQLite (WAL) file; every worker on the host opens it
+  RedisStateBackend   any server speaking the Redis protocol (RESP); the client
+                      is a few dozen lines over a socket pool, no extra package
+
+Values are bytes with an optional TTL. Expired keys are invisible to reads
+right away; `sweep()` deletes them (a no-op on Redis, which expires keys itself)
+and runs in the background via `sweep_forever()`.
+
+The API is synchronous like the checkpointer that uses it; async callers go
+through asyncio.to_thread. `delete_if_equals` is the one atomic primitive the
+rest is built on: OTP verify-and-delete and lock release.
+"""
+import asyncio
+import random
+from abc import ABC, abstractmethod
+import socket
+import threading
+import time
+import uuid
+from contextlib import asynccontextmanager
+from functools import cache
+from queue import Empty, LifoQueue
+from urllib.parse import urlparse
+
+from app.core.config import (
+    SESSION_STORE_PATH,
+    STATE_BACKEND,
+    STATE_REDIS_POOL_SIZE,
+    STATE_REDIS_URL,
+    STATE_SWEEP_INTERVAL_SECONDS,
+)
+from app.core.metrics import Counter, Histogram, registry
+from app.db.session import get_connection
+
+lock_wait = registry.register(Histogram(
+    "state_lock_wait_seconds", "Time spent waiting for a shared state lock"))
+swept_keys = registry.register(Counter(
+    "state_swept_keys_total", "Expired keys removed from the shared state backend"))
+
+
+class StateBackend(ABC):
+    name = "base"
+
+    @abstractmethod
+    def get(self, key: str) -> bytes | None:
+        ...
+
+    @abstractmethod
+    def set(self, key: str, value: bytes, ttl: float | None = None):
+        ...
+
+    @abstractmethod
+    def set_if_absent(self, key: str, value: bytes, ttl: float) -> bool:
+        ...
+
+    @abstractmethod
+    def delete(self, key: str):
+        ...
+
+    @abstractmethod
+    def delete_if_equals(self, key: str, value: bytes) -> bool:
+        """Atomically deletes key if it currently holds value; True when it did."""
+
+    @abstractmethod
+    def count(self, prefix: str) -> tuple[int, int | None]:
+        """(keys, total value bytes or None if unknown) under prefix."""
+
+    def sweep(self) -> int:
+        """Deletes expired keys, returns how many."""
+        return 0
+
+    def close(self):
+        pass
+
+    @asynccontextmanager
+    async def lock(self, name: str, ttl: float, timeout: float | None = None):
+        """
+        Cross-worker mutex. Held for at most `ttl` seconds (so a crashed worker
+        can't wedge a session forever); waits up to `timeout` (default ttl).
+        """
+        key, token = f"lock:{name}", uuid.uuid4().hex.encode()
+        started = time.monotonic()
+        deadline = started + (ttl if timeout is None else timeout)
+        delay = 0.005
+        while not await asyncio.to_thread(self.set_if_absent, key, token, ttl):
+            if time.monotonic() >= deadline:
+                raise TimeoutError(f"state lock {name!r} is busy")
+            await asyncio.sleep(delay * random.uniform(0.5, 1.5))
+            delay = min(delay * 2, 0.1)
+        lock_wait.observe(time.monotonic() - started)
+        try:
+            yield
+        finally:
+            await asyncio.to_thread(self.delete_if_equals, key, token)
+
+
+# --- SQLite file ---
+
+class SQLiteStateBackend(StateBackend):
+    name = "sqlite"
+
+    def __init__(self, path: str = SESSION_STORE_PATH):
+        self.path = path
+        self._local = threading.local()
+        self._connections = []
+        self._lock = threading.Lock()
+        self._migrate()
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = get_connection(self.path)
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    def _migrate(self):
+        conn = self._conn()
+        with conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS kv_state (
+                    key TEXT PRIMARY KEY,
+                    value BLOB NOT NULL,
+                    expires_at REAL
+                ) WITHOUT ROWID
+            """)
+            conn.execute("""
+                CREATE INDEX IF NOT EXISTS idx_kv_state_expires_at
+                ON kv_state (expires_at) WHERE expires_at IS NOT NULL
+            """)
+
+    def get(self, key):
+        row = self._conn().execute(
+            "SELECT value FROM kv_state WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)",
+            (key, time.time()),
+        ).fetchone()
+        return row[0] if row else None
+
+    def set(self, key, value, ttl=None):
+        with self._conn() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO kv_state (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, value, time.time() + ttl if ttl else None),
+            )
+
+    def set_if_absent(self, key, value, ttl):
+        now = time.time()
+        with self._conn() as conn:
+            cur = conn.execute("""
+                INSERT INTO kv_state (key, value, expires_at) VALUES (?, ?, ?)
+                ON CONFLICT (key) DO UPDATE SET value = excluded.value, expires_at = excluded.expires_at
+                WHERE kv_state.expires_at IS NOT NULL AND kv_state.expires_at <= ?
+            """, (key, value, now + ttl, now))
+            return cur.rowcount == 1
+
+    def delete(self, key):
+        with self._conn() as conn:
+            conn.execute("DELETE FROM kv_state WHERE key = ?", (key,))
+
+    def delete_if_equals(self, key, value):
+        with self._conn() as conn:
+            cur = conn.execute(
+                "DELETE FROM kv_state WHERE key = ? AND value = ? AND (expires_at IS NULL OR expires_at > ?)",
+                (key, value, time.time()),
+            )
+            return cur.rowcount == 1
+
+    def count(self, prefix):
+        keys, size = self._conn().execute(
+            "SELECT COUNT(*), COALESCE(SUM(LENGTH(value)), 0) FROM kv_state WHERE key >= ? AND key < ?",
+            (prefix, prefix + "\U0010ffff"),
+        ).fetchone()
+        return keys, size
+
+    def sweep(self):
+        with self._conn() as conn:
+            removed = conn.execute("DELETE FROM kv_state WHERE expires_at <= ?", (time.time(),)).rowcount
+        swept_keys.inc(amount=removed)
+        return removed
+
+    def close(self):
+        with self._lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
+        self._local = threading.local()
+
+
+# --- Redis protocol ---
+
+# KEYS[1] is deleted only if it still holds ARGV[1] (OTP verify, lock release)
+DELETE_IF_EQUALS_SCRIPT = (
+    "if redis.call('GET', KEYS[1]) == ARGV[1] then return redis.call('DEL', KEYS[1]) else return 0 end"
+)
+
+
+class RedisError(Exception):
+    pass
+
+
+def encode_command(args) -> bytes:
+    out = [b"*%d\r\n" % len(args)]
+    for arg in args:
+        if isinstance(arg, str):
+            arg = arg.encode()
+        elif isinstance(arg, (int, float)):
+            arg = str(arg).encode()
+        out.append(b"$%d\r\n%s\r\n" % (len(arg), arg))
+    return b"".join(out)
+
+
+def read_reply(reader):
+    line = reader.readline()
+    if not line:
+        raise ConnectionError("connection closed by server")
+    kind, rest = line[:1], line[1:-2]
+    if kind == b"+":
+        return rest.decode()
+    if kind == b"-":
+        raise RedisError(rest.decode())
+    if kind == b":":
+        return int(rest)
+    if kind == b"$":
+        length = int(rest)
+        return None if length < 0 else reader.read(length + 2)[:-2]
+    if kind == b"*":
+        length = int(rest)
+        return None if length < 0 else [read_reply(reader) for _ in range(length)]
+    raise RedisError(f"unexpected reply {line!r}")
+
+
+class RedisStateBackend(StateBackend):
+    """Blocking RESP client with a small LIFO pool of connections (one per concurrent caller)."""
+
+    name = "redis"
+
+    def __init__(self, url: str = STATE_REDIS_URL, pool_size: int = STATE_REDIS_POOL_SIZE, timeout: float = 5.0):
+        parsed = urlparse(url)
+        self.host = parsed.hostname or "127.0.0.1"
+        self.port = parsed.port or 6379
+        self.password = parsed.password
+        self.db = int(parsed.path.lstrip("/") or 0)
+        self.timeout = timeout
+        self._pool = LifoQueue(maxsize=pool_size)
+
+    def _connect(self):
+        sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        conn = (sock, sock.makefile("rb"))
+        if self.password:
+            self._send(conn, ("AUTH", self.password))
+        if self.db:
+            self._send(conn, ("SELECT", self.db))
+        return conn
+
+    @staticmethod
+    def _send(conn, args):
+        conn[0].sendall(encode_command(args))
+        return read_reply(conn[1])
+
+    def execute(self, *args):
+        try:
+            conn = self._pool.get_nowait()
+        except Empty:
+            conn = self._connect()
+        try:
+            reply = self._send(conn, args)
+        except RedisError:
+            self._release(conn)
+            raise
+        except Exception:
+            # Broken socket: drop it, the next call opens a fresh one
+            conn[0].close()
+            raise
+        self._release(conn)
+        return reply
+
+    def _release(self, conn):
+        try:
+            self._pool.put_nowait(conn)
+        except Exception:
+            conn[0].close()
+
+    def get(self, key):
+        return self.execute("GET", key)
+
+    def set(self, key, value, ttl=None):
+        if ttl:
+            self.execute("SET", key, value, "PX", int(ttl * 1000))
+        else:
+            self.execute("SET", key, value)
+
+    def set_if_absent(self, key, value, ttl):
+        return self.execute("SET", key, value, "NX", "PX", int(ttl * 1000)) == "OK"
+
+    def delete(self, key):
+        self.execute("DEL", key)
+
+    def delete_if_equals(self, key, value):
+        return self.execute("EVAL", DELETE_IF_EQUALS_SCRIPT, 1, key, value) == 1
+
+    def count(self, prefix):
+        cursor, keys = "0", 0
+        while True:
+            cursor, batch = self.execute("SCAN", cursor, "MATCH", prefix + "*", "COUNT", 1000)
+            keys += len(batch)
+            cursor = cursor.decode() if isinstance(cursor, bytes) else cursor
+            if cursor == "0":
+                return keys, None
+
+    def close(self):
+        while True:
+            try:
+                self._pool.get_nowait()[0].close()
+            except Empty:
+                return
+
+
+@cache
+def get_state_backend() -> StateBackend:
+    if STATE_BACKEND == "redis":
+        return RedisStateBackend()
+    if STATE_BACKEND == "sqlite":
+        return SQLiteStateBackend()
+    raise ValueError(f"unknown STATE_BACKEND {STATE_BACKEND!r} (expected sqlite or redis)")
+
+
+async def sweep_forever(interval: float = STATE_SWEEP_INTERVAL_SECONDS):
+    """Background task started in the app lifespan: drops expired OTPs and stale locks."""
+    backend = get_state_backend()
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await asyncio.to_thread(backend.sweep)
+        except Exception as e:
+            print(f"⚠️ state sweep failed: {e}")
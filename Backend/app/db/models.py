@@ -1,51 +1,213 @@
-from app.db.session import get_connection
+import json
+from app.db.session import get_connection, pool
+
+# Schema version kept in PRAGMA user_version; init_db migrates older files forward
+SCHEMA_VERSION = 2
+
+LOAN_PAGE_SIZE = 5
+EXPORT_CHUNK_SIZE = 5000
+
+# Kept as constants so every call reuses the same prepared statement
+# Ids come from loan_id_allocator (not AUTOINCREMENT), so a reference can be
+# handed out before its row is written (app/db/write_behind.py). Workers reserve
+# id blocks, so id order isn't submission order: listings and exports order by
+# seq, numbered inside the inserting transaction. SQLite has one writer at a
+# time, so a seq never commits below one a reader has already seen.
+INSERT_LOAN_SQL = """
+    INSERT INTO loan_applications (id, user_id, details, status, seq)
+    VALUES (?, ?, ?, ?, (SELECT COALESCE(MAX(seq), 0) + 1 FROM loan_applications))
+"""
+
+# Reserves `count` ids, returns the first one
+ALLOCATE_LOAN_IDS_SQL = """
+    UPDATE loan_id_allocator SET next_id = next_id + ?1 WHERE id = 1 RETURNING next_id - ?1
+"""
+
+# Summary listing: small projected columns only, newest first, keyset on seq
+# (the cursor is the last row's reference)
+SELECT_LOAN_SUMMARIES_SQL = """
+    SELECT id, status, submission_date,
+           json_extract(details, '$.loan_type'),
+           json_extract(details, '$.requested_amount')
+    FROM loan_applications
+    WHERE user_id = ?1
+      AND seq < COALESCE((SELECT seq FROM loan_applications WHERE id = ?2), 9223372036854775807)
+    ORDER BY seq DESC
+    LIMIT ?3
+"""
+
+SELECT_LOAN_DETAILS_SQL = """
+    SELECT id, details, status, submission_date
+    FROM loan_applications
+    WHERE user_id = ? AND id = ?
+"""
+
+# Bulk export: ascending keyset over seq, optional status / date filters. Rows
+# committed while an export runs get a higher seq, so no chunk skips them.
+EXPORT_LOANS_SQL = """
+    SELECT id, user_id, status, submission_date, details, seq
+    FROM loan_applications
+    WHERE seq > ?1
+      AND (?2 IS NULL OR status = ?2)
+      AND (?3 IS NULL OR submission_date >= ?3)
+      AND (?4 IS NULL OR submission_date < ?4)
+    ORDER BY seq
+    LIMIT ?5
+"""
 
 def init_db():
-    with get_connection() as conn:
-        conn.execute("""
-            CREATE TABLE IF NOT EXISTS loan_applications (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id TEXT NOT NULL,
-                details TEXT NOT NULL,
-                status TEXT NOT NULL DEFAULT 'SUBMITTED',
-                submission_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
-
-def save_loan(user_id: str, details: str, status: str = "SUBMITTED") -> int:
-    with get_connection() as conn:
-        cur = conn.cursor()
-        cur.execute(
-            """
-            INSERT INTO loan_applications (user_id, details, status)
-            VALUES (?, ?, ?)
-            """,
-            (user_id, details, status),
-        )
-        conn.commit()
-        return cur.lastrowid
-    
-def get_loans_by_user(user_id: str) -> list[dict]:
-    with get_connection() as conn:
-        cur = conn.cursor()
-        cur.execute(
-            """
-            SELECT id, details, status, submission_date
-            FROM loan_applications
-            WHERE user_id = ?
-            ORDER BY submission_date DESC
-            """,
-            (user_id,),
-        )
-
-        rows = cur.fetchall()
-
-        return [
-            {
-                "loan_id": f"sub{row[0]:07d}",
-                "details": row[1],
-                "status": row[2],
-                "submission_date": row[3],
-            }
-            for row in rows
-        ]
+    conn = get_connection()
+    try:
+        with conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS loan_applications (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    user_id TEXT NOT NULL,
+                    details TEXT NOT NULL,
+                    status TEXT NOT NULL DEFAULT 'SUBMITTED',
+                    submission_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+            # Operations queries / exports by status and date range
+            conn.execute("""
+                CREATE INDEX IF NOT EXISTS idx_loan_applications_status_date
+                ON loan_applications (status, submission_date)
+            """)
+            conn.execute("DROP INDEX IF EXISTS idx_loan_applications_user_date")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS loan_id_allocator (
+                    id INTEGER PRIMARY KEY CHECK (id = 1),
+                    next_id INTEGER NOT NULL
+                )
+            """)
+            conn.execute("""
+                INSERT OR IGNORE INTO loan_id_allocator (id, next_id)
+                SELECT 1, COALESCE(MAX(id), 0) + 1 FROM loan_applications
+            """)
+
+            version = conn.execute("PRAGMA user_version").fetchone()[0]
+            if version < 1:
+                # details used to be free text; store it as JSON so it can be queried
+                conn.execute("""
+                    UPDATE loan_applications
+                    SET details = json_object('text', details)
+                    WHERE json_valid(details) = 0 OR json_type(details) != 'object'
+                """)
+            if version < 2:
+                # Existing rows are numbered in the best order known: submission time, then id
+                conn.execute("ALTER TABLE loan_applications ADD COLUMN seq INTEGER")
+                conn.execute("""
+                    UPDATE loan_applications SET seq = ordered.n
+                    FROM (SELECT id, ROW_NUMBER() OVER (ORDER BY submission_date, id) AS n
+                          FROM loan_applications) AS ordered
+                    WHERE loan_applications.id = ordered.id
+                """)
+            conn.execute("""
+                CREATE UNIQUE INDEX IF NOT EXISTS idx_loan_applications_seq
+                ON loan_applications (seq)
+            """)
+            # Serves WHERE user_id = ? AND seq < ? ORDER BY seq DESC (keyset pages)
+            conn.execute("""
+                CREATE INDEX IF NOT EXISTS idx_loan_applications_user_seq
+                ON loan_applications (user_id, seq)
+            """)
+            conn.execute("DROP INDEX IF EXISTS idx_loan_applications_user_id")
+            conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+    finally:
+        conn.close()
+
+def normalize_details(details) -> str:
+    """Application details as a compact JSON object; free text becomes {"text": ...}."""
+    if isinstance(details, str):
+        try:
+            parsed = json.loads(details)
+        except ValueError:
+            parsed = None
+        details = parsed if isinstance(parsed, dict) else {"text": details}
+    return json.dumps(details, ensure_ascii=False, separators=(",", ":"))
+
+def loan_ref(loan_id: int) -> str:
+    return f"sub{loan_id:07d}"
+
+def parse_loan_ref(ref) -> int | None:
+    ref = str(ref).strip().lower().removeprefix("sub")
+    return int(ref) if ref.isdigit() else None
+
+def _allocate_loan_ids(conn, count: int) -> int:
+    with conn:
+        return conn.execute(ALLOCATE_LOAN_IDS_SQL, (count,)).fetchone()[0]
+
+def _save_loan(conn, user_id: str, details: str, status: str) -> int:
+    with conn:
+        loan_id = conn.execute(ALLOCATE_LOAN_IDS_SQL, (1,)).fetchone()[0]
+        conn.execute(INSERT_LOAN_SQL, (loan_id, user_id, normalize_details(details), status))
+        return loan_id
+
+def _insert_loans(conn, rows: list[tuple]) -> int:
+    """Inserts (id, user_id, details, status) rows in one transaction (one commit)."""
+    with conn:
+        conn.executemany(INSERT_LOAN_SQL, rows)
+    return len(rows)
+
+def _get_loan_page(conn, user_id: str, before: int | None, limit: int) -> dict:
+    # One extra row tells whether another page exists
+    rows = conn.execute(
+        SELECT_LOAN_SUMMARIES_SQL, (user_id, before, limit + 1)
+    ).fetchall()
+
+    loans = [
+        {
+            "loan_id": loan_ref(row[0]),
+            "status": row[1],
+            "submission_date": row[2],
+            "loan_type": row[3],
+            "requested_amount": row[4],
+        }
+        for row in rows[:limit]
+    ]
+    next_cursor = loan_ref(rows[limit - 1][0]) if len(rows) > limit else None
+    return {"loans": loans, "next_cursor": next_cursor}
+
+def _get_loan_details(conn, user_id: str, loan_id: int) -> dict | None:
+    row = conn.execute(SELECT_LOAN_DETAILS_SQL, (user_id, loan_id)).fetchone()
+    if row is None:
+        return None
+    return {
+        "loan_id": loan_ref(row[0]),
+        "details": json.loads(row[1]),
+        "status": row[2],
+        "submission_date": row[3],
+    }
+
+def _export_chunk(conn, after: int, status, since, until, limit: int) -> list[tuple]:
+    return conn.execute(EXPORT_LOANS_SQL, (after, status, since, until, limit)).fetchall()
+
+async def save_loan(user_id: str, details: str, status: str = "SUBMITTED") -> int:
+    """Writes one application in its own transaction; see write_behind.loan_writer for batching."""
+    return await pool.run(_save_loan, user_id, details, status)
+
+async def allocate_loan_ids(count: int) -> int:
+    return await pool.run(_allocate_loan_ids, count)
+
+async def insert_loans(rows: list[tuple]) -> int:
+    return await pool.run(_insert_loans, rows)
+
+async def get_loan_page(user_id: str, cursor: str | None = None, limit: int = LOAN_PAGE_SIZE) -> dict:
+    """Newest-first summaries (no details), LIMIT rows per page; pass next_cursor to continue."""
+    return await pool.run(_get_loan_page, user_id, parse_loan_ref(cursor) if cursor else None, limit)
+
+async def get_loan_by_ref(user_id: str, loan_ref_or_id) -> dict | None:
+    loan_id = parse_loan_ref(loan_ref_or_id)
+    if loan_id is None:
+        return None
+    return await pool.run(_get_loan_details, user_id, loan_id)
+
+async def iter_loans(status=None, since=None, until=None, chunk_size: int = EXPORT_CHUNK_SIZE):
+    """Yields export rows (id, user_id, status, submission_date, details, seq) chunk by chunk."""
+    after = 0
+    while True:
+        rows = await pool.run(_export_chunk, after, status, since, until, chunk_size)
+        if not rows:
+            return
+        yield rows
+        after = rows[-1][5]
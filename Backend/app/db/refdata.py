@@ -0,0 +1,176 @@
+"""
+Read-only ZIP / bank agent reference store.
+
+The data lives in one prebuilt binary file that is memory-mapped, so every
+worker process on a host shares the same page-cache copy instead of holding
+its own dicts. Layout (little endian):
+
+    header   8s magic, I record count (zips), I record count (agents)
+    index    100000 x uint32 for ZIPs, then 100000 x uint32 for agents;
+             value = 1 + offset of the record in the data section, 0 = missing
+    data     records: uint16 length + compact JSON (utf-8)
+
+A ZIP is its own index slot, so a lookup is two struct reads and one JSON
+decode; hot entries are kept in a small LRU on top.
+
+Build it from CSV source data:
+
+    python -m app.db.refdata --zips zips.csv --agents agents.csv --out data/refdata.bin
+    python -m app.db.refdata --from-mock --out data/refdata.bin
+"""
+import argparse
+import csv
+import json
+import mmap
+import os
+import struct
+from functools import cache, lru_cache
+
+from app.core.config import REFDATA_PATH, REFDATA_CACHE_SIZE
+
+MAGIC = b"ZIPREF01"
+HEADER = struct.Struct("<8sII")
+SLOTS = 100000
+SLOT = struct.Struct("<I")
+LENGTH = struct.Struct("<H")
+
+ZIP_FIELDS = ["country", "state", "state_code", "county", "city", "area", "serviceable", "risk_zone", "metro"]
+AGENT_FIELDS = ["agent_id", "name", "branch", "phone", "email"]
+
+
+class RefDataStore:
+    """O(1) ZIP and agent lookups over a memory-mapped reference file."""
+
+    source = "REFDATA_STORE"
+
+    def __init__(self, path: str, cache_size: int = REFDATA_CACHE_SIZE):
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.zip_count, self.agent_count = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a reference data file")
+        self._zip_index = HEADER.size
+        self._agent_index = self._zip_index + SLOTS * SLOT.size
+        self._data = self._agent_index + SLOTS * SLOT.size
+
+        self.zip_info = lru_cache(maxsize=cache_size)(self._zip_info)
+        self.agent_info = lru_cache(maxsize=cache_size)(self._agent_info)
+
+    def _record(self, index_offset: int, zip_code: str):
+        if len(zip_code) != 5 or not zip_code.isdigit():
+            return None
+        (slot,) = SLOT.unpack_from(self._mm, index_offset + int(zip_code) * SLOT.size)
+        if not slot:
+            return None
+        start = self._data + slot - 1
+        (length,) = LENGTH.unpack_from(self._mm, start)
+        return json.loads(self._mm[start + LENGTH.size:start + LENGTH.size + length])
+
+    def _zip_info(self, zip_code: str):
+        return self._record(self._zip_index, zip_code)
+
+    def _agent_info(self, zip_code: str):
+        return self._record(self._agent_index, zip_code)
+
+    def stats(self) -> dict:
+        zip_cache, agent_cache = self.zip_info.cache_info(), self.agent_info.cache_info()
+        return {
+            "source": self.source,
+            "file_bytes": len(self._mm),
+            "zips": self.zip_count,
+            "agents": self.agent_count,
+            "cache_hits": zip_cache.hits + agent_cache.hits,
+            "cache_misses": zip_cache.misses + agent_cache.misses,
+        }
+
+
+class MockRefDataStore:
+    """Fallback over the in-repo mock dicts when no reference file has been built."""
+
+    source = "MOCK_US_ZIP_STORE"
+
+    def __init__(self):
+        from app.mock.data import MOCK_AGENT_INFO, MOCK_US_ZIP_STORE
+        self._zips = MOCK_US_ZIP_STORE
+        self._agents = MOCK_AGENT_INFO
+
+    def zip_info(self, zip_code: str):
+        return self._zips.get(zip_code)
+
+    def agent_info(self, zip_code: str):
+        return self._agents.get(zip_code)
+
+    def stats(self) -> dict:
+        return {"source": self.source, "zips": len(self._zips), "agents": len(self._agents)}
+
+
+@cache
+def get_refdata():
+    if os.path.exists(REFDATA_PATH):
+        return RefDataStore(REFDATA_PATH)
+    return MockRefDataStore()
+
+
+# --- build command ---
+
+def _parse_bool(value) -> bool:
+    return str(value).strip().lower() in ("1", "true", "yes", "y")
+
+
+def _read_csv(path: str, fields: list[str]) -> dict:
+    records = {}
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            zip_code = row["zip_code"].strip().zfill(5)
+            record = {field: row.get(field, "").strip() for field in fields}
+            if "serviceable" in record:
+                record["serviceable"] = _parse_bool(record["serviceable"])
+            records[zip_code] = record
+    return records
+
+
+def build(zips: dict, agents: dict, out: str):
+    """Writes the binary reference file atomically."""
+    data = bytearray()
+    indexes = []
+    for records in (zips, agents):
+        index = [0] * SLOTS
+        for zip_code, record in records.items():
+            payload = json.dumps(record, separators=(",", ":")).encode("utf-8")
+            index[int(zip_code)] = len(data) + 1
+            data += LENGTH.pack(len(payload)) + payload
+        indexes.append(index)
+
+    os.makedirs(os.path.dirname(out) or ".", exist_ok=True)
+    tmp = out + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(HEADER.pack(MAGIC, len(zips), len(agents)))
+        for index in indexes:
+            f.write(struct.pack(f"<{SLOTS}I", *index))
+        f.write(data)
+    os.replace(tmp, out)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the ZIP / agent reference data file")
+    parser.add_argument("--zips", help="CSV with zip_code," + ",".join(ZIP_FIELDS))
+    parser.add_argument("--agents", help="CSV with zip_code," + ",".join(AGENT_FIELDS))
+    parser.add_argument("--from-mock", action="store_true", help="build from app/mock/data.py")
+    parser.add_argument("--out", default=REFDATA_PATH)
+    args = parser.parse_args()
+
+    if args.from_mock:
+        from app.mock.data import MOCK_AGENT_INFO, MOCK_US_ZIP_STORE
+        zips, agents = MOCK_US_ZIP_STORE, MOCK_AGENT_INFO
+    elif args.zips:
+        zips = _read_csv(args.zips, ZIP_FIELDS)
+        agents = _read_csv(args.agents, AGENT_FIELDS) if args.agents else {}
+    else:
+        parser.error("pass --zips (and optionally --agents) or --from-mock")
+
+    build(zips, agents, args.out)
+    print(f"Wrote {len(zips)} ZIPs and {len(agents)} agents to {args.out} ({os.path.getsize(args.out)} bytes)")
+
+
+if __name__ == "__main__":
+    main()
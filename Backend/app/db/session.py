@@ -1,5 +1,80 @@
+import asyncio
 import sqlite3
-from app.core.config import DB_PATH
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from app.core.config import DB_PATH, DB_POOL_SIZE
 
-def get_connection():
-    return sqlite3.connect(DB_PATH)
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",     # safe with WAL, avoids an fsync per commit
+    "PRAGMA busy_timeout=5000",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-16000",      # ~16 MB page cache per connection
+    "PRAGMA mmap_size=268435456",
+)
+
+def get_connection(path: str = DB_PATH):
+    conn = sqlite3.connect(path, check_same_thread=False, cached_statements=256)
+    for pragma in PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
+
+class ConnectionPool:
+    """
+    Async access to SQLite without blocking the event loop.
+
+    Queries run on a fixed set of worker threads; each worker owns one long-lived
+    connection, so the pool size is the number of threads. sqlite3 keeps a
+    per-connection cache of prepared statements keyed by SQL text, so queries
+    that reuse the same SQL string skip re-preparation.
+    """
+
+    def __init__(self, size: int = DB_POOL_SIZE):
+        self.size = size
+        self._executor = None
+        self._local = threading.local()
+        self._connections = []
+        self._lock = threading.Lock()
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = get_connection()
+            self._local.conn = conn
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    def _call(self, fn, args):
+        return fn(self._connection(), *args)
+
+    async def run(self, fn, *args):
+        """Runs fn(conn, *args) on a pooled connection."""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.size, thread_name_prefix="db")
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self._call, fn, args)
+
+    async def warm_up(self):
+        """Opens one connection on every worker thread before traffic arrives."""
+        barrier = threading.Barrier(self.size)
+
+        def open_connection(conn):
+            conn.execute("SELECT 1").fetchone()
+            # Hold every worker until all have started, so each thread opens its own connection
+            barrier.wait(timeout=5)
+
+        await asyncio.gather(*(self.run(open_connection) for _ in range(self.size)))
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        with self._lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
+
+
+pool = ConnectionPool()
@@ -0,0 +1,191 @@
+"""
+Write-behind queue for loan submissions.
+
+submit() reserves the application's id right away (ids come from
+loan_id_allocator in blocks of LOAN_ID_BLOCK_SIZE, one small transaction per
+block) and queues the row. A background task group-commits the queue:
+after the first row it keeps collecting for as long as more rows keep arriving,
+up to LOAN_WRITE_BATCH_SIZE rows or LOAN_WRITE_MAX_DELAY_MS, and inserts the
+batch with executemany in one transaction, so N applications cost one commit
+instead of N. A lone submission is committed right away; rows that arrive
+while a batch is committing form the next one.
+
+Durable mode (the default, LOAN_WRITE_DURABLE=1) returns the id only once the
+row's batch has committed, and raises if it failed: a reference given to a
+customer always exists. With LOAN_WRITE_DURABLE=0 (or submit(durable=False))
+the id comes back right away, before the commit; failures are then only
+logged, and rows still queued when the process crashes are lost.
+
+If a batch fails, its rows are retried one by one, so one bad row doesn't sink
+the others. Rows that still fail are logged; in durable mode the caller gets
+the error. close() (app shutdown) stops intake and commits everything queued.
+References are unique but not gapless: a worker's unused ids are lost on
+restart. Nor are they ordered across workers (each reserves its own block):
+listings and exports follow the commit sequence (loan_applications.seq).
+"""
+import asyncio
+import time
+from collections import deque
+
+from app.core.config import (
+    LOAN_ID_BLOCK_SIZE,
+    LOAN_WRITE_BATCH_SIZE,
+    LOAN_WRITE_DURABLE,
+    LOAN_WRITE_MAX_DELAY_MS,
+)
+from app.db.models import allocate_loan_ids, insert_loans, loan_ref, normalize_details
+
+
+class LoanWriter:
+    def __init__(
+        self,
+        batch_size: int = LOAN_WRITE_BATCH_SIZE,
+        max_delay_ms: float = LOAN_WRITE_MAX_DELAY_MS,
+        durable: bool = LOAN_WRITE_DURABLE,
+        id_block: int = LOAN_ID_BLOCK_SIZE,
+        samples: int = 1000,
+    ):
+        self.batch_size = max(1, batch_size)
+        self.max_delay = max_delay_ms / 1000
+        self.durable = durable
+        self.id_block = max(1, id_block)
+        self.closed = False
+
+        self._loop = None
+        self._queue = None
+        self._id_lock = None
+        self._task = None
+        self._next_id = self._end_id = 0
+
+        self.commit_times = deque(maxlen=samples)
+        self.counts = {"submitted": 0, "committed": 0, "failed": 0, "batches": 0, "max_batch": 0}
+
+    def _ensure_started(self):
+        # Bound to the running loop; restarted if a new loop shows up (tests, benchmarks)
+        loop = asyncio.get_running_loop()
+        if self._loop is loop and not self._task.done():
+            return
+        self._loop = loop
+        self._queue = asyncio.Queue()
+        self._id_lock = asyncio.Lock()
+        self._task = loop.create_task(self._run())
+
+    def start(self):
+        """Called from the app lifespan; submit() also starts the queue on first use."""
+        self.closed = False
+        self._ensure_started()
+
+    async def _reserve_id(self) -> int:
+        async with self._id_lock:
+            if self._next_id >= self._end_id:
+                self._next_id = await allocate_loan_ids(self.id_block)
+                self._end_id = self._next_id + self.id_block
+            loan_id = self._next_id
+            self._next_id += 1
+            return loan_id
+
+    async def submit(self, user_id: str, details, status: str = "SUBMITTED", durable: bool | None = None) -> int:
+        """Queues one application and returns its id (after commit in durable mode)."""
+        if self.closed:
+            raise RuntimeError("loan writer is shut down")
+        self._ensure_started()
+        loan_id = await self._reserve_id()
+
+        wait = self.durable if durable is None else durable
+        future = self._loop.create_future() if wait else None
+        self._queue.put_nowait(((loan_id, user_id, normalize_details(details), status), future))
+        self.counts["submitted"] += 1
+
+        if future is not None:
+            await future
+        return loan_id
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            first = await self._queue.get()
+            deadline = loop.time() + self.max_delay
+            size = -1
+            # Yield to the loop while submissions keep coming in (the group), bounded by size / time
+            while size != self._queue.qsize() and self._queue.qsize() + 1 < self.batch_size and loop.time() < deadline:
+                size = self._queue.qsize()
+                await asyncio.sleep(0)
+
+            batch = [first]
+            while len(batch) < self.batch_size and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            try:
+                await self._commit(batch)
+            except Exception as e:
+                # Keep the writer alive: a dead task would leave flush() / close() waiting forever
+                self.counts["failed"] += len(batch)
+                print(f"⚠️ loan write batch of {len(batch)} failed: {e}")
+                for _, future in batch:
+                    if future is not None and not future.done():
+                        future.set_exception(e)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def _commit(self, batch: list):
+        rows = [row for row, _ in batch]
+        started = time.perf_counter()
+        try:
+            await insert_loans(rows)
+            errors = [None] * len(rows)
+        except Exception:
+            errors = []
+            for row in rows:
+                try:
+                    await insert_loans([row])
+                    errors.append(None)
+                except Exception as e:
+                    errors.append(e)
+        self.commit_times.append(time.perf_counter() - started)
+
+        self.counts["batches"] += 1
+        self.counts["max_batch"] = max(self.counts["max_batch"], len(rows))
+        for (row, future), error in zip(batch, errors):
+            if error is None:
+                self.counts["committed"] += 1
+                if future is not None and not future.done():
+                    future.set_result(row[0])
+            else:
+                self.counts["failed"] += 1
+                print(f"⚠️ loan {loan_ref(row[0])} for {row[1]} was not saved: {error}")
+                if future is not None and not future.done():
+                    future.set_exception(error)
+
+    async def flush(self):
+        """Waits until everything queued so far is committed (read-your-writes)."""
+        if self._queue is None or self._loop is not asyncio.get_running_loop():
+            return
+        await self._queue.join()
+
+    async def close(self):
+        """Stops accepting submissions and commits what is queued."""
+        self.closed = True
+        await self.flush()
+        if self._task is not None:
+            self._task.cancel()
+
+    def stats(self) -> dict:
+        times = sorted(self.commit_times)
+
+        def ms(q):
+            return round(times[min(len(times) - 1, int(len(times) * q))] * 1000, 2) if times else 0.0
+
+        batches = self.counts["batches"]
+        return {
+            "durable": self.durable,
+            "batch_size": self.batch_size,
+            "max_delay_ms": self.max_delay * 1000,
+            "pending": self._queue.qsize() if self._queue is not None else 0,
+            **self.counts,
+            "avg_batch": round((self.counts["committed"] + self.counts["failed"]) / batches, 2) if batches else 0.0,
+            "commit_ms_p50": ms(0.5),
+            "commit_ms_p95": ms(0.95),
+        }
+
+
+loan_writer = LoanWriter()
@@ -1,11 +1,67 @@
-from fastapi import FastAPI
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
 from app.api.chat import router
+from app.api.eligibility import router as eligibility_router
+from app.api.loans import router as loans_router
+from app.api.ws import router as ws_router
 from app.db.models import init_db
+from app.db.session import pool
+from app.db.write_behind import loan_writer
+from app.db.refdata import get_refdata
+from app.core.memory import checkpointer
+from app.core.state_backend import get_state_backend, sweep_forever
+from app.core.llm import warm_up_llm
+from app.core.metrics import new_trace_id, trace_id_var
+from app.workflows.loan_graph import get_loan_graph
+from app.workflows.account_graph import get_account_graph
+from app.agents.loan_agent import get_llm as get_loan_llm, loan_prompt_stats
+from app.agents.account_agent import get_llm as get_account_llm
+from app.agents.model_router import LOAN_PHASES
 from fastapi.middleware.cors import CORSMiddleware
 
-init_db()
+def build_agents():
+    """
+    One LLM client per phase. Blocking: building a client tokenizes its tool
+    schemas for /models/stats, and the prompt prefixes for /prompt/stats are
+    tokenized here too, so the stats endpoints never do it on the event loop.
+    """
+    for phase in LOAN_PHASES:
+        get_loan_llm(phase)
+    get_account_llm("account_opening")
+    get_account_llm()
+    loan_prompt_stats.warm_up()
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Nothing heavy happens at import time; build everything here, before readiness
+    started = time.perf_counter()
+    await asyncio.to_thread(init_db)
+    get_state_backend()
+    await asyncio.to_thread(build_agents)
+    get_account_graph()
+    get_loan_graph()
+    get_refdata()
+    await asyncio.gather(pool.warm_up(), warm_up_llm())
+    app.state.ready = True
+    app.state.warm_up_seconds = round(time.perf_counter() - started, 3)
+    print(f"--- READY in {app.state.warm_up_seconds}s ---")
+    sweeper = asyncio.create_task(sweep_forever())
+    session_sweeper = asyncio.create_task(checkpointer.sweep_forever())
+    loan_writer.start()
+    yield
+    app.state.ready = False
+    sweeper.cancel()
+    session_sweeper.cancel()
+    # Commit queued loan submissions before the DB pool goes away
+    await loan_writer.close()
+    pool.close()
+    get_state_backend().close()
+
+app = FastAPI(lifespan=lifespan)
+app.state.ready = False
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -14,3 +70,24 @@ app.add_middleware(
     allow_headers=["*"],
 )
 app.include_router(router)
+app.include_router(eligibility_router)
+app.include_router(loans_router)
+app.include_router(ws_router)
+
+@app.middleware("http")
+async def trace_id(request: Request, call_next):
+    # One trace id per request, picked up by TurnMetrics for its log lines
+    trace_id = request.headers.get("x-request-id") or new_trace_id()
+    token = trace_id_var.set(trace_id)
+    try:
+        response = await call_next(request)
+    finally:
+        trace_id_var.reset(token)
+    response.headers["X-Trace-ID"] = trace_id
+    return response
+
+@app.get("/ready")
+async def ready():
+    if not app.state.ready:
+        return JSONResponse({"ready": False}, status_code=503)
+    return {"ready": True, "warm_up_seconds": app.state.warm_up_seconds}
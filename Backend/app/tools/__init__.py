@@ -1,6 +1,6 @@
 from app.tools.zip import get_agent_info, verify_us_zip_code
 from app.tools.otp import send_otp, verify_otp_and_fetch_account
-from app.tools.loan import get_loan_requirements, check_loan_eligibility, submit_loan_application, get_user_loan_requests
+from app.tools.loan import get_loan_requirements, check_loan_eligibility, submit_loan_application, get_user_loan_requests, get_loan_details
 
 LOAN_TOOLS = [
     send_otp,
@@ -10,5 +10,6 @@ LOAN_TOOLS = [
     submit_loan_application,
     get_agent_info,
     verify_us_zip_code,
-    get_user_loan_requests
+    get_user_loan_requests,
+    get_loan_details
 ]
\ No newline at end of file
@@ -1,8 +1,9 @@
 
 from langchain_core.tools import tool
+from app.tools.artifacts import ToolArtifact, with_artifact
 
 @tool
-def transfer_back_to_loan_assistant(reason: str):
+async def transfer_back_to_loan_assistant(reason: str):
     """
     Call this tool if the user wants to cancel account opening, 
     if they mention they already have a bank account, 
@@ -10,8 +11,8 @@ def transfer_back_to_loan_assistant(reason: str):
     """
     return f"Transferring back to Loan Assistant. Reason: {reason}"
 
-@tool
-def submit_account_opening(details: dict) -> dict:
+@tool(response_format="content_and_artifact")
+async def submit_account_opening(details: dict) -> tuple[str, ToolArtifact]:
     """
     Submits a new bank account opening request.
     Args:
@@ -21,11 +22,12 @@ def submit_account_opening(details: dict) -> dict:
         A dictionary containing the created account details.
     """
     print("Inside account_assistant Tools....")
-    return {
-        "status": "success",
-        "account_details": {
-            "account_id": "ACC12345",
-            "full_name": details.get("full_name"),
-            "employment_type": details.get("employment_type")
-        }
+    account = {
+        "account_id": "ACC12345",
+        "full_name": details.get("full_name"),
+        "employment_type": details.get("employment_type")
     }
+    return with_artifact({
+        "status": "success",
+        "account_details": account
+    }, status="success", account=account)
@@ -0,0 +1,22 @@
+import json
+from typing import Any, Dict, List, Optional, TypedDict
+
+
+class ToolArtifact(TypedDict, total=False):
+    """
+    Structured side of a tool result, stored on ToolMessage.artifact.
+    The LLM only sees the message content; graph nodes (updater, fast path,
+    account collect) read these fields directly instead of parsing text.
+    """
+    status: str
+    message: str
+    account_exists: bool
+    account: Optional[Dict[str, Any]]
+    bank_agent: Dict[str, Any]
+    required_fields: List[str]
+
+
+def with_artifact(result, **artifact) -> tuple[str, ToolArtifact]:
+    """(content, artifact) pair for tools declared with response_format="content_and_artifact"."""
+    content = result if isinstance(result, str) else json.dumps(result, ensure_ascii=False)
+    return content, ToolArtifact(**artifact)
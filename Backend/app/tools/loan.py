@@ -1,9 +1,12 @@
 from langchain_core.tools import tool
-from typing import List
-from app.db.models import get_loans_by_user, save_loan
-
-@tool
-def get_loan_requirements(loan_type: str) -> List[str]:
+from typing import Optional
+from app.db.models import get_loan_by_ref, get_loan_page, loan_ref
+from app.db.write_behind import loan_writer
+from app.core.eligibility import MIN_DISPOSABLE_INCOME, evaluate, format_amount
+from app.tools.artifacts import ToolArtifact, with_artifact
+
+@tool(response_format="content_and_artifact")
+async def get_loan_requirements(loan_type: str) -> tuple[str, ToolArtifact]:
     """Returns required fields for a 'new' or 'refinance' loan."""
     base_fields = [
         "full_name",
@@ -16,12 +19,14 @@ def get_loan_requirements(loan_type: str) -> List[str]:
     ]
 
     if "new" in loan_type.lower():
-        return base_fields + ["employer_name"]
+        fields = base_fields + ["employer_name"]
+    else:
+        fields = base_fields + ["existing_loan_id"]
 
-    return base_fields + ["existing_loan_id"]
+    return with_artifact(fields, required_fields=fields)
 
 @tool
-def check_loan_eligibility(
+async def check_loan_eligibility(
     full_name: str,
     annual_income: str,
     annual_expense: str,
@@ -33,54 +38,36 @@ def check_loan_eligibility(
     (annual income - annual expense) and calculates
     maximum eligible loan amount.
     """
-    try:
-        # Clean inputs (remove commas, currency symbols, spaces)
-        clean_income = "".join(filter(str.isdigit, str(annual_income)))
-        clean_expense = "".join(filter(str.isdigit, str(annual_expense)))
-        clean_value = "".join(filter(str.isdigit, str(property_value)))
-        clean_rqst_amount = "".join(filter(str.isdigit, str(requested_amount)))
-
-        income_val = int(clean_income)
-        expense_val = int(clean_expense)
-        property_val = int(clean_value)
-        rqst_amount = int(clean_rqst_amount)
-
-        disposable_income = income_val - expense_val
-
-        MIN_DISPOSABLE_INCOME = 50000
-        LOAN_MULTIPLIER = 10
-
-        if disposable_income < MIN_DISPOSABLE_INCOME:
-            return (
-                f"ELIGIBILITY CHECK: {full_name} is NOT ELIGIBLE for the loan. "
-                f"Disposable income is {disposable_income}, "
-                f"minimum required is {MIN_DISPOSABLE_INCOME}."
-            )
-
-        max_loan_amount = min(
-            disposable_income * LOAN_MULTIPLIER,
-            0.8 * property_val
-        )
-
-        is_rqstamt_higher = rqst_amount > max_loan_amount
+    result = evaluate([annual_income], [annual_expense], [property_value], [requested_amount])
 
+    if not result["valid"][0]:
         return (
-            f"ELIGIBILITY CHECK: {full_name} is ELIGIBLE for the loan.\n"
-            f"Annual Income: {income_val}\n"
-            f"Annual Expense: {expense_val}\n"
-            f"Disposable Income: {disposable_income}\n"
-            f"Maximum Eligible Loan Amount: {max_loan_amount}\n"
-            f"Requested_amount_exceeds_limit: {is_rqstamt_higher}"
+            "ERROR: Could not process income or expense values. "
+            "Please provide valid numeric inputs."
         )
 
-    except Exception:
+    income_val = format_amount(result["income"][0])
+    expense_val = format_amount(result["expense"][0])
+    disposable_income = format_amount(result["disposable_income"][0])
+
+    if not result["eligible"][0]:
         return (
-            "ERROR: Could not process income or expense values. "
-            "Please provide valid numeric inputs."
+            f"ELIGIBILITY CHECK: {full_name} is NOT ELIGIBLE for the loan. "
+            f"Disposable income is {disposable_income}, "
+            f"minimum required is {MIN_DISPOSABLE_INCOME}."
         )
-    
+
+    return (
+        f"ELIGIBILITY CHECK: {full_name} is ELIGIBLE for the loan.\n"
+        f"Annual Income: {income_val}\n"
+        f"Annual Expense: {expense_val}\n"
+        f"Disposable Income: {disposable_income}\n"
+        f"Maximum Eligible Loan Amount: {format_amount(result['max_loan_amount'][0])}\n"
+        f"Requested_amount_exceeds_limit: {bool(result['requested_amount_exceeds_limit'][0])}"
+    )
+
 @tool
-def submit_loan_application(user_id: str, details: str) -> str:
+async def submit_loan_application(user_id: str, details: str) -> str:
     """
     Submits a loan application.
 
@@ -93,35 +80,44 @@ def submit_loan_application(user_id: str, details: str) -> str:
              or an error message if submission fails.
     """
     try:
-        ref_id = save_loan(user_id=user_id, details=details)
-        return f"Loan submitted successfully. REF: sub{ref_id:07d}"
+        # Group-committed with other submissions; returns once the row is saved (LOAN_WRITE_DURABLE)
+        ref_id = await loan_writer.submit(user_id=user_id, details=details)
+        return f"Loan submitted successfully. REF: {loan_ref(ref_id)}"
     except Exception as e:
         return f"DATABASE ERROR: {str(e)}"
 
 @tool
-def get_user_loan_requests(user_id: str) -> dict:
+async def get_user_loan_requests(user_id: str, cursor: Optional[str] = None) -> dict:
     """
-    Fetches all loan applications submitted by a specific user.
+    Lists the loan applications submitted by a specific user, newest first,
+    a few at a time. Returns summaries only; use get_loan_details for the full
+    application.
 
     Args:
         user_id (str): Unique identifier of the user whose loan applications
                        need to be retrieved.
+        cursor (str, optional): next_cursor from the previous call, to fetch
+                                older applications.
 
     Returns:
         dict:
             status (str): "success" if loans are found,
                           "not_found" if no loans exist,
                           "error" if a database error occurs.
-            loans (list, optional): List of loan records. Each record contains:
-                - loan_id (int): Unique loan identifier
-                - details (str): Loan application details
+            loans (list, optional): Loan summaries. Each record contains:
+                - loan_id (str): Loan reference (e.g. sub0000042)
                 - status (str): Current loan status
                 - submission_date (str): Timestamp of submission
+                - loan_type (str | None)
+                - requested_amount (str | None)
+            next_cursor (str | None): Pass as cursor to get older applications.
     """
     try:
-        loans = get_loans_by_user(user_id)
+        # Applications submitted a moment ago may still be queued
+        await loan_writer.flush()
+        page = await get_loan_page(user_id, cursor)
 
-        if not loans:
+        if not page["loans"]:
             return {
                 "status": "not_found",
                 "message": "No loan applications found for this user."
@@ -129,11 +125,33 @@ def get_user_loan_requests(user_id: str) -> dict:
 
         return {
             "status": "success",
-            "loans": loans
+            **page
+        }
+
+    except Exception as e:
+        return {
+            "status": "error",
+            "message": str(e)
         }
 
+@tool
+async def get_loan_details(user_id: str, loan_id: str) -> dict:
+    """
+    Fetches the full details of one loan application of the user.
+
+    Args:
+        user_id (str): Unique identifier of the user.
+        loan_id (str): Loan reference from get_user_loan_requests (e.g. sub0000042).
+    """
+    try:
+        await loan_writer.flush()
+        loan = await get_loan_by_ref(user_id, loan_id)
+        if loan is None:
+            return {"status": "not_found", "message": f"No loan application {loan_id} for this user."}
+        return {"status": "success", **loan}
+
     except Exception as e:
         return {
             "status": "error",
             "message": str(e)
-        }
\ No newline at end of file
+        }
@@ -1,22 +1,25 @@
-import time, random
+import asyncio, random
 from langchain_core.tools import tool
 from app.mock.data import MOCK_USER_DB
+from app.core.config import OTP_FIXED_CODE, OTP_TTL_SECONDS
+from app.core.state_backend import get_state_backend
+from app.tools.artifacts import ToolArtifact, with_artifact
 
-otp_store = {}
+# OTPs live in the shared state backend, so any worker can verify a code another one sent
+def otp_key(mobile: str) -> str:
+    return f"otp:{mobile}"
 
 @tool
-def send_otp(mobile: str) -> str:
+async def send_otp(mobile: str) -> str:
     """
     Generates and stores a mock OTP for the given mobile number.
     """
     try:
-        otp = random.randint(1000, 9999)
-        expiry = int(time.time()) + 300        # 5 minutes expiry
+        # OTP_FIXED_CODE is for load tests only (scripted conversations need a known code)
+        otp = OTP_FIXED_CODE or random.randint(1000, 9999)
         print("OTP: ",otp)
-        otp_store[mobile] = {
-            "otp": str(otp),
-            "expires_at": expiry
-        }
+        # Expires after OTP_TTL_SECONDS (5 minutes); a new code replaces the previous one
+        await asyncio.to_thread(get_state_backend().set, otp_key(mobile), str(otp).encode(), OTP_TTL_SECONDS)
 
         # In real systems, send via SMS gateway here
         return "SUCCESS: A verification code has been sent."
@@ -24,26 +27,36 @@ def send_otp(mobile: str) -> str:
     except Exception as e:
         return f"ERROR: Failed to generate OTP. {str(e)}"
 
-@tool
-def verify_otp_and_fetch_account(mobile: str, otp: str) -> dict:
+async def fetch_account(mobile: str) -> dict | None:
+    """Account record for a mobile number (core banking lookup; mocked here)."""
+    return MOCK_USER_DB.get(mobile)
+
+def _otp_error(message: str) -> tuple[str, ToolArtifact]:
+    return with_artifact({"status": "error", "message": message}, status="error", message=message)
+
+@tool(response_format="content_and_artifact")
+async def verify_otp_and_fetch_account(mobile: str, otp: str) -> tuple[str, ToolArtifact]:
     """
-    Verifies OTP from otp_store and retrieves account info
+    Verifies the OTP sent to the mobile number and retrieves account info
     associated with the given mobile number.
     """
-    record = otp_store.get(mobile)
-
-    if not record or time.time() > record["expires_at"]:
-        return {"status": "error", "message": "OTP invalid or expired"}
-
-    if record["otp"] != otp:
-        return {"status": "error", "message": "Incorrect OTP"}
+    backend = get_state_backend()
 
-    del otp_store[mobile]
+    # Atomic: of two concurrent attempts with the right code only one succeeds
+    if not await asyncio.to_thread(backend.delete_if_equals, otp_key(mobile), str(otp).encode()):
+        if await asyncio.to_thread(backend.get, otp_key(mobile)) is None:
+            return _otp_error("OTP invalid or expired")
+        return _otp_error("Incorrect OTP")
 
-    account = MOCK_USER_DB.get(mobile)
+    # Usually already fetched while the LLM was answering the message with the number
+    from app.workflows.prefetch import MISS, prefetcher
+    account = await prefetcher.claim("account", mobile)
+    if account is MISS:
+        account = await fetch_account(mobile)
 
-    return {
+    result = {
         "status": "success",
         "account_exists": bool(account),
         "account_details": account
-    }
\ No newline at end of file
+    }
+    return with_artifact(result, status="success", account_exists=bool(account), account=account)
\ No newline at end of file
@@ -1,10 +1,11 @@
 from langchain_core.tools import tool
-from app.mock.data import MOCK_AGENT_INFO, MOCK_US_ZIP_STORE
+from app.db.refdata import get_refdata
+from app.tools.artifacts import ToolArtifact, with_artifact
 
 @tool
-def verify_us_zip_code(zip_code: str) -> dict:
+async def verify_us_zip_code(zip_code: str) -> dict:
     """
-    Mock tool to verify US ZIP codes (5-digit).
+    Tool to verify US ZIP codes (5-digit).
     """
 
     # Format validation (US ZIP = 5 digits)
@@ -14,12 +15,13 @@ def verify_us_zip_code(zip_code: str) -> dict:
             "reason": "Invalid US ZIP format"
         }
 
-    zip_data = MOCK_US_ZIP_STORE.get(zip_code)
+    store = get_refdata()
+    zip_data = store.zip_info(zip_code)
 
     if not zip_data:
         return {
             "status": "not_found",
-            "reason": "ZIP code not found in mock store"
+            "reason": "ZIP code not found in ZIP store"
         }
 
     if not zip_data["serviceable"]:
@@ -32,32 +34,32 @@ def verify_us_zip_code(zip_code: str) -> dict:
     return {
         "status": "verified",
         "location": zip_data,
-        "verification_source": "MOCK_US_ZIP_STORE",
+        "verification_source": store.source,
     }
 
-@tool
-def get_agent_info(zip_code: str) -> dict:
+@tool(response_format="content_and_artifact")
+async def get_agent_info(zip_code: str) -> tuple[str, ToolArtifact]:
     """
     Tool to get details of Bank Agent based on ZIP codes (5-digit).
     """
 
     # Format validation (US ZIP = 5 digits)
     if not zip_code.isdigit() or len(zip_code) != 5:
-        return {
+        return with_artifact({
             "status": "error",
             "reason": "Invalid US ZIP format"
-        }
+        }, status="error")
 
-    agent_data = MOCK_AGENT_INFO.get(zip_code)
+    agent_data = get_refdata().agent_info(zip_code)
 
     if not agent_data:
-        return {
+        return with_artifact({
             "status": "not_found",
             "reason": "ZIP code not found in Agent info Store"
-        }
+        }, status="not_found")
 
-    return {
+    return with_artifact({
         "status": "Agent Found",
         "bank_agent": agent_data,
         "verification_source": "AGENT_INFO_STORE",
-    }
\ No newline at end of file
+    }, status="Agent Found", bank_agent=agent_data)
\ No newline at end of file
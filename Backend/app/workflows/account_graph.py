@@ -1,16 +1,35 @@
+from functools import cache
+from langchain_core.messages import ToolMessage
 from langgraph.graph import StateGraph, START
-from langgraph.prebuilt import ToolNode, tools_condition
-from langgraph.checkpoint.memory import MemorySaver
+from langgraph.prebuilt import tools_condition
+from app.core.memory import checkpointer
 from app.workflows.account_state import AccountState
 from app.agents.account_agent import account_assistant
 from app.tools.account import submit_account_opening
+from app.workflows.tool_executor import build_tool_node
 
-builder = StateGraph(AccountState)
-builder.add_node("assistant", account_assistant)
-builder.add_node("tools", ToolNode([submit_account_opening]))
+def collect(state: AccountState):
+    """Merges account details returned by the tools into collected_data."""
+    collected = dict(state.get("collected_data") or {})
+    for msg in reversed(state["messages"]):
+        if not isinstance(msg, ToolMessage):
+            break
+        account = (msg.artifact or {}).get("account")
+        if account:
+            collected.update(account)
+    return {"collected_data": collected}
 
-builder.add_edge(START, "assistant")
-builder.add_conditional_edges("assistant", tools_condition)
-builder.add_edge("tools", "assistant")
+@cache
+def get_account_graph():
+    builder = StateGraph(AccountState)
+    builder.add_node("assistant", account_assistant)
+    builder.add_node("tools", build_tool_node([submit_account_opening]))
+    builder.add_node("collect", collect)
 
-account_graph = builder.compile(checkpointer=MemorySaver())
+    builder.add_edge(START, "assistant")
+    builder.add_conditional_edges("assistant", tools_condition)
+    builder.add_edge("tools", "collect")
+    builder.add_edge("collect", "assistant")
+
+    # Same store as loan_graph (threads "<thread_id>:account"), so it is shared across workers too
+    return builder.compile(checkpointer=checkpointer)
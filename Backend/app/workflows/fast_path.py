@@ -0,0 +1,220 @@
+import re
+import uuid
+from collections import Counter
+
+from langchain_core.messages import AIMessage, HumanMessage
+
+from app.tools.otp import send_otp, verify_otp_and_fetch_account
+from app.tools.zip import verify_us_zip_code
+from app.workflows.loan_state import LoanState
+from app.workflows.tool_executor import report_tool_progress
+
+MOBILE_RE = re.compile(r"^\+?(?:1[\s-]?)?((?:\d[\s().-]*){10})$")
+OTP_RE = re.compile(r"^\d{4}$")
+ZIP_RE = re.compile(r"^\d{5}$")
+
+# The employment_type options the assistant offers (prompts.py), most specific first
+EMPLOYMENT_TYPES = (
+    ("Self Employed", re.compile(r"\bself ?employed\b|\bfreelanc")),
+    ("Business Owner", re.compile(r"\bbusiness owner\b|\bown (?:a|my own|my) (?:business|company)\b")),
+    ("Salaried", re.compile(r"\bsalaried\b|\bsalary\b|\bemployed\b|\bemployee\b")),
+    ("Other", re.compile(r"^other\b")),
+)
+NEGATION_RE = re.compile(r"\bnot\b|n't\b|\bno longer\b|\bnever\b|\bused to\b")
+
+CONFIRMATIONS = {
+    "yes", "y", "yeah", "yep", "yup", "sure", "correct", "confirm", "confirmed",
+    "it is", "it's me", "its me", "that's me", "thats me", "this is me",
+    "yes this is me", "yes that's me", "yes thats me", "yes it is", "yes it's me",
+    "yes correct", "yes confirmed", "yes that is me", "that is me",
+}
+
+RESPONSES = {
+    "otp_sent": (
+        "I've sent a 4-digit verification code to your mobile number ending in {last4}. "
+        "Please enter the code here."
+    ),
+    "otp_failed": (
+        "Sorry, {reason}. Please re-enter the 4-digit code, "
+        "or share your mobile number again to receive a new one."
+    ),
+    "account_found": (
+        "Thanks, your code is verified. I found this account:\n\n"
+        "- **Name:** {name}\n"
+        "- **Email:** {email}\n"
+        "- **Customer Tier:** {customer_tier}\n"
+        "- **Customer ID:** {customer_id}\n\n"
+        "Please confirm: is this you? (Yes, this is me)"
+    ),
+    "verified": (
+        "Great, you're verified, {first_name}! How can I help you today?\n\n"
+        "- New Loan\n"
+        "- Refinance Loan\n"
+        "- Check your existing loan applications"
+    ),
+}
+
+stats = Counter()
+
+
+def fast_path_stats() -> dict:
+    turns = stats["turns"]
+    return {
+        **stats,
+        "hit_rate": round(stats["hits"] / turns, 4) if turns else 0.0,
+        "shortcut_rate": round(stats["tool_shortcuts"] / turns, 4) if turns else 0.0,
+    }
+
+
+def _normalize(text: str) -> str:
+    text = text.strip().lower().replace("’", "'")
+    text = re.sub(r"[^\w\s']", " ", text)
+    return " ".join(text.split())
+
+
+def _last_ai_text(messages) -> str:
+    for msg in reversed(messages):
+        if isinstance(msg, AIMessage) and not msg.tool_calls:
+            return msg.content if isinstance(msg.content, str) else ""
+    return ""
+
+
+def parse_employment_type(normalized: str) -> str | None:
+    """One of EMPLOYMENT_TYPES for an unambiguous answer; None for negations ("not self employed")."""
+    if NEGATION_RE.search(normalized):
+        return None
+    for employment_type, pattern in EMPLOYMENT_TYPES:
+        if pattern.search(normalized):
+            return employment_type
+    return None
+
+
+def employment_slot(messages, normalized: str) -> dict:
+    """employment_type update when the user answers the employment question (or just names an option)."""
+    asked = "employ" in _last_ai_text(messages[:-1]).lower()
+    if not asked and normalized not in {option.lower() for option, _ in EMPLOYMENT_TYPES}:
+        return {}
+    employment_type = parse_employment_type(normalized)
+    return {"employment_type": employment_type} if employment_type else {}
+
+
+def pending_mobile(state: LoanState) -> str | None:
+    if state.get("pending_mobile"):
+        return state["pending_mobile"]
+    # OTP may have been sent by the LLM through the normal tool path
+    for msg in reversed(state["messages"]):
+        for tool_call in getattr(msg, "tool_calls", None) or []:
+            if tool_call["name"] == "send_otp":
+                return tool_call["args"].get("mobile")
+    return None
+
+
+async def _call_tool(tool, args: dict):
+    """Runs a tool and returns (ToolMessage, [AIMessage tool call, ToolMessage]) for the history."""
+    call = {"name": tool.name, "args": args, "id": f"fast_{uuid.uuid4().hex[:12]}", "type": "tool_call"}
+    # Invoked with a tool call, the tool returns a ToolMessage (with its artifact, if any)
+    report_tool_progress(tool.name, "started")
+    try:
+        tool_msg = await tool.ainvoke(call)
+    finally:
+        report_tool_progress(tool.name, "finished")
+    messages = [
+        AIMessage(content="", tool_calls=[{"name": call["name"], "args": args, "id": call["id"]}]),
+        tool_msg,
+    ]
+    return tool_msg, messages
+
+
+async def fast_path(state: LoanState):
+    """
+    Pre-LLM intent and slot matcher.
+
+    When the phase in LoanState makes the intent of a mechanical turn unambiguous
+    (mobile number, OTP, "yes, this is me", ZIP), the matching tool is invoked
+    directly. If a response template covers the outcome the turn ends without an
+    LLM call; otherwise the tool result is left in the history for the assistant.
+    An answer to the employment question is recorded in employment_type (it
+    picks the model tier, see model_router.loan_phase).
+    """
+    stats["turns"] += 1
+    messages = state["messages"]
+    if not messages or not isinstance(messages[-1], HumanMessage):
+        stats["misses"] += 1
+        return {}
+
+    text = messages[-1].content if isinstance(messages[-1].content, str) else ""
+    normalized = _normalize(text)
+    account = state.get("user_account") or {}
+    is_verified = state.get("is_verified", False)
+
+    # 1. Mobile number -> send OTP
+    mobile_match = MOBILE_RE.match(text.strip())
+    if not is_verified and not account and mobile_match:
+        mobile = re.sub(r"\D", "", mobile_match.group(1))
+        tool_msg, tool_messages = await _call_tool(send_otp, {"mobile": mobile})
+        stats["intent_mobile"] += 1
+
+        if tool_msg.content.startswith("SUCCESS"):
+            stats["hits"] += 1
+            reply = RESPONSES["otp_sent"].format(last4=mobile[-4:])
+            return {"messages": tool_messages + [AIMessage(content=reply)], "pending_mobile": mobile}
+
+        stats["tool_shortcuts"] += 1
+        return {"messages": tool_messages}
+
+    # 2. OTP -> verify and fetch account
+    mobile = pending_mobile(state)
+    if not is_verified and not account and mobile and OTP_RE.match(text.strip()):
+        tool_msg, tool_messages = await _call_tool(
+            verify_otp_and_fetch_account, {"mobile": mobile, "otp": text.strip()}
+        )
+        result = tool_msg.artifact
+        stats["intent_otp"] += 1
+
+        if result.get("status") != "success":
+            stats["hits"] += 1
+            reply = RESPONSES["otp_failed"].format(reason=result.get("message", "that code didn't work").lower())
+            return {"messages": tool_messages + [AIMessage(content=reply)]}
+
+        updates = {"messages": tool_messages, "pending_mobile": None}
+        updates["account_exists"] = result["account_exists"]
+        if result["account_exists"]:
+            updates["user_account"] = result["account"]
+            details = result["account"]
+            reply = RESPONSES["account_found"].format(
+                **{k: details.get(k, "-") for k in ("name", "email", "customer_tier", "customer_id")}
+            )
+            updates["messages"] = tool_messages + [AIMessage(content=reply)]
+            stats["hits"] += 1
+        else:
+            # No account: the assistant explains and hands off to account opening
+            updates["active_agent"] = "account"
+            stats["tool_shortcuts"] += 1
+        return updates
+
+    # 3. "Yes, this is me" -> verified
+    if not is_verified and account and state.get("account_exists") and normalized in CONFIRMATIONS:
+        stats["intent_confirm"] += 1
+        stats["hits"] += 1
+        first_name = str(account.get("name", "")).split(" ")[0] or "there"
+        reply = RESPONSES["verified"].format(first_name=first_name)
+        return {"messages": [AIMessage(content=reply)], "is_verified": True}
+
+    # 4. ZIP, only when the assistant just asked for it (a bare 5-digit number is
+    #    otherwise ambiguous with amounts). The LLM still phrases the next step.
+    if is_verified and ZIP_RE.match(text.strip()) and "zip" in _last_ai_text(messages).lower():
+        _, tool_messages = await _call_tool(verify_us_zip_code, {"zip_code": text.strip()})
+        stats["intent_zip"] += 1
+        stats["tool_shortcuts"] += 1
+        return {"messages": tool_messages}
+
+    stats["misses"] += 1
+    return employment_slot(messages, normalized) if is_verified else {}
+
+
+def route_after_fast_path(state: LoanState):
+    """A templated reply ends the turn; anything else goes to the LLM assistant."""
+    last = state["messages"][-1]
+    if isinstance(last, AIMessage) and not last.tool_calls:
+        return "end"
+    return "assistant"
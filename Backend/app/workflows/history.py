@@ -0,0 +1,101 @@
+from langchain_core.messages import AIMessage, HumanMessage, RemoveMessage, ToolMessage
+
+from app.core.config import HISTORY_KEEP_TURNS, HISTORY_SUMMARY_MAX_CHARS
+from app.workflows.loan_state import LoanState
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 characters per token for English text)."""
+    return (len(text) + 3) // 4
+
+
+def message_text(msg) -> str:
+    content = msg.content
+    if isinstance(content, str):
+        return content
+    # Multi-part content (list of blocks)
+    return " ".join(part.get("text", "") if isinstance(part, dict) else str(part) for part in content)
+
+
+def message_tokens(msg) -> int:
+    # ~4 tokens of chat-format overhead per message (role, separators)
+    tokens = 4 + estimate_tokens(message_text(msg))
+    for tool_call in getattr(msg, "tool_calls", None) or []:
+        tokens += estimate_tokens(tool_call["name"] + str(tool_call["args"]))
+    return tokens
+
+
+def _clip(text: str, limit: int) -> str:
+    text = " ".join(text.split())
+    return text if len(text) <= limit else text[: limit - 1] + "…"
+
+
+def summarize_message(msg) -> str | None:
+    """One summary line per message. Tool outputs are collapsed hardest."""
+    text = message_text(msg)
+
+    if isinstance(msg, HumanMessage):
+        return f"User: {_clip(text, 160)}"
+
+    if isinstance(msg, ToolMessage):
+        return f"Tool {msg.name or 'result'}: {_clip(text, 60)}"
+
+    if isinstance(msg, AIMessage):
+        if msg.tool_calls:
+            names = ", ".join(tc["name"] for tc in msg.tool_calls)
+            return f"Assistant called: {names}"
+        if text:
+            return f"Assistant: {_clip(text, 120)}"
+
+    return None
+
+
+def roll_summary(summary: str, lines: list[str], max_chars: int = HISTORY_SUMMARY_MAX_CHARS) -> str:
+    """Appends lines to the rolling summary and drops the oldest lines over budget."""
+    all_lines = (summary.splitlines() if summary else []) + lines
+    total = sum(len(line) + 1 for line in all_lines)
+    while all_lines and total > max_chars:
+        total -= len(all_lines.pop(0)) + 1
+    return "\n".join(all_lines)
+
+
+def compact_history(state: LoanState):
+    """
+    Keeps the last HISTORY_KEEP_TURNS turns (a turn starts at a HumanMessage) verbatim
+    and collapses everything older into `history_summary`.
+
+    Structured facts (user_account, required_fields, is_verified, account_exists,
+    bank_agent, employment_type, eligibility_pending) live in their own state keys
+    and are never touched here, so they survive compaction.
+    """
+    messages = state["messages"]
+    turn_starts = [i for i, msg in enumerate(messages) if isinstance(msg, HumanMessage)]
+
+    if len(turn_starts) <= HISTORY_KEEP_TURNS:
+        return {}
+
+    # Cutting on a HumanMessage boundary never orphans a ToolMessage from its tool call
+    cut = turn_starts[-HISTORY_KEEP_TURNS]
+    old = messages[:cut]
+
+    lines = [line for line in map(summarize_message, old) if line]
+    summary = roll_summary(state.get("history_summary", ""), lines)
+
+    stats = dict(state.get("history_stats") or {})
+    removed_tokens = sum(message_tokens(msg) for msg in old)
+    stats["compacted_messages"] = stats.get("compacted_messages", 0) + len(old)
+    stats["compacted_tokens"] = stats.get("compacted_tokens", 0) + removed_tokens
+    stats["summary_tokens"] = estimate_tokens(summary)
+    # Saved on every LLM call of this turn compared to sending the full history
+    stats["tokens_saved_per_call"] = stats["compacted_tokens"] - stats["summary_tokens"]
+
+    print(
+        f"--- HISTORY COMPACTED: {len(old)} messages, "
+        f"~{stats['tokens_saved_per_call']} prompt tokens saved per call ---"
+    )
+
+    return {
+        "messages": [RemoveMessage(id=msg.id) for msg in old],
+        "history_summary": summary,
+        "history_stats": stats,
+    }
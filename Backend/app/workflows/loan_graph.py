@@ -1,57 +1,59 @@
+from langgraph.config import get_stream_writer
 from langgraph.graph import StateGraph, START, END
-from langgraph.prebuilt import ToolNode
 from langchain_core.messages import ToolMessage, HumanMessage, AIMessage
-import ast
-import json
+from functools import cache
 
 from app.workflows.loan_state import LoanState
 from app.agents.loan_agent import loan_assistant
 from app.core.memory import checkpointer
 from app.tools import LOAN_TOOLS
-from app.workflows.account_graph import account_graph
-
-def parse_tool_output(content):
-    """Safely parse tool output regardless of format."""
-    if isinstance(content, (dict, list)):
-        return content
-    if not isinstance(content, str):
-        return None
-
-    content = content.strip()
-    # Only try to parse if it looks like a JSON/Python object
-    if content.startswith(("{", "[")):
-        try:
-            return json.loads(content.replace("'", '"')) # Try JSON first
-        except:
-            try:
-                return ast.literal_eval(content) # Fallback to AST
-            except:
-                return None
-    return None
+from app.workflows.account_graph import get_account_graph
+from app.workflows.history import compact_history
+from app.workflows.fast_path import fast_path, route_after_fast_path
+from app.workflows.tool_executor import build_tool_node
+
+def latest_tool_results(messages) -> list[ToolMessage]:
+    """ToolMessages answering the last assistant step, in tool_calls order."""
+    results = []
+    for msg in reversed(messages):
+        if not isinstance(msg, ToolMessage):
+            break
+        results.append(msg)
+    results.reverse()
+    return results
 
 def updater(state: LoanState):
-    """Updates the global state based on tool results."""
-    last_msg = state["messages"][-1]
+    """
+    Updates the global state based on tool results.
+    Tools of one step may finish in any order; results are applied in the
+    order the assistant requested them, so a later call wins on conflicts.
+    """
     updates = {}
 
-    if isinstance(last_msg, ToolMessage):
-        data = parse_tool_output(last_msg.content)
+    for tool_msg in latest_tool_results(state["messages"]):
+        # Tools put their structured result on the artifact; the content is only for the LLM
+        artifact = tool_msg.artifact or {}
 
-        if isinstance(data, dict):
-            if "account_exists" in data:
-                updates["account_exists"] = data["account_exists"]
-                # If account is missing, tell the graph to switch to account agent
-                if data["account_exists"] is False:
-                    updates["active_agent"] = "account"
+        if "account_exists" in artifact:
+            updates["account_exists"] = artifact["account_exists"]
+            # If account is missing, tell the graph to switch to account agent
+            if artifact["account_exists"] is False:
+                updates["active_agent"] = "account"
 
-            if "account_details" in data:
-                updates["user_account"] = data["account_details"]
+        if "account" in artifact:
+            updates["user_account"] = artifact["account"]
 
-            if "bank_agent" in data:
-                updates["bank_agent"] = data["bank_agent"]
+        if "bank_agent" in artifact:
+            updates["bank_agent"] = artifact["bank_agent"]
 
-        elif isinstance(data, list):
-            updates["required_fields"] = data
+        if "required_fields" in artifact:
+            updates["required_fields"] = artifact["required_fields"]
+
+        # Kept in state: the ToolMessage itself may be compacted away before the submission
+        if tool_msg.name == "check_loan_eligibility":
+            updates["eligibility_pending"] = True
+        elif tool_msg.name == "submit_loan_application":
+            updates["eligibility_pending"] = False
 
     # Verification logic: Check for user confirmation
     if not state.get("is_verified") and state.get("user_account"):
@@ -64,24 +66,64 @@ def updater(state: LoanState):
 
     return updates
 
-async def account_opening_handoff(state: LoanState):
+def account_thread_id(config) -> str:
+    """The account sub-graph keeps its own history on a per-user thread."""
+    return f"{config['configurable']['thread_id']}:account"
+
+def messages_for_account_agent(state: LoanState) -> list:
+    """
+    Loan-side messages the account sub-graph hasn't seen yet: everything after
+    `account_cursor`, or just the current turn on the first handoff. Loan tool
+    traffic is never forwarded, the account agent only needs the conversation.
+    """
+    messages = state["messages"]
+    start = None
+    cursor = state.get("account_cursor")
+    if cursor:
+        for i in range(len(messages) - 1, -1, -1):
+            if messages[i].id == cursor:
+                start = i + 1
+                break
+    if start is None:
+        start = max((i for i, msg in enumerate(messages) if isinstance(msg, HumanMessage)), default=0)
+
+    return [
+        msg for msg in messages[start:]
+        if isinstance(msg, HumanMessage) or (isinstance(msg, AIMessage) and not msg.tool_calls)
+    ]
+
+async def account_opening_handoff(state: LoanState, config):
     """
     Bridge node that runs the account sub-graph and monitors for handoff signals.
     """
     print("--- DELEGATING TO ACCOUNT AGENT ---")
-    
-    result = await account_graph.ainvoke(
-        {
-            "messages": state["messages"], 
-            "collected_data": state.get("user_account", {})
-        }
-    )
-    
+    graph = get_account_graph()
+    # Tagged so its nodes are reported as "account_opening/<node>" (see app.core.metrics)
+    sub_config = {"configurable": {"thread_id": account_thread_id(config)}, "metadata": {"subgraph": "account_opening"}}
+
+    new_messages = messages_for_account_agent(state)
+    input_payload = {"messages": new_messages}
+    existing = await graph.aget_state(sub_config)
+    seen = len(existing.values.get("messages", []))
+    if not existing.values:
+        # KYC data already known from the loan side seeds the sub-graph once
+        input_payload["collected_data"] = dict(state.get("user_account") or {})
+
+    # The sub-graph runs as its own root graph (own thread): forward its tool
+    # progress to the parent's stream so streaming clients still see it
+    writer = get_stream_writer()
+    result = None
+    async for mode, chunk in graph.astream(input_payload, sub_config, stream_mode=["custom", "values"]):
+        if mode == "values":
+            result = chunk
+        else:
+            writer(chunk)
+
     last_sub_msg = result["messages"][-1]
-    updates = {"messages": [last_sub_msg]}
+    updates = {"messages": [last_sub_msg], "account_cursor": last_sub_msg.id}
 
-    # Check the history of the sub-graph run for specific tool calls
-    for msg in reversed(result["messages"]):
+    # Check what the sub-graph did in this run for specific tool calls
+    for msg in reversed(result["messages"][seen + len(new_messages):]):
         if not hasattr(msg, "tool_calls"):
             continue
             
@@ -89,21 +131,24 @@ async def account_opening_handoff(state: LoanState):
             # CASE 1: User wants to cancel or already has an account (The LLM decided this)
             if tool_call["name"] == "transfer_back_to_loan_assistant":
                 print("--- ACCOUNT AGENT REQUESTED TRANSFER BACK ---")
+                await graph.checkpointer.adelete_thread(sub_config["configurable"]["thread_id"])
                 return {
                     "active_agent": "loan",
                     "account_exists": None, # Reset to allow Loan Agent to re-verify
+                    "account_cursor": None,
                     "messages": [AIMessage(content="Certainly. I've stopped the account opening process. Let's go back to your loan application. Can you please provide your mobile number so I can find your existing account?")]
                 }
 
             # CASE 2: Account was successfully created
             if tool_call["name"] == "submit_account_opening":
-                # We need to find the ToolMessage response to get the data
-                # (You might need to parse this from the result['messages'])
                 print("--- ACCOUNT CREATED SUCCESSFULLY ---")
                 updates["active_agent"] = "loan"
                 updates["account_exists"] = True
                 updates["is_verified"] = True
-                # logic to extract account details...
+                updates["user_account"] = result.get("collected_data") or state.get("user_account", {})
+                updates["account_cursor"] = None
+                # The loan agent takes over; the sub-graph history is no longer needed
+                await graph.checkpointer.adelete_thread(sub_config["configurable"]["thread_id"])
                 return updates
 
     return updates
@@ -114,7 +159,7 @@ def route_from_start(state: LoanState):
     """Decides where to start based on which agent is active."""
     if state.get("active_agent") == "account":
         return "account_opening"
-    return "assistant"
+    return "fast_path"
 
 def route_from_assistant(state: LoanState):
     """Routes from the loan assistant node."""
@@ -138,46 +183,63 @@ def route_after_account(state: LoanState):
 
 # --- GRAPH CONSTRUCTION ---
 
-builder = StateGraph(LoanState)
-
-builder.add_node("assistant", loan_assistant)
-builder.add_node("tools", ToolNode(LOAN_TOOLS))
-builder.add_node("updater", updater)
-builder.add_node("account_opening", account_opening_handoff)
-
-# 1. Routing from START (CRITICAL: Explicit mapping fixed the KeyError)
-builder.add_conditional_edges(
-    START, 
-    route_from_start,
-    {
-        "assistant": "assistant",
-        "account_opening": "account_opening"
-    }
-)
-
-# 2. Routing from Loan Assistant
-builder.add_conditional_edges(
-    "assistant",
-    route_from_assistant,
-    {
-        "tools": "tools",
-        "account_opening": "account_opening",
-        END: END,
-    }
-)
-
-# 3. Routing from Account Sub-graph bridge
-builder.add_conditional_edges(
-    "account_opening",
-    route_after_account,
-    {
-        "assistant": "assistant",
-        END: END
-    }
-)
-
-# 4. Standard Edges
-builder.add_edge("tools", "updater")
-builder.add_edge("updater", "assistant")
-
-loan_graph = builder.compile(checkpointer=checkpointer)
\ No newline at end of file
+# Compiled on first use (or during app warm-up) instead of at import time
+@cache
+def get_loan_graph():
+    builder = StateGraph(LoanState)
+
+    builder.add_node("assistant", loan_assistant)
+    builder.add_node("tools", build_tool_node(LOAN_TOOLS))
+    builder.add_node("updater", updater)
+    builder.add_node("account_opening", account_opening_handoff)
+    builder.add_node("compactor", compact_history)
+    builder.add_node("fast_path", fast_path)
+
+    # 1. Routing from START (CRITICAL: Explicit mapping fixed the KeyError)
+    #    Every turn first compacts old history, then picks the active agent
+    builder.add_edge(START, "compactor")
+    builder.add_conditional_edges(
+        "compactor", 
+        route_from_start,
+        {
+            "fast_path": "fast_path",
+            "account_opening": "account_opening"
+        }
+    )
+
+    # 1b. Deterministic fast path either answers the turn or hands over to the LLM
+    builder.add_conditional_edges(
+        "fast_path",
+        route_after_fast_path,
+        {
+            "assistant": "assistant",
+            "end": END,
+        }
+    )
+
+    # 2. Routing from Loan Assistant
+    builder.add_conditional_edges(
+        "assistant",
+        route_from_assistant,
+        {
+            "tools": "tools",
+            "account_opening": "account_opening",
+            END: END,
+        }
+    )
+
+    # 3. Routing from Account Sub-graph bridge
+    builder.add_conditional_edges(
+        "account_opening",
+        route_after_account,
+        {
+            "assistant": "assistant",
+            END: END
+        }
+    )
+
+    # 4. Standard Edges
+    builder.add_edge("tools", "updater")
+    builder.add_edge("updater", "assistant")
+
+    return builder.compile(checkpointer=checkpointer)
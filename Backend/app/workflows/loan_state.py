@@ -1,11 +1,57 @@
 from typing import TypedDict, Annotated, Dict, Any, List
+from langgraph.channels import DeltaChannel
 from langgraph.graph.message import add_messages
-from langchain_core.messages import BaseMessage
+from langchain_core.messages import BaseMessage, RemoveMessage, convert_to_messages
+from app.core.config import CHECKPOINT_DELTA_MESSAGES, CHECKPOINT_SNAPSHOT_EVERY
+
+
+def messages_log_reducer(state: list, writes: list) -> list:
+    """
+    Batch reducer for the DeltaChannel: appends / replaces messages by id and
+    drops the ones named by a RemoveMessage (what the history compactor sends).
+    Applying writes in one batch or several gives the same list, as the channel
+    requires. Same semantics as LangGraph's private _messages_delta_reducer,
+    kept here so an upgrade can't silently change or remove it.
+    """
+    flat = []
+    for write in writes:
+        flat.extend(write if isinstance(write, list) else [write])
+    current = state if state and isinstance(state[0], BaseMessage) else convert_to_messages(state)
+
+    result = list(current)
+    index = {msg.id: i for i, msg in enumerate(result) if msg.id is not None}
+    for msg in convert_to_messages(flat):
+        if msg.id is None:
+            result.append(msg)
+        elif isinstance(msg, RemoveMessage):
+            if msg.id in index:
+                result[index.pop(msg.id)] = None
+        elif msg.id in index:
+            result[index[msg.id]] = msg
+        else:
+            index[msg.id] = len(result)
+            result.append(msg)
+    return [msg for msg in result if msg is not None]
+
+
+# CHECKPOINT_DELTA_MESSAGES=1: append-only in checkpoints, each one stores just
+# that superstep's messages (see SessionStore and the config trade-off note)
+messages_channel = (
+    DeltaChannel(messages_log_reducer, snapshot_frequency=CHECKPOINT_SNAPSHOT_EVERY)
+    if CHECKPOINT_DELTA_MESSAGES else add_messages
+)
 
 class LoanState(TypedDict):
-    messages: Annotated[List[BaseMessage], add_messages]
+    messages: Annotated[List[BaseMessage], messages_channel]
     is_verified: bool
     account_exists: bool          
     user_account: Dict[str, Any]
     required_fields: List[str]
     active_agent: str
+    bank_agent: Dict[str, Any]
+    history_summary: str
+    history_stats: Dict[str, int]
+    pending_mobile: str
+    account_cursor: str           # id of the last message the account sub-graph has seen
+    employment_type: str          # Salaried / Self Employed / Business Owner / Other, once answered
+    eligibility_pending: bool     # check_loan_eligibility ran, nothing submitted since
@@ -0,0 +1,182 @@
+"""
+Speculative prefetch of account, ZIP and agent lookups.
+
+Without it a lookup only starts after the LLM has decided to call the tool,
+and its result then needs another LLM round trip. When the assistant gets a
+user message, start() spots mobile numbers and ZIP codes in it and launches
+the matching lookups as background tasks, so they run while the LLM call is in
+flight:
+
+  mobile number   account record (used by verify_otp_and_fetch_account)
+  ZIP code        verify_us_zip_code and get_agent_info results
+
+Results are kept per session (thread_id) for PREFETCH_TTL_SECONDS. The tool
+node (ToolLimiter) and verify_otp_and_fetch_account claim() them before doing
+the lookup themselves; a lookup still running is awaited. Only side-effect-free
+lookups are prefetched: the OTP check itself always runs.
+
+A ZIP is only spotted when the message or the assistant's last question
+mentions ZIP codes (a bare 5-digit number is more often an amount).
+
+hit rate:   claims served from the prefetch cache / all claims
+waste rate: prefetched results that expired or were evicted unused / started
+GET /prefetch/stats and GET /metrics.
+"""
+import asyncio
+import contextvars
+import re
+import time
+from collections import Counter as Counts, OrderedDict
+
+from langchain_core.messages import AIMessage, HumanMessage
+from langgraph.config import get_config
+
+from app.core.config import PREFETCH_ENABLED, PREFETCH_MAX_SESSIONS, PREFETCH_TTL_SECONDS
+from app.core.metrics import Counter, registry
+from app.tools.otp import fetch_account
+from app.tools.zip import get_agent_info, verify_us_zip_code
+
+prefetch_total = registry.register(Counter(
+    "prefetch_total", "Speculative lookups by kind and outcome (started / hit / miss / wasted)", ("kind", "result")))
+
+MOBILE_SEARCH_RE = re.compile(r"(?<![\d-])\+?(?:1[\s-]?)?(\(?\d{3}\)?[\s.-]?\d{3}[\s.-]?\d{4})(?![\d-])")
+ZIP_SEARCH_RE = re.compile(r"(?<![\d$.,])(\d{5})(?![\d,.]\d|\d)")
+
+# Tools whose result is prefetched for a spotted ZIP
+TOOL_LOOKUPS = {tool.name: tool for tool in (verify_us_zip_code, get_agent_info)}
+
+MISS = object()
+
+
+async def _run_tool(tool, zip_code: str):
+    # Invoked with a tool call, so the ToolMessage (and artifact) is built exactly as in the tool node
+    return await tool.ainvoke({"name": tool.name, "args": {"zip_code": zip_code}, "id": "prefetch", "type": "tool_call"})
+
+
+def _thread_id() -> str | None:
+    try:
+        return get_config()["configurable"]["thread_id"]
+    except (RuntimeError, KeyError):
+        return None     # outside a graph run
+
+
+def spot(messages) -> list[tuple[str, str]]:
+    """(kind, value) lookups worth starting for the latest user message."""
+    if not messages or not isinstance(messages[-1], HumanMessage) or not isinstance(messages[-1].content, str):
+        return []
+    text = messages[-1].content
+    lookups = [("account", re.sub(r"\D", "", m.group(1))) for m in MOBILE_SEARCH_RE.finditer(text)]
+
+    asked = ""
+    for msg in reversed(messages[:-1]):
+        if isinstance(msg, AIMessage) and not msg.tool_calls:
+            asked = msg.content if isinstance(msg.content, str) else ""
+            break
+    if "zip" in text.lower() or "zip" in asked.lower():
+        for m in ZIP_SEARCH_RE.finditer(text):
+            lookups += [(name, m.group(1)) for name in TOOL_LOOKUPS]
+    return list(dict.fromkeys(lookups))
+
+
+class Prefetcher:
+    def __init__(self, ttl: float = PREFETCH_TTL_SECONDS, max_sessions: int = PREFETCH_MAX_SESSIONS,
+                 enabled: bool = PREFETCH_ENABLED):
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self.enabled = enabled
+        self._sessions = OrderedDict()      # thread_id -> {(kind, value): [task, expires_at, claimed]}
+        self.counts = Counts()
+
+    def _count(self, kind: str, result: str):
+        self.counts[result] += 1
+        prefetch_total.inc(kind, result)
+
+    def _retire(self, key, entry):
+        if not entry[2]:
+            self._count(key[0], "wasted")
+        if not entry[0].done():
+            entry[0].cancel()
+
+    def _session(self, thread_id: str, create: bool = False) -> dict | None:
+        entries = self._sessions.get(thread_id)
+        if entries is None:
+            if not create:
+                return None
+            entries = self._sessions[thread_id] = {}
+            while len(self._sessions) > self.max_sessions:
+                _, evicted = self._sessions.popitem(last=False)
+                for key, entry in evicted.items():
+                    self._retire(key, entry)
+        self._sessions.move_to_end(thread_id)
+
+        now = time.monotonic()
+        for key in [k for k, entry in entries.items() if entry[1] <= now]:
+            self._retire(key, entries.pop(key))
+        return entries
+
+    def start(self, messages) -> int:
+        """Launches the lookups spotted in the latest user message; returns how many started."""
+        thread_id = _thread_id() if self.enabled else None
+        if thread_id is None:
+            return 0
+        lookups = spot(messages)
+        if not lookups:
+            return 0
+
+        entries = self._session(thread_id, create=True)
+        started = 0
+        for kind, value in lookups:
+            if (kind, value) in entries:
+                continue
+            coro = fetch_account(value) if kind == "account" else _run_tool(TOOL_LOOKUPS[kind], value)
+            # Empty context: the lookup isn't part of the current node's run (callbacks, stream writer)
+            task = asyncio.create_task(coro, context=contextvars.Context())
+            entries[(kind, value)] = [task, time.monotonic() + self.ttl, False]
+            self._count(kind, "started")
+            started += 1
+        return started
+
+    async def claim(self, kind: str, value: str):
+        """The prefetched result for this session, or MISS."""
+        if not self.enabled:
+            return MISS
+        thread_id = _thread_id()
+        entries = self._session(thread_id) if thread_id is not None else None
+        entry = entries.get((kind, value)) if entries else None
+        if entry is None:
+            self._count(kind, "miss")
+            return MISS
+        try:
+            result = await asyncio.shield(entry[0])
+        except Exception:
+            self._count(kind, "miss")
+            return MISS
+        entry[2] = True
+        self._count(kind, "hit")
+        return result
+
+    async def claim_tool(self, call: dict):
+        """ToolMessage for a tool call from the prefetch cache, or MISS."""
+        if call["name"] not in TOOL_LOOKUPS or set(call["args"]) != {"zip_code"}:
+            return MISS
+        message = await self.claim(call["name"], str(call["args"]["zip_code"]).strip())
+        if message is MISS:
+            return MISS
+        return message.model_copy(update={"tool_call_id": call["id"]})
+
+    def stats(self) -> dict:
+        started, hits, misses = self.counts["started"], self.counts["hit"], self.counts["miss"]
+        return {
+            "enabled": self.enabled,
+            "sessions": len(self._sessions),
+            "pending": sum(len(entries) for entries in self._sessions.values()),
+            "started": started,
+            "hits": hits,
+            "misses": misses,
+            "wasted": self.counts["wasted"],
+            "hit_rate": round(hits / (hits + misses), 4) if hits + misses else 0.0,
+            "waste_rate": round(self.counts["wasted"] / started, 4) if started else 0.0,
+        }
+
+
+prefetcher = Prefetcher()
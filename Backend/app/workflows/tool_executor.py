@@ -0,0 +1,78 @@
+import asyncio
+import weakref
+
+from langchain_core.messages import ToolMessage
+from langgraph.config import get_stream_writer
+from langgraph.prebuilt import ToolNode
+
+from app.core.config import TOOL_CONCURRENCY, TOOL_TIMEOUT_SECONDS
+from app.workflows.prefetch import MISS, prefetcher
+
+# Per-tool overrides of TOOL_TIMEOUT_SECONDS
+TOOL_TIMEOUTS = {
+    "submit_loan_application": 30,
+    "get_user_loan_requests": 30,
+}
+
+
+def report_tool_progress(name: str, status: str):
+    """Tool started / finished, for streaming turns (stream_mode="custom"); a no-op otherwise."""
+    try:
+        writer = get_stream_writer()
+    except RuntimeError:
+        return      # called outside a graph run
+    writer({"tool": name, "status": status})
+
+
+class ToolLimiter:
+    """
+    awrap_tool_call for ToolNode.
+
+    ToolNode already runs all tool calls of one AIMessage with asyncio.gather and
+    returns the ToolMessages in tool_calls order. This adds a per-worker cap on
+    how many tools run at once and a timeout per call; a call that times out
+    becomes an error ToolMessage instead of failing the whole batch. Lookups
+    already prefetched for the session are answered from the prefetch cache.
+    """
+
+    def __init__(self, concurrency: int = TOOL_CONCURRENCY, timeout: float = TOOL_TIMEOUT_SECONDS):
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self._semaphores = weakref.WeakKeyDictionary()   # event loop -> semaphore (benchmarks run several loops)
+
+    def _semaphore(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        semaphore = self._semaphores.get(loop)
+        if semaphore is None:
+            semaphore = self._semaphores[loop] = asyncio.Semaphore(self.concurrency)
+        return semaphore
+
+    async def __call__(self, request, execute):
+        call = request.tool_call
+        timeout = TOOL_TIMEOUTS.get(call["name"], self.timeout)
+        prefetched = await prefetcher.claim_tool(call)
+        if prefetched is not MISS:
+            report_tool_progress(call["name"], "started")
+            report_tool_progress(call["name"], "finished")
+            return prefetched
+        async with self._semaphore():
+            report_tool_progress(call["name"], "started")
+            try:
+                return await asyncio.wait_for(execute(request), timeout)
+            except asyncio.TimeoutError:
+                print(f"--- TOOL TIMEOUT: {call['name']} after {timeout}s ---")
+                return ToolMessage(
+                    content=f"ERROR: {call['name']} timed out after {timeout} seconds. Please try again.",
+                    name=call["name"],
+                    tool_call_id=call["id"],
+                    status="error",
+                )
+            finally:
+                report_tool_progress(call["name"], "finished")
+
+
+tool_limiter = ToolLimiter()
+
+
+def build_tool_node(tools) -> ToolNode:
+    return ToolNode(tools, awrap_tool_call=tool_limiter)
@@ -0,0 +1,172 @@
+"""
+Checkpoint cost per turn as a session's history grows, with the messages
+channel stored as a full list (add_messages) vs. an append-only delta log
+(DeltaChannel, CHECKPOINT_DELTA_MESSAGES=1).
+
+Each turn is one user message through a stub graph shaped like the loan graph
+(assistant -> tools -> updater -> assistant -> END, no LLM), checkpointed by a
+SessionStore with the default pruning. Per turn, at the given history sizes:
+
+  bytes:     serialized by the checkpointer (checkpoints, channel blobs, writes)
+  cpu_ms:    process time of the whole turn
+  resident:  bytes held for the session after pruning
+  hibernated: size of the session's hibernation payload
+
+    cd Backend && python -m benchmarks.bench_checkpoints --messages 50 200 800
+"""
+import argparse
+import json
+import os
+import pickle
+import time
+from typing import Annotated, List, TypedDict
+
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, ToolMessage
+from langgraph.channels import DeltaChannel
+from langgraph.graph import END, StateGraph
+from langgraph.graph.message import add_messages
+
+from app.core.config import CHECKPOINT_SNAPSHOT_EVERY
+from app.core.memory import SessionStore
+from app.workflows.loan_state import messages_log_reducer
+from benchmarks.loadtest import RESULTS_DIR, git_commit
+
+MESSAGES_PER_TURN = 4       # user, tool call, tool result, reply
+
+
+class FullState(TypedDict):
+    messages: Annotated[List[BaseMessage], add_messages]
+    is_verified: bool
+
+
+class DeltaState(TypedDict):
+    messages: Annotated[List[BaseMessage], DeltaChannel(messages_log_reducer,
+                                                       snapshot_frequency=CHECKPOINT_SNAPSHOT_EVERY)]
+    is_verified: bool
+
+
+class CountingSerde:
+    def __init__(self, serde):
+        self.serde = serde
+        self.bytes = 0
+
+    def dumps_typed(self, obj):
+        kind, data = self.serde.dumps_typed(obj)
+        self.bytes += len(data)
+        return kind, data
+
+    def loads_typed(self, data):
+        return self.serde.loads_typed(data)
+
+
+def assistant(state):
+    last = state["messages"][-1]
+    n = len(state["messages"])
+    if isinstance(last, HumanMessage):
+        return {"messages": [AIMessage(content="", tool_calls=[
+            {"name": "get_loan_requirements", "args": {"loan_type": "home"}, "id": f"call-{n}"}])]}
+    return {"messages": [AIMessage(content=f"Here is what I found for you, step {n}. " * 4)]}
+
+
+def tools(state):
+    call = state["messages"][-1].tool_calls[0]
+    return {"messages": [ToolMessage(content=json.dumps(["full_name", "employment_type", "annual_income",
+                                                         "annual_expenses", "zip_code"]),
+                                     name=call["name"], tool_call_id=call["id"])]}
+
+
+def updater(state):
+    return {"is_verified": True}
+
+
+def build(schema, store):
+    builder = StateGraph(schema)
+    builder.add_node("assistant", assistant)
+    builder.add_node("tools", tools)
+    builder.add_node("updater", updater)
+    builder.set_entry_point("assistant")
+    builder.add_conditional_edges(
+        "assistant", lambda s: "tools" if s["messages"][-1].tool_calls else END, ["tools", END])
+    builder.add_edge("tools", "updater")
+    builder.add_edge("updater", "assistant")
+    return builder.compile(checkpointer=store)
+
+
+def resident_bytes(store, thread_id: str) -> int:
+    with store._lock:
+        size = sum(len(cp[0][1]) + len(cp[1][1])
+                   for checkpoints in store.storage.get(thread_id, {}).values() for cp in checkpoints.values())
+        size += sum(len(blob[1]) for key, blob in store.blobs.items() if key[0] == thread_id)
+        size += sum(len(w[2][1]) for key, writes in store.writes.items() if key[0] == thread_id
+                    for w in writes.values())
+    return size
+
+
+def hibernated_bytes(store, thread_id: str) -> int:
+    with store._lock:
+        storage = store.storage.get(thread_id, {})
+        writes = {k: v for k, v in store.writes.items() if k[0] == thread_id}
+        blobs = {k: v for k, v in store.blobs.items() if k[0] == thread_id}
+        return len(pickle.dumps((storage, writes, blobs), protocol=pickle.HIGHEST_PROTOCOL))
+
+
+def run(mode: str, checkpoints: list[int], tmp: str) -> list[dict]:
+    from app.core.state_backend import SQLiteStateBackend
+
+    store = SessionStore(backend=SQLiteStateBackend(os.path.join(tmp, f"{mode}.db")), shared=False)
+    store.serde = CountingSerde(store.serde)
+    graph = build(DeltaState if mode == "delta" else FullState, store)
+    config = {"configurable": {"thread_id": f"bench-{mode}"}}
+
+    rows = []
+    turn = 0
+    for target in checkpoints:
+        samples = []
+        while turn * MESSAGES_PER_TURN < target:
+            before, started = store.serde.bytes, time.process_time()
+            graph.invoke({"messages": [HumanMessage(content=f"Message {turn}: tell me what I need for a loan")]},
+                         config)
+            samples.append((store.serde.bytes - before, time.process_time() - started))
+            turn += 1
+        # Average over the last few turns before the mark (the snapshot turns included)
+        window = samples[-min(len(samples), max(1, CHECKPOINT_SNAPSHOT_EVERY // 4)):]
+        messages = len(graph.get_state(config).values["messages"])
+        rows.append({
+            "mode": mode,
+            "messages": messages,
+            "bytes_per_turn": round(sum(s[0] for s in window) / len(window)),
+            "cpu_ms_per_turn": round(sum(s[1] for s in window) / len(window) * 1000, 2),
+            "resident_bytes": resident_bytes(store, config["configurable"]["thread_id"]),
+            "hibernated_bytes": hibernated_bytes(store, config["configurable"]["thread_id"]),
+            "resident_checkpoints": sum(len(c) for c in store.storage[config["configurable"]["thread_id"]].values()),
+        })
+    return rows
+
+
+def main():
+    import tempfile
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, nargs="+", default=[50, 200, 800])
+    args = parser.parse_args()
+
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for mode in ("full", "delta"):
+            rows += run(mode, sorted(args.messages), tmp)
+
+    print(f"\n{'mode':6} {'messages':>8} {'bytes/turn':>11} {'cpu_ms/turn':>12} {'resident':>10} "
+          f"{'hibernated':>11} {'checkpoints':>12}")
+    for row in rows:
+        print(f"{row['mode']:6} {row['messages']:>8} {row['bytes_per_turn']:>11} {row['cpu_ms_per_turn']:>12} "
+              f"{row['resident_bytes']:>10} {row['hibernated_bytes']:>11} {row['resident_checkpoints']:>12}")
+
+    out = os.path.join(RESULTS_DIR, f"checkpoints-{git_commit()}.json")
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    with open(out, "w") as f:
+        json.dump({"params": {**vars(args), "snapshot_every": CHECKPOINT_SNAPSHOT_EVERY}, "runs": rows}, f, indent=2)
+    print(f"wrote {out}")
+
+
+if __name__ == "__main__":
+    main()
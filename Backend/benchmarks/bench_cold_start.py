@@ -0,0 +1,91 @@
+"""
+Worker cold-start benchmark.
+
+Each run is a fresh Python process (in a scratch directory, so it gets its own
+SQLite files) that measures:
+  import_s         importing app.main
+  startup_s        FastAPI lifespan: init_db, client/graph construction, warm-up
+  first_request_s  first POST /chat after /ready
+  second_request_s the next /chat on the same worker
+
+The LLM is the local stub, so the request numbers are our own overhead plus
+the stub latency.
+
+    cd Backend && python -m benchmarks.bench_cold_start --runs 5
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.fake_llm import serve
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def child():
+    started = time.perf_counter()
+    from app.main import app
+    imported = time.perf_counter()
+
+    from fastapi.testclient import TestClient
+
+    with TestClient(app) as client:
+        ready = time.perf_counter()
+        assert client.get("/ready").status_code == 200
+
+        t0 = time.perf_counter()
+        client.post("/chat", json={"user_id": "bench", "text": "Hi, I want a loan"})
+        t1 = time.perf_counter()
+        client.post("/chat", json={"user_id": "bench", "text": "A new loan please"})
+        t2 = time.perf_counter()
+
+    print(json.dumps({
+        "import_s": imported - started,
+        "startup_s": ready - imported,
+        "first_request_s": t1 - t0,
+        "second_request_s": t2 - t1,
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--latency", type=float, default=0.05, help="stub LLM latency in seconds")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        return child()
+
+    results = []
+    with serve(port=args.port, latency=args.latency) as base_url:
+        env = {
+            **os.environ,
+            "PYTHONPATH": BACKEND_DIR,
+            "LLM_BASE_URL": base_url,
+            "OPENROUTER_API_KEY": "stub",
+        }
+        for _ in range(args.runs):
+            with tempfile.TemporaryDirectory() as scratch:
+                out = subprocess.run(
+                    [sys.executable, "-m", "benchmarks.bench_cold_start", "--child"],
+                    cwd=scratch, env=env, capture_output=True, text=True, check=True,
+                )
+            results.append(json.loads(out.stdout.strip().splitlines()[-1]))
+
+    summary = {
+        key: round(statistics.median(r[key] for r in results) * 1000, 1)
+        for key in results[0]
+    }
+    print(f"median of {args.runs} runs (ms), stub latency {args.latency * 1000:.0f} ms")
+    print(json.dumps({k.replace("_s", "_ms"): v for k, v in summary.items()}))
+
+
+if __name__ == "__main__":
+    main()
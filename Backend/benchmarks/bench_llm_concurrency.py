@@ -0,0 +1,107 @@
+"""
+Concurrent-conversation throughput of one worker, before/after async agents.
+
+  before: async node calling the blocking llm.invoke (default, unshared
+          ChatOpenAI client) directly, so each call stalls the event loop
+  after:  async loan_assistant node (llm.ainvoke on the shared pooled client)
+
+(A plain sync node wouldn't show the difference: LangGraph runs sync nodes in
+a thread executor, so they never block the loop.)
+
+Both run the same loan assistant prompt through a one-node graph against the
+local stub LLM, so the numbers only reflect how the worker handles concurrency.
+
+    cd Backend && python -m benchmarks.bench_llm_concurrency --conversations 50 --turns 3
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+from benchmarks.fake_llm import serve
+
+
+def build_graphs():
+    from langchain_openai import ChatOpenAI
+    from langgraph.checkpoint.memory import MemorySaver
+    from langgraph.graph import StateGraph, START, END
+
+    from app.agents.loan_agent import build_loan_prompt, loan_assistant
+    from app.core.config import LLM_BASE_URL
+    from app.tools import LOAN_TOOLS
+    from app.workflows.loan_state import LoanState
+
+    blocking_llm = ChatOpenAI(
+        model="gpt-4o-mini",
+        api_key="stub",
+        base_url=LLM_BASE_URL,
+    ).bind_tools(LOAN_TOOLS)
+
+    async def blocking_assistant(state: LoanState):
+        # The blocking call on the loop's own thread: nothing else runs until it returns
+        return {"messages": [blocking_llm.invoke(build_loan_prompt(state))]}
+
+    graphs = {}
+    for name, node in (("before (blocking invoke)", blocking_assistant), ("after (async ainvoke)", loan_assistant)):
+        builder = StateGraph(LoanState)
+        builder.add_node("assistant", node)
+        builder.add_edge(START, "assistant")
+        builder.add_edge("assistant", END)
+        graphs[name] = builder.compile(checkpointer=MemorySaver())
+    return graphs
+
+
+async def run_conversation(graph, conversation_id: str, turns: int, latencies: list):
+    from langchain_core.messages import HumanMessage
+
+    config = {"configurable": {"thread_id": conversation_id}}
+    for turn in range(turns):
+        payload = {"messages": [HumanMessage(content=f"Hi, this is turn {turn}")]}
+        if turn == 0:
+            payload.update({"is_verified": False, "account_exists": None, "user_account": {},
+                            "required_fields": [], "active_agent": "loan"})
+        started = time.perf_counter()
+        await graph.ainvoke(payload, config)
+        latencies.append(time.perf_counter() - started)
+
+
+async def run(graph, name: str, conversations: int, turns: int):
+    latencies = []
+    started = time.perf_counter()
+    await asyncio.gather(*(
+        run_conversation(graph, f"{name}-{i}", turns, latencies) for i in range(conversations)
+    ))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "turns": len(latencies),
+        "elapsed_s": round(elapsed, 2),
+        "turns_per_s": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(statistics.median(latencies) * 1000),
+        "p95_ms": round(latencies[int(len(latencies) * 0.95) - 1] * 1000),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--conversations", type=int, default=50)
+    parser.add_argument("--turns", type=int, default=3)
+    parser.add_argument("--latency", type=float, default=0.2, help="stub LLM latency in seconds")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    with serve(port=args.port, latency=args.latency) as base_url:
+        os.environ["LLM_BASE_URL"] = base_url
+        os.environ.setdefault("OPENROUTER_API_KEY", "stub")
+
+        graphs = build_graphs()
+        print(f"{args.conversations} concurrent conversations x {args.turns} turns, "
+              f"stub latency {args.latency * 1000:.0f} ms")
+        for name, graph in graphs.items():
+            result = asyncio.run(run(graph, name, args.conversations, args.turns))
+            print(f"{name:24} " + "  ".join(f"{k}={v}" for k, v in result.items()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Loan submission throughput: one transaction per application vs. the
+write-behind group-commit queue.
+
+  direct:       save_loan(), INSERT + COMMIT per application (the old path)
+  write-behind: loan_writer.submit(), reference returned at once, rows
+                group-committed in batches
+  durable:      same queue, submit() returns after the batch commit
+
+--concurrency submissions are in flight at a time (think: that many customers
+pressing "submit" together). Reports inserts/s (all rows committed) and
+submit() latency. Every mode starts from an empty database in a scratch dir.
+The app runs SQLite with synchronous=NORMAL; --synchronous FULL shows the
+fsync-per-commit case.
+
+    cd Backend && python -m benchmarks.bench_loan_writes --submissions 5000 --concurrency 100
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+from app.db import session
+from benchmarks.loadtest import percentiles
+
+DETAILS = {
+    "full_name": "Bench Customer", "employment_type": "salaried", "annual_income": "150000",
+    "annual_expense": "40000", "property_value": "500000", "zip_code": "10001",
+    "requested_amount": "300000", "loan_type": "new",
+}
+
+
+async def run_mode(mode: str, submissions: int, concurrency: int, batch_size: int, max_delay_ms: float) -> dict:
+    from app.db.models import init_db, save_loan
+    from app.db.write_behind import LoanWriter
+
+    init_db()
+    writer = LoanWriter(batch_size=batch_size, max_delay_ms=max_delay_ms, durable=mode == "durable")
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def submit(i):
+        async with semaphore:
+            started = time.perf_counter()
+            if mode == "direct":
+                await save_loan(f"user-{i % 1000}", DETAILS)
+            else:
+                await writer.submit(f"user-{i % 1000}", DETAILS)
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(submit(i) for i in range(submissions)))
+    await writer.close()
+    elapsed = time.perf_counter() - started
+
+    rows = session.get_connection().execute("SELECT COUNT(*) FROM loan_applications").fetchone()[0]
+    stats = writer.stats()
+    return {
+        "inserts_per_s": round(rows / elapsed),
+        "rows": rows,
+        "submit": percentiles(latencies),
+        "commits": rows if mode == "direct" else stats["batches"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--submissions", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--batch-size", type=int, default=200)
+    parser.add_argument("--max-delay-ms", type=float, default=20)
+    parser.add_argument("--synchronous", choices=["NORMAL", "FULL"], default="NORMAL")
+    args = parser.parse_args()
+
+    session.PRAGMAS = tuple(p for p in session.PRAGMAS if "synchronous" not in p) + (
+        f"PRAGMA synchronous={args.synchronous}",
+    )
+    print(f"{args.submissions} submissions, concurrency {args.concurrency}, batch {args.batch_size} / "
+          f"{args.max_delay_ms} ms, synchronous={args.synchronous}")
+    print(f"{'mode':13} {'inserts/s':>10} {'commits':>8} {'submit_p50_ms':>14} {'submit_p99_ms':>14}")
+    home = os.getcwd()
+    for mode in ("direct", "write-behind", "durable"):
+        with tempfile.TemporaryDirectory() as scratch:
+            os.chdir(scratch)
+            try:
+                row = asyncio.run(run_mode(mode, args.submissions, args.concurrency,
+                                           args.batch_size, args.max_delay_ms))
+            finally:
+                session.pool.close()
+                os.chdir(home)
+        print(f"{mode:13} {row['inserts_per_s']:>10} {row['commits']:>8} "
+              f"{row['submit']['p50_ms']:>14} {row['submit']['p99_ms']:>14}")
+
+
+if __name__ == "__main__":
+    main()
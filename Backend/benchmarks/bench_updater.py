@@ -0,0 +1,129 @@
+"""
+Cost of the `updater` node per call on long sessions, before/after typed tool
+artifacts.
+
+  before: every ToolMessage content re-parsed (quote swap + json.loads, falling
+          back to ast.literal_eval), as parse_tool_output used to do
+  after:  updater reads ToolMessage.artifact
+
+Each session repeats a verification / agent lookup / requirements exchange; the
+updater runs on the full history with a 3-tool final step. Some customer names
+contain an apostrophe, which the old parser could not read back.
+
+    cd Backend && python -m benchmarks.bench_updater --lengths 20 200 2000
+"""
+import argparse
+import ast
+import json
+import timeit
+
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+
+from app.tools.artifacts import with_artifact
+from app.workflows.loan_graph import latest_tool_results, updater
+
+
+def parse_tool_output(content):
+    """The old string parser, kept here for comparison."""
+    if isinstance(content, (dict, list)):
+        return content
+    if not isinstance(content, str):
+        return None
+
+    content = content.strip()
+    if content.startswith(("{", "[")):
+        try:
+            return json.loads(content.replace("'", '"'))
+        except Exception:
+            try:
+                return ast.literal_eval(content)
+            except Exception:
+                return None
+    return None
+
+
+def updater_before(state):
+    updates = {}
+    for tool_msg in latest_tool_results(state["messages"]):
+        data = parse_tool_output(tool_msg.content)
+        if isinstance(data, dict):
+            if "account_exists" in data:
+                updates["account_exists"] = data["account_exists"]
+                if data["account_exists"] is False:
+                    updates["active_agent"] = "account"
+            if "account_details" in data:
+                updates["user_account"] = data["account_details"]
+            if "bank_agent" in data:
+                updates["bank_agent"] = data["bank_agent"]
+        elif isinstance(data, list):
+            updates["required_fields"] = data
+
+    if not state.get("is_verified") and state.get("user_account"):
+        for msg in reversed(state["messages"]):
+            if isinstance(msg, HumanMessage):
+                text = msg.content.lower()
+                if any(k in text for k in ["yes", "confirm", "that's me", "correct", "it is"]):
+                    updates["is_verified"] = True
+                break
+    return updates
+
+
+def tool_step(i: int) -> list:
+    name = "Sean O'Brien" if i % 2 else "Alice Smith"
+    account = {"name": name, "email": "customer@example.com", "customer_tier": "Gold", "customer_id": f"12{i:04d}"}
+    agent = {"agent_id": "NYC-AG-001", "name": "Sarah Thompson", "branch": "Midtown Manhattan"}
+    fields = ["full_name", "employment_type", "annual_income", "zip_code"]
+    results = [
+        ("verify_otp_and_fetch_account",
+         with_artifact({"status": "success", "account_exists": True, "account_details": account},
+                       status="success", account_exists=True, account=account)),
+        ("get_agent_info",
+         with_artifact({"status": "Agent Found", "bank_agent": agent}, status="Agent Found", bank_agent=agent)),
+        ("get_loan_requirements", with_artifact(fields, required_fields=fields)),
+    ]
+    calls = [{"name": name, "args": {}, "id": f"call_{i}_{n}"} for n, (name, _) in enumerate(results)]
+    return [
+        HumanMessage(content=f"message {i}"),
+        AIMessage(content="", tool_calls=calls),
+        *[
+            ToolMessage(content=content, artifact=artifact, name=name, tool_call_id=call["id"])
+            for call, (name, (content, artifact)) in zip(calls, results)
+        ],
+    ]
+
+
+def build_session(length: int) -> dict:
+    messages = []
+    i = 0
+    while len(messages) < length:
+        messages += tool_step(i) + [AIMessage(content="Anything else?")]
+        i += 1
+    messages = messages[:max(0, length - 5)] + tool_step(i)
+    return {"messages": messages, "is_verified": False, "user_account": {}}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lengths", type=int, nargs="+", default=[20, 200, 2000])
+    parser.add_argument("--number", type=int, default=20000)
+    args = parser.parse_args()
+
+    print(f"{'messages':>8} {'before_us':>10} {'after_us':>9} {'speedup':>8}  account read back (before/after)")
+    for length in args.lengths:
+        state = build_session(length)
+        before = timeit.timeit(lambda: updater_before(state), number=args.number) / args.number
+        after = timeit.timeit(lambda: updater(state), number=args.number) / args.number
+
+        # One O'Brien and one Smith step: how often does the account survive the round trip?
+        read_back = [0, 0]
+        for i in range(2):
+            step_state = {"messages": tool_step(i), "is_verified": True}
+            read_back[0] += "user_account" in updater_before(step_state)
+            read_back[1] += "user_account" in updater(step_state)
+
+        print(f"{len(state['messages']):>8} {before * 1e6:>10.2f} {after * 1e6:>9.2f} "
+              f"{before / after:>7.1f}x  {read_back[0]}/2 / {read_back[1]}/2")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""
+Throughput vs. uvicorn worker count with sessions and OTPs in the shared state
+backend (SESSION_SHARED=1 for more than one worker).
+
+Runs benchmarks.loadtest once per worker count and reports requests/s, the
+speed-up over one worker and the scaling efficiency (speed-up / workers).
+Conversation turns are spread over the workers, so every conversation also
+checks that a session and its OTP survive moving between processes.
+
+The stub LLM latency is kept low so the app's own CPU work is the bottleneck;
+scaling is bounded by the number of CPU cores (reported with the results).
+
+    cd Backend && python -m benchmarks.bench_workers --workers 1 2 4
+    python -m benchmarks.bench_workers --workers 1 2 4 --state-backend redis
+"""
+import argparse
+import json
+import os
+
+from benchmarks.loadtest import RESULTS_DIR, git_commit, run_load
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--state-backend", choices=["sqlite", "redis"], default="sqlite")
+    parser.add_argument("--conversations", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--latency", type=float, default=0.02, help="stub LLM latency in seconds")
+    args = parser.parse_args()
+
+    cpus = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count()
+    rows = []
+    for workers in args.workers:
+        result = run_load(args.conversations, args.concurrency, workers=workers, latency=args.latency,
+                          jitter=args.latency / 4, state_backend=args.state_backend)
+        rows.append({
+            "workers": workers,
+            "rps": result["rps"],
+            "p50_ms": result["overall"]["p50_ms"],
+            "p95_ms": result["overall"]["p95_ms"],
+            "completed": result["conversations_completed"],
+            "errors": result["errors"],
+        })
+
+    base = rows[0]["rps"] / rows[0]["workers"]
+    print(f"\n{args.state_backend} state backend, {cpus} CPU core(s)")
+    print(f"{'workers':>7} {'rps':>8} {'speedup':>8} {'efficiency':>10} {'p50_ms':>8} {'p95_ms':>8} {'completed':>10}")
+    for row in rows:
+        row["speedup"] = round(row["rps"] / rows[0]["rps"], 2)
+        row["efficiency"] = round(row["rps"] / (base * row["workers"]), 2)
+        print(f"{row['workers']:>7} {row['rps']:>8} {row['speedup']:>7}x {row['efficiency']:>10} "
+              f"{row['p50_ms']!s:>8} {row['p95_ms']!s:>8} {row['completed']:>5}/{args.conversations}")
+
+    out = os.path.join(RESULTS_DIR, f"workers-{args.state_backend}-{git_commit()}.json")
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    with open(out, "w") as f:
+        json.dump({"cpus": cpus, "params": vars(args), "runs": rows}, f, indent=2)
+    print(f"wrote {out}")
+
+
+if __name__ == "__main__":
+    main()
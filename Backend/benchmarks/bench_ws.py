@@ -0,0 +1,141 @@
+"""
+Per-turn latency of the WebSocket chat channel vs. the HTTP endpoints, and
+its connection limit, against a real uvicorn server and the local stub LLM.
+
+  http: every turn is a POST /chat on a keep-alive connection (no streaming)
+  sse:  every turn is a POST /chat/stream, read until the "done" event
+  ws:   one /ws/chat/{user_id} connection per user, every turn is one frame,
+        read until the "done" event
+
+"first" is the time to the first streamed event (token or tool progress).
+
+Then opens --extra connections beyond WS_MAX_CONNECTIONS (set to --users) and
+counts how many are refused with close code 1013.
+
+    cd Backend && python -m benchmarks.bench_ws --users 50 --turns 10
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+from websockets.asyncio.client import connect
+from websockets.exceptions import ConnectionClosed
+
+from benchmarks.fake_llm import serve
+from benchmarks.loadtest import BACKEND_DIR, percentiles, wait_ready
+
+
+async def http_user(client: httpx.AsyncClient, user: str, turns: int, latencies: list, first: list):
+    for turn in range(turns):
+        started = time.perf_counter()
+        response = await client.post("/chat", json={"user_id": user, "text": f"Hello, turn {turn}"})
+        response.raise_for_status()
+        latencies.append(time.perf_counter() - started)
+
+
+async def sse_user(client: httpx.AsyncClient, user: str, turns: int, latencies: list, first: list):
+    for turn in range(turns):
+        started, first_at = time.perf_counter(), None
+        payload = {"user_id": user, "text": f"Hello, turn {turn}"}
+        async with client.stream("POST", "/chat/stream", json=payload) as response:
+            async for line in response.aiter_lines():
+                if line.startswith("event:") and first_at is None:
+                    first_at = time.perf_counter() - started
+        latencies.append(time.perf_counter() - started)
+        first.append(first_at)
+
+
+async def ws_user(ws_url: str, user: str, turns: int, latencies: list, first: list):
+    async with connect(f"{ws_url}/ws/chat/{user}") as ws:
+        json.loads(await ws.recv())     # ready
+        for turn in range(turns):
+            started, first_at = time.perf_counter(), None
+            await ws.send(json.dumps({"text": f"Hello, turn {turn}"}))
+            while True:
+                event = json.loads(await ws.recv())["event"]
+                if first_at is None:
+                    first_at = time.perf_counter() - started
+                if event in ("done", "error"):
+                    break
+            latencies.append(time.perf_counter() - started)
+            first.append(first_at)
+
+
+async def run_mode(mode: str, base_url: str, users: int, turns: int) -> dict:
+    latencies, first = [], []
+    started = time.perf_counter()
+    if mode == "ws":
+        ws_url = base_url.replace("http://", "ws://")
+        await asyncio.gather(*(ws_user(ws_url, f"ws-{i}", turns, latencies, first) for i in range(users)))
+    else:
+        user = http_user if mode == "http" else sse_user
+        limits = httpx.Limits(max_connections=users, max_keepalive_connections=users)
+        async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+            await asyncio.gather(*(user(client, f"{mode}-{i}", turns, latencies, first) for i in range(users)))
+    elapsed = time.perf_counter() - started
+    return {"rps": round(len(latencies) / elapsed, 1), **percentiles(latencies),
+            "first_p50_ms": percentiles(first)["p50_ms"] if first else None}
+
+
+async def connection_limit(base_url: str, users: int, extra: int) -> dict:
+    ws_url = base_url.replace("http://", "ws://")
+    accepted, refused = [], 0
+    for i in range(users + extra):
+        ws = await connect(f"{ws_url}/ws/chat/limit-{i}")
+        try:
+            json.loads(await ws.recv())
+            accepted.append(ws)
+        except ConnectionClosed as e:
+            refused += e.rcvd is not None and e.rcvd.code == 1013
+    stats = httpx.get(f"{base_url}/ws/stats").json()
+    for ws in accepted:
+        await ws.close()
+    return {"opened": users + extra, "accepted": len(accepted), "refused_1013": refused,
+            "server_connections": stats["connections"], "max_connections": stats["max_connections"]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--turns", type=int, default=10)
+    parser.add_argument("--extra", type=int, default=10, help="connections beyond the limit")
+    parser.add_argument("--latency", type=float, default=0.05, help="stub LLM latency in seconds")
+    parser.add_argument("--port", type=int, default=8801)
+    parser.add_argument("--llm-port", type=int, default=8768)
+    args = parser.parse_args()
+
+    base_url = f"http://127.0.0.1:{args.port}"
+    with serve(port=args.llm_port, latency=args.latency) as llm_url, tempfile.TemporaryDirectory() as scratch:
+        env = {
+            **os.environ,
+            "PYTHONPATH": BACKEND_DIR,
+            "LLM_BASE_URL": llm_url,
+            "OPENROUTER_API_KEY": "stub",
+            "WS_MAX_CONNECTIONS": str(args.users),
+        }
+        server = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(args.port), "--log-level", "warning"],
+            cwd=scratch, env=env, stdout=subprocess.DEVNULL,
+        )
+        try:
+            wait_ready(base_url, server)
+            print(f"{args.users} users x {args.turns} turns, stub latency {args.latency * 1000:.0f} ms")
+            print(f"{'mode':6} {'rps':>7} {'p50_ms':>8} {'p95_ms':>8} {'p99_ms':>8} {'first_p50_ms':>12}")
+            for mode in ("http", "sse", "ws"):
+                row = asyncio.run(run_mode(mode, base_url, args.users, args.turns))
+                print(f"{mode:6} {row['rps']:>7} {row['p50_ms']:>8} {row['p95_ms']:>8} {row['p99_ms']:>8} "
+                      f"{row['first_p50_ms']!s:>12}")
+            print("connection limit:", asyncio.run(connection_limit(base_url, args.users, args.extra)))
+        finally:
+            server.terminate()
+            server.wait(timeout=30)
+
+
+if __name__ == "__main__":
+    main()
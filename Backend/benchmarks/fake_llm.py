@@ -0,0 +1,275 @@
+"""
+Local OpenAI-compatible stub server for benchmarks.
+
+Serves POST /v1/chat/completions (plain and stream=true) with a configurable
+artificial latency, so benchmarks measure our own overhead instead of the
+provider's.
+
+Faults (for the resilience benchmark), each drawn per request:
+  error_rate       answer 503
+  rate_limit_rate  answer 429 with Retry-After: 0
+  slow_rate        add slow_latency seconds (a tail-latency spike)
+
+Responders decide what the "model" says:
+  default_responder      one fixed sentence, never calls tools
+  scripted_loan_responder walks a full loan conversation (OTP, verification,
+                          requirements, eligibility, submission) with real tool calls
+"""
+import asyncio
+import json
+import multiprocessing
+import random
+import re
+import socket
+import time
+import uuid
+from contextlib import contextmanager
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+
+def default_responder(body: dict) -> dict:
+    """Returns the assistant message for a request: {"content": str, "tool_calls": [...]}."""
+    return {"content": "Sure, how can I help you with your loan today?"}
+
+
+# --- scripted loan conversation ---
+
+SCRIPTED_REPLIES = {
+    "send_otp": "I've sent a verification code to your mobile number. Please enter it here.",
+    "verify_otp_and_fetch_account": "Thanks, I found your account. Please confirm: is this you?",
+    "get_loan_requirements": (
+        "Please share your full name, employment type, annual income, annual expense, "
+        "property value, zip code, requested amount and employer name."
+    ),
+    "check_loan_eligibility": "Good news, you're eligible for this loan. Shall I submit the application?",
+    "submit_loan_application": "Your application has been submitted.",
+}
+
+_FIELD_RE = re.compile(r"(annual income|annual expense|property value|requested amount)\D*(\d+)")
+_NAME_RE = re.compile(r"full name ([a-z ]+?),")
+
+
+def _tool_name(messages: list, tool_call_id: str) -> str | None:
+    for msg in reversed(messages):
+        for call in msg.get("tool_calls") or []:
+            if call["id"] == tool_call_id:
+                return call["function"]["name"]
+    return None
+
+
+def _tool_args(messages: list, name: str) -> dict:
+    for msg in reversed(messages):
+        for call in msg.get("tool_calls") or []:
+            if call["function"]["name"] == name:
+                return json.loads(call["function"]["arguments"])
+    return {}
+
+
+def _tool_result(messages: list, name: str) -> str:
+    for msg in reversed(messages):
+        if msg.get("role") == "tool" and _tool_name(messages, msg.get("tool_call_id")) == name:
+            return str(msg.get("content") or "")
+    return ""
+
+
+def scripted_loan_responder(body: dict) -> dict:
+    """
+    Plays the loan assistant for benchmarks/loadtest.py. The reply depends only on
+    the request's messages: after a tool result it summarizes the result, after a
+    user message it picks the tool the real assistant would call.
+    """
+    messages = [m for m in body.get("messages", []) if m.get("role") != "system"]
+    if not messages:
+        return default_responder(body)
+    last = messages[-1]
+
+    if last["role"] == "tool":
+        name = _tool_name(messages, last.get("tool_call_id"))
+        reply = SCRIPTED_REPLIES.get(name, "Done.")
+        if name == "submit_loan_application":
+            reply = f"{reply} {last.get('content')}"
+        return {"content": reply}
+
+    text = str(last.get("content") or "").lower()
+    digits = re.findall(r"\d+", text)
+
+    if "mobile" in text and digits:
+        return {"content": "", "tool_calls": [{"name": "send_otp", "args": {"mobile": digits[-1]}}]}
+
+    if "code" in text and digits:
+        mobile = _tool_args(messages, "send_otp").get("mobile", "")
+        return {"content": "", "tool_calls": [
+            {"name": "verify_otp_and_fetch_account", "args": {"mobile": mobile, "otp": digits[-1]}},
+        ]}
+
+    if "income" in text:
+        fields = {key.replace(" ", "_"): value for key, value in _FIELD_RE.findall(text)}
+        name = _NAME_RE.search(text)
+        return {"content": "", "tool_calls": [{"name": "check_loan_eligibility", "args": {
+            "full_name": name.group(1).title() if name else "Customer",
+            **fields,
+        }}]}
+
+    if "submit" in text:
+        account = re.search(r"customer_id'?\"?:\s*'?\"?(\d+)", _tool_result(messages, "verify_otp_and_fetch_account"))
+        details = json.dumps(_tool_args(messages, "check_loan_eligibility"))
+        return {"content": "", "tool_calls": [{"name": "submit_loan_application", "args": {
+            "user_id": account.group(1) if account else "unknown",
+            "details": details,
+        }}]}
+
+    if "new loan" in text:
+        return {"content": "", "tool_calls": [{"name": "get_loan_requirements", "args": {"loan_type": "new"}}]}
+
+    if "yes" in text:
+        return {"content": "Great, you're verified. Would you like a new loan or a refinance?"}
+
+    return {"content": "Hello! To get started, please share your registered mobile number."}
+
+
+def create_app(latency: float = 0.2, responder=default_responder, jitter: float = 0.0, faults: dict | None = None) -> FastAPI:
+    app = FastAPI()
+    app.state.latency = latency
+    app.state.jitter = jitter
+    app.state.responder = responder
+    app.state.faults = {"error_rate": 0.0, "rate_limit_rate": 0.0, "slow_rate": 0.0, "slow_latency": 2.0,
+                        **(faults or {})}
+
+    @app.get("/v1/models")
+    async def models():
+        return {"object": "list", "data": [{"id": "gpt-4o-mini", "object": "model"}]}
+
+    @app.post("/v1/chat/completions")
+    async def completions(request: Request):
+        body = await request.json()
+        faults = app.state.faults
+        latency = app.state.latency + random.uniform(-app.state.jitter, app.state.jitter)
+        if random.random() < faults["slow_rate"]:
+            latency += faults["slow_latency"]
+        await asyncio.sleep(max(0.0, latency))
+
+        roll = random.random()
+        if roll < faults["error_rate"]:
+            return JSONResponse({"error": {"message": "stub: service unavailable", "type": "server_error"}},
+                                status_code=503)
+        if roll < faults["error_rate"] + faults["rate_limit_rate"]:
+            return JSONResponse({"error": {"message": "stub: rate limited", "type": "rate_limit"}},
+                                status_code=429, headers={"Retry-After": "0"})
+
+        reply = app.state.responder(body)
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+        model = body.get("model", "stub")
+        prompt_tokens = sum(len(str(m.get("content") or "")) for m in body.get("messages", [])) // 4
+        completion_tokens = len(reply.get("content") or "") // 4 + 1
+
+        tool_calls = [
+            {
+                "id": call.get("id", f"call_{uuid.uuid4().hex[:12]}"),
+                "type": "function",
+                "function": {"name": call["name"], "arguments": json.dumps(call.get("args", {}))},
+            }
+            for call in reply.get("tool_calls", [])
+        ]
+        message = {"role": "assistant", "content": reply.get("content") or ""}
+        if tool_calls:
+            message["tool_calls"] = tool_calls
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        }
+        finish_reason = "tool_calls" if tool_calls else "stop"
+
+        if not body.get("stream"):
+            return JSONResponse({
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "message": message, "finish_reason": finish_reason}],
+                "usage": usage,
+            })
+
+        async def events():
+            def chunk(delta, finish=None, **extra):
+                payload = {
+                    "id": completion_id,
+                    "object": "chat.completion.chunk",
+                    "created": int(time.time()),
+                    "model": model,
+                    "choices": [{"index": 0, "delta": delta, "finish_reason": finish}],
+                    **extra,
+                }
+                return f"data: {json.dumps(payload)}\n\n"
+
+            yield chunk({"role": "assistant", "content": ""})
+            for word in (message["content"] or "").split(" "):
+                if word:
+                    yield chunk({"content": word + " "})
+            for index, call in enumerate(tool_calls):
+                yield chunk({"tool_calls": [{"index": index, **call}]})
+            yield chunk({}, finish_reason)
+            if (body.get("stream_options") or {}).get("include_usage"):
+                yield f"data: {json.dumps({'id': completion_id, 'object': 'chat.completion.chunk', 'choices': [], 'usage': usage})}\n\n"
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    return app
+
+
+def _run_server(port: int, latency: float, responder, jitter: float, faults: dict | None):
+    uvicorn.run(
+        create_app(latency=latency, responder=responder, jitter=jitter, faults=faults),
+        host="127.0.0.1", port=port, log_level="warning",
+    )
+
+
+@contextmanager
+def serve(port: int = 8765, latency: float = 0.2, responder=default_responder, jitter: float = 0.0,
+          faults: dict | None = None):
+    """
+    Runs the stub in a separate process (so it doesn't compete with the code
+    under test for the GIL) and yields its OpenAI base URL.
+    `responder` must be a module-level function so it can be pickled.
+    """
+    process = multiprocessing.Process(target=_run_server, args=(port, latency, responder, jitter, faults), daemon=True)
+    process.start()
+    deadline = time.monotonic() + 10
+    while True:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.1).close()
+            break
+        except OSError:
+            if time.monotonic() > deadline or not process.is_alive():
+                process.terminate()
+                raise RuntimeError(f"stub LLM server did not start on port {port}")
+            time.sleep(0.05)
+    try:
+        yield f"http://127.0.0.1:{port}/v1"
+    finally:
+        process.terminate()
+        process.join()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="OpenAI-compatible stub LLM server")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--jitter", type=float, default=0.0, help="+/- seconds added to each reply")
+    parser.add_argument("--script", choices=["default", "loan"], default="default")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of requests answered with 503")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="share of requests answered with 429")
+    parser.add_argument("--slow-rate", type=float, default=0.0, help="share of requests delayed by --slow-latency")
+    parser.add_argument("--slow-latency", type=float, default=2.0)
+    args = parser.parse_args()
+    responder = scripted_loan_responder if args.script == "loan" else default_responder
+    faults = {"error_rate": args.error_rate, "rate_limit_rate": args.rate_limit_rate,
+              "slow_rate": args.slow_rate, "slow_latency": args.slow_latency}
+    uvicorn.run(create_app(latency=args.latency, responder=responder, jitter=args.jitter, faults=faults),
+                host="127.0.0.1", port=args.port)
@@ -0,0 +1,199 @@
+"""
+Local Redis-protocol stand-in for benchmarks and smoke tests of
+RedisStateBackend, so no Redis server is needed.
+
+Speaks RESP over TCP and implements just what the backend uses: PING, AUTH,
+SELECT, GET, SET (EX / PX / NX / XX), DEL, PTTL, SCAN (MATCH), DBSIZE, FLUSHDB
+and EVAL of the backend's delete-if-equals script. Keys expire lazily on access
+and every second in the background, like Redis. Single-threaded asyncio, so
+every command is atomic.
+
+    cd Backend && python -m benchmarks.fake_redis --port 6399
+    STATE_BACKEND=redis STATE_REDIS_URL=redis://127.0.0.1:6399/0 uvicorn app.main:app
+"""
+import asyncio
+import fnmatch
+import multiprocessing
+import socket
+import time
+from contextlib import contextmanager
+
+from app.core.state_backend import DELETE_IF_EQUALS_SCRIPT, encode_command
+
+
+def _bulk(value: bytes | None) -> bytes:
+    return b"$-1\r\n" if value is None else b"$%d\r\n%s\r\n" % (len(value), value)
+
+
+def _int(value: int) -> bytes:
+    return b":%d\r\n" % value
+
+
+class FakeRedis:
+    def __init__(self):
+        self.data = {}      # key -> (value, expires_at or None)
+
+    def _live(self, key: bytes):
+        entry = self.data.get(key)
+        if entry is not None and entry[1] is not None and entry[1] <= time.monotonic():
+            del self.data[key]
+            return None
+        return entry
+
+    def expire_keys(self):
+        now = time.monotonic()
+        for key in [k for k, (_, expires) in self.data.items() if expires is not None and expires <= now]:
+            del self.data[key]
+
+    def execute(self, args: list[bytes]) -> bytes:
+        command = args[0].upper().decode()
+        handler = getattr(self, f"cmd_{command.lower()}", None)
+        if handler is None:
+            return f"-ERR unknown command '{command}'\r\n".encode()
+        try:
+            return handler(*args[1:])
+        except (TypeError, ValueError, IndexError):
+            return f"-ERR wrong arguments for '{command}'\r\n".encode()
+
+    def cmd_ping(self, *args):
+        return b"+PONG\r\n"
+
+    def cmd_auth(self, *args):
+        return b"+OK\r\n"
+
+    def cmd_select(self, db):
+        return b"+OK\r\n"
+
+    def cmd_get(self, key):
+        entry = self._live(key)
+        return _bulk(entry[0] if entry else None)
+
+    def cmd_set(self, key, value, *options):
+        options = [option.upper() for option in options]
+        expires_at, i = None, 0
+        while i < len(options):
+            if options[i] in (b"EX", b"PX"):
+                seconds = float(options[i + 1]) / (1000 if options[i] == b"PX" else 1)
+                expires_at = time.monotonic() + seconds
+                i += 2
+            else:
+                i += 1
+        exists = self._live(key) is not None
+        if (b"NX" in options and exists) or (b"XX" in options and not exists):
+            return _bulk(None)
+        self.data[key] = (value, expires_at)
+        return b"+OK\r\n"
+
+    def cmd_del(self, *keys):
+        return _int(sum(self._live(key) is not None and self.data.pop(key) is not None for key in keys))
+
+    def cmd_pttl(self, key):
+        entry = self._live(key)
+        if entry is None:
+            return _int(-2)
+        return _int(-1 if entry[1] is None else int((entry[1] - time.monotonic()) * 1000))
+
+    def cmd_eval(self, script, numkeys, *rest):
+        if script.decode() != DELETE_IF_EQUALS_SCRIPT or int(numkeys) != 1:
+            return b"-ERR only the delete-if-equals script is supported\r\n"
+        key, expected = rest[0], rest[1]
+        entry = self._live(key)
+        if entry is not None and entry[0] == expected:
+            del self.data[key]
+            return _int(1)
+        return _int(0)
+
+    def cmd_scan(self, cursor, *options):
+        pattern = b"*"
+        for i, option in enumerate(options):
+            if option.upper() == b"MATCH":
+                pattern = options[i + 1]
+        self.expire_keys()
+        keys = [key for key in self.data if fnmatch.fnmatchcase(key.decode(), pattern.decode())]
+        return b"*2\r\n" + _bulk(b"0") + b"*%d\r\n" % len(keys) + b"".join(_bulk(key) for key in keys)
+
+    def cmd_dbsize(self):
+        self.expire_keys()
+        return _int(len(self.data))
+
+    def cmd_flushdb(self, *args):
+        self.data.clear()
+        return b"+OK\r\n"
+
+
+async def _read_command(reader: asyncio.StreamReader) -> list[bytes] | None:
+    line = await reader.readline()
+    if not line:
+        return None
+    if not line.startswith(b"*"):
+        return line.split()     # inline command (e.g. `PING` from telnet / redis-cli)
+    args = []
+    for _ in range(int(line[1:-2])):
+        length = int((await reader.readline())[1:-2])
+        args.append((await reader.readexactly(length + 2))[:-2])
+    return args
+
+
+async def run(port: int):
+    store = FakeRedis()
+
+    async def handle(reader, writer):
+        try:
+            while (args := await _read_command(reader)) is not None:
+                if args:
+                    writer.write(store.execute(args))
+                    await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def expire_loop():
+        while True:
+            await asyncio.sleep(1)
+            store.expire_keys()
+
+    server = await asyncio.start_server(handle, "127.0.0.1", port)
+    expirer = asyncio.create_task(expire_loop())
+    async with server:
+        await server.serve_forever()
+    expirer.cancel()
+
+
+def _run_server(port: int):
+    asyncio.run(run(port))
+
+
+@contextmanager
+def serve(port: int = 6399):
+    """Runs the stand-in in a separate process and yields its redis:// URL."""
+    process = multiprocessing.Process(target=_run_server, args=(port,), daemon=True)
+    process.start()
+    deadline = time.monotonic() + 10
+    while True:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.1) as sock:
+                sock.sendall(encode_command(("PING",)))
+                if sock.recv(16).startswith(b"+PONG"):
+                    break
+        except OSError:
+            pass
+        if time.monotonic() > deadline or not process.is_alive():
+            process.terminate()
+            raise RuntimeError(f"Redis stand-in did not start on port {port}")
+        time.sleep(0.05)
+    try:
+        yield f"redis://127.0.0.1:{port}/0"
+    finally:
+        process.terminate()
+        process.join()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Redis-protocol stand-in server")
+    parser.add_argument("--port", type=int, default=6399)
+    args = parser.parse_args()
+    print(f"listening on redis://127.0.0.1:{args.port}/0")
+    _run_server(args.port)
@@ -0,0 +1,318 @@
+"""
+End-to-end load test: many concurrent, complete loan conversations against a
+real uvicorn server, with the LLM replaced by the scripted local stub.
+
+Every conversation is the same 7 turns (greeting, mobile -> send_otp, code ->
+verify_otp_and_fetch_account, confirmation, new loan -> get_loan_requirements,
+details -> check_loan_eligibility, submit -> submit_loan_application), so the
+numbers cover routing, tools, checkpointing and the DB, not just one LLM call.
+
+Reports p50/p95/p99 per turn and overall, throughput and per-worker RSS, and
+writes them to benchmarks/results/loadtest-<commit>.json so runs on different
+commits can be compared:
+
+    cd Backend && python -m benchmarks.loadtest --conversations 200 --concurrency 50
+    python -m benchmarks.loadtest --compare benchmarks/results/loadtest-<old>.json
+
+With --workers N > 1 the server runs with SESSION_SHARED=1, so consecutive
+turns of one conversation may land on different workers; --state-backend picks
+the shared store (sqlite file, or redis against benchmarks/fake_redis.py).
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import ExitStack
+from datetime import datetime, timezone
+
+import httpx
+
+from benchmarks import fake_redis
+from benchmarks.fake_llm import scripted_loan_responder, serve
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(BACKEND_DIR, "benchmarks", "results")
+OTP_CODE = "4321"
+
+TURNS = [
+    ("greeting", "Hi, I'd like to apply for a loan"),
+    ("send_otp", "My mobile number is {mobile}"),
+    ("verify_otp", "The code is {otp}"),
+    ("confirm", "Yes, this is me"),
+    ("requirements", "I want a new loan"),
+    ("eligibility", (
+        "Full name Load Tester, salaried, annual income 150000, annual expense 40000, "
+        "property value 500000, zip 10001, requested amount 300000, employer Acme"
+    )),
+    ("submit", "Great, please submit the application"),
+]
+
+
+def loadtest_mobile(i: int) -> str:
+    """Mobile number of synthetic customer i (seeded by benchmarks/loadtest_app.py)."""
+    return f"555{i:07d}"
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR,
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+# --- worker memory (Linux /proc) ---
+
+def _rss_mb(pid: int) -> float | None:
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        return None
+    return None
+
+
+def worker_pids(server_pid: int) -> list[int]:
+    """uvicorn --workers N spawns N children; with one worker the server is the worker."""
+    pids = []
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+            with open(f"/proc/{entry}/cmdline", "rb") as f:
+                cmdline = f.read()
+        except (OSError, IndexError, ValueError):
+            continue
+        if ppid == server_pid and b"spawn_main" in cmdline:
+            pids.append(int(entry))
+    return sorted(pids) or [server_pid]
+
+
+class MemorySampler:
+    def __init__(self, pids: list[int]):
+        self.pids = pids
+        self.idle = {pid: _rss_mb(pid) for pid in pids}
+        self.peak = dict(self.idle)
+
+    def sample(self):
+        for pid in self.pids:
+            rss = _rss_mb(pid)
+            if rss is not None and rss > (self.peak[pid] or 0):
+                self.peak[pid] = rss
+
+    async def run(self, interval: float = 0.25):
+        while True:
+            self.sample()
+            await asyncio.sleep(interval)
+
+    def report(self) -> list[dict]:
+        return [
+            {"pid": pid, "idle_rss_mb": self.idle[pid], "peak_rss_mb": self.peak[pid], "end_rss_mb": _rss_mb(pid)}
+            for pid in self.pids
+        ]
+
+
+# --- load ---
+
+async def run_conversation(client: httpx.AsyncClient, i: int, latencies: dict, errors: list) -> bool:
+    user_id = f"loadtest-{i}"
+    reply = ""
+    for name, template in TURNS:
+        text = template.format(mobile=loadtest_mobile(i), otp=OTP_CODE)
+        started = time.perf_counter()
+        try:
+            response = await client.post("/chat", json={"user_id": user_id, "text": text})
+            response.raise_for_status()
+            reply = response.json()["response"]
+        except Exception as e:
+            errors.append(f"{name}: {type(e).__name__}: {e}")
+            return False
+        latencies[name].append(time.perf_counter() - started)
+    return "REF:" in reply
+
+
+def percentiles(values: list[float]) -> dict:
+    if len(values) < 2:
+        value = round(values[0] * 1000, 1) if values else None
+        return {"count": len(values), "p50_ms": value, "p95_ms": value, "p99_ms": value}
+    cuts = statistics.quantiles(values, n=100, method="inclusive")
+    return {
+        "count": len(values),
+        "p50_ms": round(cuts[49] * 1000, 1),
+        "p95_ms": round(cuts[94] * 1000, 1),
+        "p99_ms": round(cuts[98] * 1000, 1),
+        "max_ms": round(max(values) * 1000, 1),
+    }
+
+
+async def drive(base_url: str, conversations: int, concurrency: int, sampler: MemorySampler) -> dict:
+    latencies = {name: [] for name, _ in TURNS}
+    errors = []
+    semaphore = asyncio.Semaphore(concurrency)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=120) as client:
+        async def one(i):
+            async with semaphore:
+                return await run_conversation(client, i, latencies, errors)
+
+        memory_task = asyncio.create_task(sampler.run())
+        started = time.perf_counter()
+        completed = await asyncio.gather(*(one(i) for i in range(conversations)))
+        elapsed = time.perf_counter() - started
+        memory_task.cancel()
+        sampler.sample()
+
+    all_turns = [value for values in latencies.values() for value in values]
+    return {
+        "elapsed_s": round(elapsed, 2),
+        "requests": len(all_turns),
+        "rps": round(len(all_turns) / elapsed, 1),
+        "conversations_completed": sum(completed),
+        "conversations_per_s": round(sum(completed) / elapsed, 2),
+        "errors": len(errors),
+        "error_samples": errors[:5],
+        "overall": percentiles(all_turns),
+        "turns": {name: percentiles(values) for name, values in latencies.items()},
+    }
+
+
+def wait_ready(base_url: str, process: subprocess.Popen, timeout: float = 60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("app server exited during startup")
+        try:
+            if httpx.get(f"{base_url}/ready", timeout=1).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError("app server did not become ready")
+
+
+def compare(current: dict, previous_path: str):
+    with open(previous_path) as f:
+        previous = json.load(f)
+    print(f"\ncompared with {previous['commit']} ({previous_path})")
+    rows = [("rps", ("rps",)), ("p50_ms", ("overall", "p50_ms")),
+            ("p95_ms", ("overall", "p95_ms")), ("p99_ms", ("overall", "p99_ms"))]
+    for label, path in rows:
+        old, new = previous, current
+        for key in path:
+            old, new = old[key], new[key]
+        change = f"{(new - old) / old * 100:+.1f}%" if old else "n/a"
+        print(f"  {label:8} {old:>10} -> {new:<10} {change}")
+    old_rss = max(w["peak_rss_mb"] for w in previous["workers"])
+    new_rss = max(w["peak_rss_mb"] for w in current["workers"])
+    print(f"  {'peak_rss':8} {old_rss:>10} -> {new_rss:<10} {(new_rss - old_rss) / old_rss * 100:+.1f}%")
+
+
+def run_load(conversations: int, concurrency: int, workers: int = 1, latency: float = 0.2,
+             jitter: float = 0.05, port: int = 8800, llm_port: int = 8767,
+             state_backend: str = "sqlite", redis_port: int = 6399, faults: dict | None = None,
+             extra_env: dict | None = None) -> dict:
+    """
+    Starts the stub LLM (with `faults`, see fake_llm) and the app server (with
+    `extra_env`), drives the conversations, returns the results.
+    """
+    base_url = f"http://127.0.0.1:{port}"
+
+    with ExitStack() as stack:
+        llm_url = stack.enter_context(
+            serve(port=llm_port, latency=latency, responder=scripted_loan_responder, jitter=jitter, faults=faults))
+        # Scratch cwd: the server gets fresh SQLite files for every run
+        scratch = stack.enter_context(tempfile.TemporaryDirectory())
+        env = {
+            **os.environ,
+            "PYTHONPATH": BACKEND_DIR,
+            "LLM_BASE_URL": llm_url,
+            "OPENROUTER_API_KEY": "stub",
+            "OTP_FIXED_CODE": OTP_CODE,
+            "LOADTEST_USERS": str(conversations),
+            "STATE_BACKEND": state_backend,
+            "SESSION_SHARED": "1" if workers > 1 else "0",
+            **(extra_env or {}),
+        }
+        if state_backend == "redis":
+            env["STATE_REDIS_URL"] = stack.enter_context(fake_redis.serve(port=redis_port))
+
+        server = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "benchmarks.loadtest_app:app",
+             "--port", str(port), "--workers", str(workers), "--log-level", "warning"],
+            cwd=scratch, env=env, stdout=subprocess.DEVNULL,
+        )
+        try:
+            wait_ready(base_url, server)
+            if workers > 1:
+                # /ready answers as soon as one worker is up
+                time.sleep(2)
+            sampler = MemorySampler(worker_pids(server.pid))
+            print(f"{conversations} conversations x {len(TURNS)} turns, concurrency {concurrency}, "
+                  f"{workers} worker(s) ({state_backend} state), "
+                  f"stub latency {latency * 1000:.0f}±{jitter * 1000:.0f} ms")
+            load = asyncio.run(drive(base_url, conversations, concurrency, sampler))
+        finally:
+            server.terminate()
+            server.wait(timeout=30)
+
+    return {**load, "workers": sampler.report()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--conversations", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--state-backend", choices=["sqlite", "redis"], default="sqlite")
+    parser.add_argument("--latency", type=float, default=0.2, help="stub LLM latency in seconds")
+    parser.add_argument("--jitter", type=float, default=0.05, help="+/- stub latency jitter in seconds")
+    parser.add_argument("--port", type=int, default=8800)
+    parser.add_argument("--llm-port", type=int, default=8767)
+    parser.add_argument("--out", help="results file (default benchmarks/results/loadtest-<commit>.json)")
+    parser.add_argument("--compare", help="previous results file to diff against")
+    args = parser.parse_args()
+
+    commit = git_commit()
+    load = run_load(args.conversations, args.concurrency, workers=args.workers, latency=args.latency,
+                    jitter=args.jitter, port=args.port, llm_port=args.llm_port,
+                    state_backend=args.state_backend)
+
+    results = {
+        "commit": commit,
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "params": {k: v for k, v in vars(args).items() if k not in ("out", "compare")},
+        **load,
+    }
+
+    print(f"rps={results['rps']}  completed={results['conversations_completed']}/{args.conversations}  "
+          f"errors={results['errors']}")
+    print(f"{'turn':14} {'p50_ms':>8} {'p95_ms':>8} {'p99_ms':>8}")
+    for name, row in [*results["turns"].items(), ("overall", results["overall"])]:
+        print(f"{name:14} {row['p50_ms']!s:>8} {row['p95_ms']!s:>8} {row['p99_ms']!s:>8}")
+    for worker in results["workers"]:
+        print(f"worker {worker['pid']}: rss idle {worker['idle_rss_mb']} MB, peak {worker['peak_rss_mb']} MB")
+
+    out = args.out or os.path.join(RESULTS_DIR, f"loadtest-{commit}.json")
+    os.makedirs(os.path.dirname(out), exist_ok=True)
+    with open(out, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"wrote {out}")
+
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
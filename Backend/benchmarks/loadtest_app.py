@@ -0,0 +1,22 @@
+"""
+ASGI entry point for benchmarks/loadtest.py: the real app plus synthetic
+customers, so every simulated conversation logs in with its own mobile number.
+
+    uvicorn benchmarks.loadtest_app:app
+"""
+import os
+
+from app.main import app  # noqa: F401
+from app.mock.data import MOCK_USER_DB
+from benchmarks.loadtest import loadtest_mobile
+
+LOADTEST_USERS = int(os.getenv("LOADTEST_USERS", "10000"))
+
+
+for i in range(LOADTEST_USERS):
+    MOCK_USER_DB.setdefault(loadtest_mobile(i), {
+        "name": f"Load Tester {i}",
+        "email": f"loadtest{i}@example.com",
+        "customer_tier": "Silver",
+        "customer_id": f"9{i:06d}",
+    })
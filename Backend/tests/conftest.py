@@ -0,0 +1,63 @@
+"""
+Shared fixtures. Run from Backend/: `python -m pytest -q`.
+
+Every test runs in its own temporary directory, so the SQLite files the app
+opens by relative path (loans.db, sessions.db) never touch the working tree.
+"""
+from typing import Annotated, List, TypedDict
+
+import pytest
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
+from langgraph.channels import DeltaChannel
+from langgraph.graph import END, StateGraph
+from langgraph.graph.message import add_messages
+
+from app.core.state_backend import SQLiteStateBackend
+from app.workflows.loan_state import messages_log_reducer
+
+
+@pytest.fixture(autouse=True)
+def _in_tmp_path(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+
+
+@pytest.fixture
+def sqlite_backend(tmp_path):
+    backend = SQLiteStateBackend(str(tmp_path / "state.db"))
+    yield backend
+    backend.close()
+
+
+class FullState(TypedDict):
+    messages: Annotated[List[BaseMessage], add_messages]
+
+
+def delta_state(snapshot_every: int):
+    class DeltaState(TypedDict):
+        messages: Annotated[List[BaseMessage], DeltaChannel(messages_log_reducer, snapshot_frequency=snapshot_every)]
+    return DeltaState
+
+
+def build_graph(store, schema=FullState):
+    """One node that answers every user message, checkpointed by `store`."""
+    def reply(state):
+        return {"messages": [AIMessage(content=f"reply {len(state['messages'])}")]}
+
+    builder = StateGraph(schema)
+    builder.add_node("reply", reply)
+    builder.set_entry_point("reply")
+    builder.add_edge("reply", END)
+    return builder.compile(checkpointer=store)
+
+
+def turn(graph, thread_id: str, text: str):
+    return graph.invoke({"messages": [HumanMessage(content=text)]}, {"configurable": {"thread_id": thread_id}})
+
+
+async def aturn(graph, thread_id: str, text: str):
+    return await graph.ainvoke({"messages": [HumanMessage(content=text)]}, {"configurable": {"thread_id": thread_id}})
+
+
+def history(graph, thread_id: str) -> list[str]:
+    state = graph.get_state({"configurable": {"thread_id": thread_id}})
+    return [m.content for m in state.values.get("messages", [])]
@@ -0,0 +1,86 @@
+import asyncio
+
+import pytest
+from langchain_core.messages import AIMessage, AIMessageChunk, HumanMessage
+
+import app.api.chat as chat
+
+ASSISTANT = {"langgraph_node": "assistant"}
+
+
+class FakeGraph:
+    """Replays (namespace, mode, chunk) items like loan_graph.astream(..., subgraphs=True)."""
+
+    def __init__(self, items):
+        self.items = items
+
+    async def astream(self, *args, **kwargs):
+        for item in self.items:
+            yield item
+
+
+def stream(monkeypatch, items) -> list:
+    async def build_input_payload(texts, config, seeded=None):
+        return {"messages": [HumanMessage(content=texts[0])]}
+
+    monkeypatch.setattr(chat, "build_input_payload", build_input_payload)
+    monkeypatch.setattr(chat, "get_loan_graph", lambda: FakeGraph(items))
+
+    async def main():
+        input = chat.ChatInput(user_id="u1", text="hi")
+        return [event async for event in chat._stream_turn(input, {"configurable": {"thread_id": "u1"}})]
+
+    return asyncio.run(main())
+
+
+def tokens(message_id, *parts):
+    return [((), "messages", (AIMessageChunk(content=part, id=message_id), ASSISTANT)) for part in parts]
+
+
+def final(*messages):
+    return [((), "values", {"messages": [HumanMessage(content="hi", id="h1"), *messages]})]
+
+
+def test_streamed_reply_is_not_repeated(monkeypatch):
+    events = stream(monkeypatch, tokens("a1", "Hello ", "there") + final(AIMessage(content="Hello there", id="a1")))
+    assert events == [("token", {"text": "Hello "}), ("token", {"text": "there"}),
+                      ("done", {"response": "Hello there"})]
+
+
+def test_unstreamed_reply_is_sent_as_one_token(monkeypatch):
+    # Fast path / cached answer: no LLM tokens at all
+    events = stream(monkeypatch, final(AIMessage(content="Cached answer", id="c1")))
+    assert events == [("token", {"text": "Cached answer"}), ("done", {"response": "Cached answer"})]
+
+
+@pytest.mark.parametrize("reply", [
+    AIMessage(content="Answer from the hedge", id="hedge"),
+    AIMessage(content="Sorry, I'm having trouble right now.", id="fallback",
+              response_metadata={"fallback": "timeout"}),
+])
+def test_superseded_tokens_are_reset_before_the_final_reply(monkeypatch, reply):
+    # The primary streamed part of its answer, then lost to the hedge / timed out
+    events = stream(monkeypatch, tokens("primary", "Partial ") + final(reply))
+    assert events == [("token", {"text": "Partial "}), ("reset", {}), ("token", {"text": reply.content}),
+                      ("done", {"response": reply.content})]
+
+
+def test_earlier_streamed_message_is_not_a_reset(monkeypatch):
+    # Text streamed with a tool call earlier in the turn stays in the history
+    items = tokens("t1", "Let me check. ") + tokens("a2", "Done.") + final(
+        AIMessage(content="Let me check. ", id="t1"), AIMessage(content="Done.", id="a2"))
+    assert [event for event, _ in stream(monkeypatch, items)] == ["token", "token", "done"]
+
+
+def test_text_format_separates_the_final_reply(monkeypatch):
+    async def stream_turn(input, seeded=None):
+        for item in [("token", {"text": "Partial "}), ("reset", {}), ("token", {"text": "Full reply"}),
+                     ("done", {"response": "Full reply"})]:
+            yield item
+
+    monkeypatch.setattr(chat, "stream_turn", stream_turn)
+
+    async def main():
+        return "".join([part async for part in chat.text_stream(chat.ChatInput(user_id="u1", text="hi"))])
+
+    assert asyncio.run(main()) == "Partial \n\nFull reply"
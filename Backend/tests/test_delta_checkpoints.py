@@ -0,0 +1,76 @@
+import asyncio
+
+from conftest import aturn, build_graph, delta_state, history, turn
+from langchain_core.messages import BaseMessage, HumanMessage, RemoveMessage
+
+from app.core.memory import SessionStore, session_key
+from app.workflows.loan_state import messages_log_reducer
+
+SNAPSHOT_EVERY = 4
+
+
+def expected(turns: int) -> list[str]:
+    return [x for i in range(turns) for x in (f"m{i}", f"reply {2 * i + 1}")]
+
+
+def resident(store, thread_id: str) -> int:
+    return sum(len(cps) for cps in store.storage.get(thread_id, {}).values())
+
+
+def test_reducer_replaces_and_removes_by_id():
+    a, b = HumanMessage(content="a", id="1"), HumanMessage(content="b", id="2")
+    state = messages_log_reducer([], [[a, b]])
+    state = messages_log_reducer(state, [HumanMessage(content="a2", id="1"), RemoveMessage(id="2")])
+    assert [(m.id, m.content) for m in state] == [("1", "a2")]
+    # One batch or several give the same list
+    writes = [[a], [b], [RemoveMessage(id="1")]]
+    assert messages_log_reducer([], writes) == messages_log_reducer(messages_log_reducer([], writes[:2]), writes[2:])
+    assert all(isinstance(m, BaseMessage) for m in messages_log_reducer([("user", "hi")], []))
+
+
+def test_pruning_keeps_the_chain_back_to_the_snapshot(sqlite_backend):
+    store = SessionStore(backend=sqlite_backend, shared=False, max_checkpoints=1)
+    graph = build_graph(store, delta_state(SNAPSHOT_EVERY))
+    for i in range(12):
+        turn(graph, "t1", f"m{i}")
+        assert history(graph, "t1") == expected(i + 1)
+        # Never more than one snapshot interval (plus the latest) stays resident
+        assert resident(store, "t1") <= SNAPSHOT_EVERY + 1
+    assert store.stats()["pruned_checkpoints"] > 0
+
+
+def test_chain_survives_hibernation_and_rehydration(sqlite_backend):
+    store = SessionStore(backend=sqlite_backend, shared=False, max_checkpoints=1)
+    graph = build_graph(store, delta_state(SNAPSHOT_EVERY))
+    for i in range(5):
+        turn(graph, "t1", f"m{i}")
+    chain = resident(store, "t1")
+    assert chain > 1
+
+    store.release("t1")
+    assert resident(store, "t1") == 0 and sqlite_backend.get(session_key("t1")) is not None
+
+    # Another store (worker) picks the session up from the backend and keeps going
+    other = SessionStore(backend=sqlite_backend, shared=False, max_checkpoints=1)
+    other_graph = build_graph(other, delta_state(SNAPSHOT_EVERY))
+    assert history(other_graph, "t1") == expected(5)
+    assert resident(other, "t1") == chain
+
+    async def more():
+        for i in range(5, 14):
+            await aturn(other_graph, "t1", f"m{i}")
+
+    asyncio.run(more())
+    assert history(other_graph, "t1") == expected(14)
+    # The rehydrated chain was compacted once a newer snapshot was written
+    assert resident(other, "t1") <= SNAPSHOT_EVERY + 1
+    assert other.stats()["pruned_checkpoints"] > 0
+
+
+def test_store_without_delta_channels_keeps_only_latest(sqlite_backend):
+    store = SessionStore(backend=sqlite_backend, shared=False, max_checkpoints=1, delta_channels=())
+    graph = build_graph(store)
+    for i in range(6):
+        turn(graph, "t1", f"m{i}")
+    assert resident(store, "t1") == 1
+    assert history(graph, "t1") == expected(6)
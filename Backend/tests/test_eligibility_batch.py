@@ -0,0 +1,61 @@
+import json
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api import eligibility
+
+GOOD = {"id": "a", "annual_income": "150000", "annual_expense": "40000", "property_value": "500000",
+        "requested_amount": "300000"}
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    app.include_router(eligibility.router)
+    return TestClient(app)
+
+
+def post(client, body: bytes) -> list[dict]:
+    response = client.post("/eligibility/batch", content=body)
+    assert response.status_code == 200
+    return [json.loads(line) for line in response.text.splitlines()]
+
+
+def test_one_result_per_line_in_order(client):
+    body = "\n".join(json.dumps({**GOOD, "id": str(i)}) for i in range(3)).encode()
+    results = post(client, body)
+    assert [r["id"] for r in results] == ["0", "1", "2"]
+    assert all("eligible" in r and "line" not in r for r in results)
+
+
+def test_bad_lines_get_their_own_error_and_line_number(client):
+    lines = [
+        json.dumps(GOOD),
+        "{not json",
+        "",
+        "[1, 2]",
+        "5",
+        '"text"',
+        json.dumps({**GOOD, "id": "b", "annual_income": "lots"}),
+    ]
+    body = "\n".join(lines).encode() + b"\n\xff\xfe\n" + json.dumps({**GOOD, "id": "c"}).encode()
+    results = post(client, body)
+
+    assert results[0]["id"] == "a" and "eligible" in results[0]
+    assert results[1]["line"] == 2 and results[1]["error"].startswith("invalid JSON")
+    # The blank line 3 has no result but still counts
+    assert results[2] == {"id": None, "line": 4, "error": "expected a JSON object, got an array"}
+    assert results[3]["error"] == "expected a JSON object, got a number"
+    assert results[4] == {"id": None, "line": 6, "error": "expected a JSON object, got a string"}
+    assert results[5] == {"id": "b", "line": 7, "error": "invalid numeric input"}
+    assert results[6] == {"id": None, "line": 8, "error": "line is not valid UTF-8"}
+    assert results[7]["id"] == "c" and "eligible" in results[7]
+
+
+def test_batch_of_only_bad_lines(client, monkeypatch):
+    monkeypatch.setattr(eligibility, "BATCH_SIZE", 2)
+    results = post(client, b"x\ny\nz")
+    assert [r["line"] for r in results] == [1, 2, 3]
+    assert all(r["error"].startswith("invalid JSON") for r in results)
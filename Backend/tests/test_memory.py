@@ -0,0 +1,131 @@
+import asyncio
+
+from conftest import aturn, build_graph, history, turn
+
+from app.core.memory import SessionStore, session_key
+
+
+def store_for(backend, **kwargs):
+    kwargs.setdefault("shared", False)
+    return SessionStore(backend=backend, **kwargs)
+
+
+def checkpoints(store, thread_id: str) -> int:
+    return sum(len(cps) for cps in store.storage.get(thread_id, {}).values())
+
+
+def test_prune_keeps_latest_checkpoints(sqlite_backend):
+    store = store_for(sqlite_backend, max_checkpoints=2)
+    graph = build_graph(store)
+    for i in range(5):
+        turn(graph, "t1", f"m{i}")
+
+    assert checkpoints(store, "t1") == 2
+    assert history(graph, "t1") == [x for i in range(5) for x in (f"m{i}", f"reply {2 * i + 1}")]
+    stats = store.stats()
+    assert stats["pruned_checkpoints"] > 0
+    assert stats["pruned_blobs"] > 0
+    # Only blobs referenced by the kept checkpoints stay resident
+    kept = {(ns, ch, v) for ns, cps in store.storage["t1"].items() for cp in cps.values()
+            for ch, v in store.serde.loads_typed(cp[0])["channel_versions"].items()}
+    assert {key[1:] for key in store.blobs if key[0] == "t1"} <= kept
+
+
+def test_sweep_hibernates_idle_sessions_and_rehydrates(sqlite_backend):
+    store = store_for(sqlite_backend, idle_ttl=0)
+    graph = build_graph(store)
+    turn(graph, "t1", "hello")
+    turn(graph, "t2", "hi")
+
+    assert store.sweep() == 2
+    assert not store.storage.get("t1") and not store.blobs
+    assert sqlite_backend.get(session_key("t1")) is not None
+    assert store.stats()["hibernated_sessions"] == 2
+
+    turn(graph, "t1", "again")
+    assert history(graph, "t1") == ["hello", "reply 1", "again", "reply 3"]
+    assert store.stats()["rehydrations"] == 1
+    # A single worker owns the rehydrated copy: the stored one is dropped
+    assert sqlite_backend.get(session_key("t1")) is None
+    assert sqlite_backend.get(session_key("t2")) is not None
+
+
+def test_capacity_eviction_async(sqlite_backend):
+    store = store_for(sqlite_backend, max_sessions=2)
+    graph = build_graph(store)
+
+    async def main():
+        for thread_id in ("t1", "t2", "t3"):
+            await aturn(graph, thread_id, f"hello {thread_id}")
+        assert list(store._last_access) == ["t2", "t3"]
+        assert sqlite_backend.get(session_key("t1")) is not None
+        await aturn(graph, "t1", "back")
+
+    asyncio.run(main())
+    assert history(graph, "t1") == ["hello t1", "reply 1", "back", "reply 3"]
+    stats = store.stats()
+    assert stats["evictions_capacity"] >= 2
+    assert stats["resident_sessions"] == 2
+    assert stats["pending_writes"] == 0
+
+
+def test_access_before_write_back_uses_detached_copy(sqlite_backend):
+    store = store_for(sqlite_backend)
+    graph = build_graph(store)
+    turn(graph, "t1", "hello")
+
+    with store._lock:
+        store._detach("t1")
+    assert store.stats()["pending_writes"] == 1
+    # Taken back from _hibernating, not from the (empty) backend
+    assert history(graph, "t1") == ["hello", "reply 1"]
+    store._write_back(["t1"])
+    assert sqlite_backend.get(session_key("t1")) is None
+    assert store.stats()["pending_writes"] == 0
+
+
+def test_release_writes_session_and_subgraph_threads(sqlite_backend):
+    store = store_for(sqlite_backend)
+    graph = build_graph(store)
+    turn(graph, "t1", "hello")
+    turn(graph, "t1:account", "sub")
+    turn(graph, "t10", "other")
+
+    store.release("t1")
+    assert sqlite_backend.get(session_key("t1")) is not None
+    assert sqlite_backend.get(session_key("t1:account")) is not None
+    assert sqlite_backend.get(session_key("t10")) is None
+    assert list(store._last_access) == ["t10"]
+
+
+def test_shared_sessions_move_between_workers(sqlite_backend):
+    worker_a = build_graph(store_for(sqlite_backend, shared=True))
+    worker_b = build_graph(store_for(sqlite_backend, shared=True))
+
+    async def on(graph, text):
+        async with graph.checkpointer.hold("t1"):
+            await aturn(graph, "t1", text)
+
+    async def main():
+        await on(worker_a, "one")
+        await on(worker_b, "two")
+        await on(worker_a, "three")
+
+    asyncio.run(main())
+    # Each turn saw the other worker's writes; nothing stays resident after a turn
+    assert not worker_a.checkpointer._last_access and not worker_b.checkpointer._last_access
+    assert history(worker_b, "t1") == ["one", "reply 1", "two", "reply 3", "three", "reply 5"]
+
+
+def test_delete_thread_removes_resident_and_stored_copies(sqlite_backend):
+    store = store_for(sqlite_backend, idle_ttl=0)
+    graph = build_graph(store)
+    turn(graph, "t1", "hello")
+    store.sweep()
+    turn(graph, "t2", "hi")
+
+    asyncio.run(store.adelete_thread("t1"))
+    store.delete_thread("t2")
+    assert sqlite_backend.count("session:") == (0, 0)
+    assert checkpoints(store, "t2") == 0 and not store.blobs
+    assert history(graph, "t1") == [] and history(graph, "t2") == []
@@ -0,0 +1,44 @@
+from langchain_core.messages import AIMessage
+from langchain_core.tools import tool
+
+import app.agents.prompts as prompts
+from app.agents.prompts import PromptStats
+
+
+@tool
+def lookup(zip_code: str) -> str:
+    """Looks up a ZIP code."""
+    return zip_code
+
+
+def no_tokenizing(text):
+    raise AssertionError("stats() tokenized on the caller's thread")
+
+
+def test_stats_reads_the_prefixes_counted_at_warm_up(monkeypatch):
+    stats = PromptStats("system prompt " * 300, phases={"fast": ("m1", [lookup]), "strong": ("m2", [])})
+    stats.warm_up()
+    monkeypatch.setattr(prompts, "count_tokens", no_tokenizing)
+
+    stats.record(AIMessage(content="", usage_metadata={
+        "input_tokens": 2000, "output_tokens": 10, "total_tokens": 2010,
+        "input_token_details": {"cache_read": 1024}}), "fast")
+    result = stats.stats()
+    assert result["calls"] == 1 and result["cached_ratio"] == 0.512
+    assert result["distinct_prefixes"] == 2
+    fast, strong = result["phases"]["fast"], result["phases"]["strong"]
+    assert fast["tools"] == 1 and fast["prefix_tokens"] > strong["prefix_tokens"]
+    assert fast["cache_eligible_prefix_tokens"] % 128 == 0
+
+
+def test_tier_stats_count_schemas_when_the_tiers_are_built(monkeypatch):
+    import app.agents.model_router as model_router
+
+    stats = model_router.TierStats()
+    stats.register_tools("loan", "collection", [lookup])
+    stats.register_tools("loan", "verification", [])
+    monkeypatch.setattr(model_router, "count_tokens", no_tokenizing)
+
+    bound = stats.stats()["bound_tools"]
+    assert bound["loan/collection"]["tools"] == 1 and bound["loan/collection"]["schema_tokens"] > 0
+    assert bound["loan/verification"] == {"tools": 0, "schema_tokens": 0}
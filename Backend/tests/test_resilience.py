@@ -0,0 +1,221 @@
+import asyncio
+import time
+from collections import deque
+
+import pytest
+from langchain_core.messages import AIMessage
+
+from app.core.resilience import CircuitBreaker, LLMGuard, is_fallback, is_retryable, start_turn
+
+
+class StatusError(Exception):
+    def __init__(self, status_code, retry_after=None):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+        if retry_after is not None:
+            self.response = type("Response", (), {"headers": {"retry-after": str(retry_after)}})()
+
+
+class FakeLLM:
+    """Plays one scripted outcome per call: an exception, a delay in seconds, or a reply."""
+
+    def __init__(self, *script):
+        self.script = list(script)
+        self.configs = []
+        self.cancelled = 0
+
+    async def ainvoke(self, messages, config=None):
+        self.configs.append(config)
+        step = self.script.pop(0) if self.script else "ok"
+        if isinstance(step, Exception):
+            raise step
+        if isinstance(step, float):
+            try:
+                await asyncio.sleep(step)
+            except asyncio.CancelledError:
+                self.cancelled += 1
+                raise
+            return AIMessage(content=f"slow {step}")
+        return AIMessage(content=step)
+
+
+def guard(**kwargs) -> LLMGuard:
+    options = {"enabled": True, "hedge": False, "max_retries": 2, "retry_base_ms": 1, "retry_max_ms": 5}
+    return LLMGuard(**{**options, **kwargs})
+
+
+def call(guard, llm, budget: float = 5.0):
+    async def main():
+        start_turn(budget)
+        return await guard.ainvoke(llm, [], "m")
+    return asyncio.run(main())
+
+
+def test_is_retryable():
+    assert is_retryable(StatusError(429)) and is_retryable(StatusError(503))
+    assert not is_retryable(StatusError(400))
+
+
+# --- circuit breaker ---
+
+def test_breaker_opens_half_opens_and_closes():
+    breaker = CircuitBreaker(failures=2, cooldown=0.05)
+    breaker.record_failure()
+    assert breaker.allow() and not breaker.open
+    breaker.record_failure()
+    assert breaker.open and not breaker.allow()
+    assert breaker.stats()["state"] == "open" and breaker.stats()["opened"] == 1
+
+    time.sleep(0.06)
+    assert breaker.allow()          # the one trial call
+    assert not breaker.allow()
+    breaker.record_failure()        # trial failed: another cooldown
+    assert breaker.open and not breaker.allow()
+    assert breaker.stats()["opened"] == 1
+
+    time.sleep(0.06)
+    assert breaker.allow()
+    breaker.record_success()
+    assert not breaker.open and breaker.allow()
+    assert breaker.stats() == {"state": "closed", "consecutive_failures": 0, "opened": 1, "retry_in_s": 0.0}
+
+
+def test_success_resets_the_failure_streak():
+    breaker = CircuitBreaker(failures=2, cooldown=60)
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert not breaker.open
+
+
+# --- retries ---
+
+def test_retryable_errors_are_retried():
+    g = guard()
+    llm = FakeLLM(StatusError(503), StatusError(429), "done")
+    response = call(g, llm)
+    assert response.content == "done" and not is_fallback(response)
+    assert g.counts["retried"] == 2
+    assert g.breakers["m"].consecutive == 0
+
+
+def test_exhausted_retries_return_the_fallback():
+    g = guard()
+    g.breakers["m"] = CircuitBreaker(failures=2, cooldown=60)
+    llm = FakeLLM(*[StatusError(500)] * 6)
+
+    first = call(g, llm)
+    assert is_fallback(first) and first.response_metadata["fallback"] == "error"
+    assert len(llm.configs) == 3            # one call + max_retries
+    assert g.counts["failed"] == 1 and not g.breakers["m"].open
+
+    call(g, llm)
+    assert g.breakers["m"].open
+    # Open: answered at once, the provider isn't called
+    short = call(g, llm)
+    assert short.response_metadata["fallback"] == "breaker_open"
+    assert len(llm.configs) == 6 and g.counts["short_circuited"] == 1
+    assert g.counts["fallback"] == 3
+
+
+def test_bad_request_is_raised_not_retried():
+    g = guard()
+    llm = FakeLLM(StatusError(400))
+    with pytest.raises(StatusError):
+        call(g, llm)
+    assert len(llm.configs) == 1
+    assert g.counts["retried"] == 0 and g.breakers["m"].consecutive == 0
+
+
+def test_retry_honours_retry_after_within_the_deadline():
+    g = guard()
+    llm = FakeLLM(StatusError(429, retry_after=30), "done")
+    response = call(g, llm, budget=1)
+    # Waiting 30s would overrun the turn: give up without sleeping
+    assert response.response_metadata["fallback"] == "error"
+    assert len(llm.configs) == 1 and g.counts["retried"] == 0
+
+
+# --- deadline ---
+
+def test_slow_call_times_out_at_the_turn_deadline():
+    g = guard()
+    llm = FakeLLM(5.0)
+    started = time.monotonic()
+    response = call(g, llm, budget=0.05)
+    assert response.response_metadata["fallback"] == "timeout"
+    assert time.monotonic() - started < 1
+    assert llm.cancelled == 1 and g.breakers["m"].consecutive == 1
+
+
+def test_spent_deadline_skips_the_call():
+    g = guard()
+    llm = FakeLLM()
+    response = call(g, llm, budget=0)
+    assert response.response_metadata["fallback"] == "deadline"
+    assert llm.configs == []
+
+
+# --- hedging ---
+
+def hedging_guard() -> LLMGuard:
+    g = guard(hedge=True, hedge_quantile=0.5, hedge_min_delay_ms=10, hedge_min_samples=3)
+    g.latencies["m"] = deque([0.01] * 3)
+    return g
+
+
+def test_no_hedge_until_enough_samples():
+    g = hedging_guard()
+    g.latencies["m"].pop()
+    assert g.hedge_delay("m") is None
+    assert hedging_guard().hedge_delay("m") == pytest.approx(0.01)
+
+
+def test_slow_primary_is_hedged_and_loses():
+    g = hedging_guard()
+    llm = FakeLLM(1.0, "fast")
+    response = call(g, llm)
+    assert response.content == "fast"
+    assert g.counts["hedged"] == 1 and g.counts["hedge_won"] == 1
+    assert llm.cancelled == 1
+    # The duplicate runs without the turn's callbacks
+    assert llm.configs == [None, {"callbacks": []}]
+
+
+def test_primary_that_finishes_first_wins():
+    g = hedging_guard()
+    llm = FakeLLM(0.05, 1.0)
+    response = call(g, llm)
+    assert response.content == "slow 0.05"
+    assert g.counts["hedged"] == 1 and g.counts["hedge_won"] == 0
+    assert llm.cancelled == 1
+
+
+def test_failed_hedge_falls_back_to_the_primary():
+    g = hedging_guard()
+    g.max_retries = 0
+    llm = FakeLLM(0.05, StatusError(500))
+    assert call(g, llm).content == "slow 0.05"
+
+
+def test_both_failing_return_the_fallback():
+    g = hedging_guard()
+    g.max_retries = 0
+
+    class Failing(FakeLLM):
+        async def ainvoke(self, messages, config=None):
+            self.configs.append(config)
+            await asyncio.sleep(0.03 if config is None else 0.0)
+            raise StatusError(502)
+
+    response = call(g, Failing())
+    assert response.response_metadata["fallback"] == "error"
+    assert g.counts["hedged"] == 1 and g.counts["failed"] == 1
+
+
+def test_disabled_guard_calls_through():
+    g = guard(enabled=False)
+    with pytest.raises(StatusError):
+        call(g, FakeLLM(StatusError(503)))
+    assert g.client_retries == 2 and guard().client_retries == 0
+    assert not g.counts
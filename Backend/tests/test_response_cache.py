@@ -0,0 +1,82 @@
+from app.core.response_cache import ResponseCache, faq_intent
+
+DOCUMENTS = "For a refinance you need identity proof, address proof and your current loan statement."
+
+
+def user(name: str, **extra) -> dict:
+    return {
+        "is_verified": True, "account_exists": True, "required_fields": ["full_name", "annual_income"],
+        "user_account": {"name": name, "email": f"{name.lower()}@example.com", "customer_id": f"C-{name}"},
+        "bank_agent": {"name": "Priya Agent"},
+        **extra,
+    }
+
+
+def test_faq_intents():
+    assert faq_intent("What documents do I need for a refinance?") == "documents"
+    assert faq_intent("How does the application process work?") == "process"
+    for question in (
+        "What is the maximum I can borrow?",
+        "what's the maximum I can borrow?",
+        "What did I say my annual income was?",
+        "Am I eligible for a home loan?",
+        "What are my options?",
+        "How much can I afford?",
+        "What is the status of my application?",
+        "Can you tell me the weather?",
+        "documents",
+    ):
+        assert faq_intent(question) is None, question
+
+
+def test_conversation_dependent_answers_are_never_shared():
+    cache = ResponseCache()
+    alice, bob = user("Alice"), user("Bob")
+
+    assert not cache.put(alice, "What is the maximum I can borrow?",
+                         "Your disposable income is $4,200 a month, so you can borrow up to $180,000.")
+    assert not cache.put(alice, "What did I say my annual income was?", "You said your annual income was high.")
+    assert cache.get(bob, "what's the maximum I can borrow?") is None
+    assert cache.get(bob, "What did I say my annual income was?") is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_answers_with_figures_or_state_values_are_refused():
+    cache = ResponseCache()
+    alice = user("Alice", pending_mobile="9876543210")
+    question = "What documents do I need for a refinance?"
+
+    assert not cache.put(alice, question, "You need 3 months of bank statements.")
+    assert not cache.put(alice, question, "Loans start at $5k.")
+    assert not cache.put(alice, question, "Alice, you need identity proof.")
+    assert not cache.put(alice, question, "Priya will collect your identity proof.")
+    assert not cache.put(alice, question, "Your customer id c-alice is all you need.")
+    assert not cache.put(alice, question, "Write to help@bank.example for the list.")
+    assert cache.stats()["rejected_figures"] == 2
+    assert cache.stats()["rejected_personal_data"] == 4
+    assert cache.get(user("Bob"), question) is None
+
+
+def test_general_answer_is_shared_within_a_phase_only():
+    cache = ResponseCache()
+    question = "What documents do I need for a refinance?"
+    assert cache.put(user("Alice"), question, DOCUMENTS)
+
+    assert cache.get(user("Bob"), "what documents do i need for a refinance") == DOCUMENTS
+    # Fuzzy match within the same intent
+    assert cache.get(user("Bob"), "Which documents are needed for a refinance?") == DOCUMENTS
+    for state in (
+        user("Bob", is_verified=False),
+        user("Bob", employment_type="Self Employed"),
+        user("Bob", eligibility_pending=True),
+        user("Bob", history_summary="Asked about a home loan."),
+        user("Bob", required_fields=["full_name"]),
+    ):
+        assert cache.get(state, question) is None, state
+
+
+def test_fuzzy_match_stays_within_the_intent():
+    cache = ResponseCache(similarity=0.3)
+    assert cache.put(user("Alice"), "What documents are required for a refinance?", DOCUMENTS)
+    # "refinance" overlaps, but it is a different intent
+    assert cache.get(user("Bob"), "Why should I refinance?") is None
@@ -0,0 +1,98 @@
+import asyncio
+from contextlib import asynccontextmanager
+
+import pytest
+
+import app.api.chat as chat
+
+
+class FakeCheckpointer:
+    """Stands in for SessionStore.hold(); fails the next `fail` lock attempts."""
+
+    def __init__(self, fail: int = 0):
+        self.fail = fail
+        self.held = []
+
+    @asynccontextmanager
+    async def hold(self, thread_id):
+        if self.fail:
+            self.fail -= 1
+            raise TimeoutError(f"state lock 'session:{thread_id}' is busy")
+        self.held.append(thread_id)
+        yield
+
+
+@pytest.fixture
+def queue(monkeypatch):
+    queue = chat.SessionQueue()
+    turns = []
+
+    async def run_turn(thread_id, texts):
+        turns.append(texts)
+        await asyncio.sleep(0.01)
+        if "boom" in texts:
+            raise ValueError("graph failed")
+        return " + ".join(texts)
+
+    monkeypatch.setattr(queue, "_run_turn", run_turn)
+    queue.turns_run = turns
+    return queue
+
+
+def test_burst_is_one_turn(queue, monkeypatch):
+    monkeypatch.setattr(chat, "checkpointer", FakeCheckpointer())
+
+    async def main():
+        first = asyncio.ensure_future(queue.submit("t1", "a"))
+        await asyncio.sleep(0.001)
+        rest = [asyncio.ensure_future(queue.submit("t1", text)) for text in ("b", "c")]
+        return await asyncio.gather(first, *rest)
+
+    assert asyncio.run(main()) == ["a", "b + c", "b + c"]
+    assert queue.turns_run == [["a"], ["b", "c"]]
+    assert not queue.sessions and not queue.locks
+
+
+def test_turn_error_fails_its_batch_only(queue, monkeypatch):
+    monkeypatch.setattr(chat, "checkpointer", FakeCheckpointer())
+
+    async def main():
+        failed = asyncio.ensure_future(queue.submit("t1", "boom"))
+        await asyncio.sleep(0.001)
+        ok = asyncio.ensure_future(queue.submit("t1", "next"))
+        return await asyncio.gather(failed, ok, return_exceptions=True)
+
+    failed, ok = asyncio.run(main())
+    assert isinstance(failed, ValueError) and ok == "next"
+
+
+def test_lock_error_fails_pending_callers_and_recovers(queue, monkeypatch):
+    checkpointer = FakeCheckpointer(fail=1)
+    monkeypatch.setattr(chat, "checkpointer", checkpointer)
+
+    async def main():
+        burst = [asyncio.ensure_future(queue.submit("t1", text)) for text in ("a", "b")]
+        results = await asyncio.wait_for(asyncio.gather(*burst, return_exceptions=True), 1)
+        # Nothing is left behind: the next message starts a fresh drain
+        assert not queue.sessions and not queue.locks
+        return results, await asyncio.wait_for(queue.submit("t1", "c"), 1)
+
+    (a, b), c = asyncio.run(main())
+    assert isinstance(a, TimeoutError) and isinstance(b, TimeoutError)
+    assert c == "c"
+    assert queue.turns_run == [["c"]]
+    assert checkpointer.held == ["t1"]
+
+
+def test_drain_tasks_are_referenced_until_done(queue, monkeypatch):
+    monkeypatch.setattr(chat, "checkpointer", FakeCheckpointer())
+
+    async def main():
+        turn = asyncio.ensure_future(queue.submit("t1", "a"))
+        await asyncio.sleep(0)
+        assert len(queue.tasks) == 1
+        assert await turn == "a"
+        await asyncio.sleep(0)
+        assert not queue.tasks
+
+    asyncio.run(main())
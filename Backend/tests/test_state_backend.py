@@ -0,0 +1,206 @@
+import asyncio
+import io
+import socket
+import time
+
+import pytest
+
+from app.core.state_backend import (
+    RedisError, RedisStateBackend, SQLiteStateBackend, StateBackend, encode_command, read_reply,
+)
+from benchmarks.fake_redis import serve
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture(scope="module")
+def redis_url():
+    with serve(free_port()) as url:
+        yield url
+
+
+@pytest.fixture(params=["sqlite", "redis"])
+def backend(request, tmp_path):
+    if request.param == "sqlite":
+        backend = SQLiteStateBackend(str(tmp_path / "state.db"))
+    else:
+        backend = RedisStateBackend(request.getfixturevalue("redis_url"), pool_size=4)
+        backend.execute("FLUSHDB")
+    yield backend
+    backend.close()
+
+
+# --- RESP encoding ---
+
+def test_encode_command():
+    assert encode_command(("SET", "k", b"v\r\n", 5, 1.5)) == (
+        b"*5\r\n$3\r\nSET\r\n$1\r\nk\r\n$3\r\nv\r\n\r\n$1\r\n5\r\n$3\r\n1.5\r\n")
+
+
+def test_read_reply():
+    def reply(data: bytes):
+        return read_reply(io.BytesIO(data))
+
+    assert reply(b"+OK\r\n") == "OK"
+    assert reply(b":42\r\n") == 42
+    assert reply(b"$5\r\na\r\nbc\r\n") == b"a\r\nbc"
+    assert reply(b"$-1\r\n") is None
+    assert reply(b"*2\r\n$1\r\n0\r\n*1\r\n$3\r\nkey\r\n") == [b"0", [b"key"]]
+    assert reply(b"*-1\r\n") is None
+    with pytest.raises(RedisError, match="WRONGTYPE"):
+        reply(b"-WRONGTYPE bad\r\n")
+    with pytest.raises(ConnectionError):
+        reply(b"")
+    with pytest.raises(RedisError, match="unexpected reply"):
+        reply(b"?what\r\n")
+
+
+def test_redis_error_keeps_the_connection(redis_url):
+    backend = RedisStateBackend(redis_url, pool_size=1)
+    backend.set("k", b"v")
+    conn = backend._pool.queue[0]
+    with pytest.raises(RedisError, match="unknown command"):
+        backend.execute("NOPE")
+    assert backend._pool.queue == [conn]
+    assert backend.get("k") == b"v"
+    backend.close()
+
+
+def test_broken_connection_is_dropped(redis_url):
+    backend = RedisStateBackend(redis_url, pool_size=1)
+    backend.set("k", b"v")
+    backend._pool.queue[0][0].shutdown(socket.SHUT_RDWR)
+    with pytest.raises(OSError):        # ConnectionError / BrokenPipeError
+        backend.get("k")
+    assert backend._pool.empty()
+    # The next call opens a fresh connection
+    assert backend.get("k") == b"v"
+    backend.close()
+
+
+# --- key/value API, both backends ---
+
+def test_get_set_delete(backend):
+    assert backend.get("a") is None
+    backend.set("a", b"1")
+    backend.set("a", b"2")
+    assert backend.get("a") == b"2"
+    backend.delete("a")
+    backend.delete("a")
+    assert backend.get("a") is None
+
+
+def test_ttl_expiry(backend):
+    backend.set("short", b"x", ttl=0.05)
+    backend.set("long", b"y", ttl=60)
+    time.sleep(0.1)
+    assert backend.get("short") is None
+    assert backend.get("long") == b"y"
+
+
+def test_set_if_absent(backend):
+    assert backend.set_if_absent("k", b"first", ttl=60)
+    assert not backend.set_if_absent("k", b"second", ttl=60)
+    assert backend.get("k") == b"first"
+    # An expired holder can be replaced
+    assert backend.set_if_absent("gone", b"old", ttl=0.05)
+    time.sleep(0.1)
+    assert backend.set_if_absent("gone", b"new", ttl=60)
+    assert backend.get("gone") == b"new"
+
+
+def test_delete_if_equals(backend):
+    backend.set("otp:1", b"123456", ttl=60)
+    assert not backend.delete_if_equals("otp:1", b"000000")
+    assert backend.get("otp:1") == b"123456"
+    assert backend.delete_if_equals("otp:1", b"123456")
+    assert backend.get("otp:1") is None
+    # Only one of two racing callers wins
+    assert not backend.delete_if_equals("otp:1", b"123456")
+    assert not backend.delete_if_equals("missing", b"x")
+    backend.set("otp:2", b"654321", ttl=0.05)
+    time.sleep(0.1)
+    assert not backend.delete_if_equals("otp:2", b"654321")
+
+
+def test_count(backend):
+    backend.set("session:a", b"12345")
+    backend.set("session:b", b"67")
+    backend.set("otp:c", b"0")
+    keys, size = backend.count("session:")
+    assert keys == 2
+    assert size in (7, None)        # Redis doesn't report sizes
+
+
+def test_sqlite_sweep(sqlite_backend):
+    sqlite_backend.set("a", b"1", ttl=0.05)
+    sqlite_backend.set("b", b"2")
+    time.sleep(0.1)
+    assert sqlite_backend.sweep() == 1
+    assert sqlite_backend.count("") == (1, 1)
+
+
+def test_backends_implement_the_whole_api():
+    class Partial(StateBackend):
+        def get(self, key):
+            return None
+
+    with pytest.raises(TypeError, match="abstract"):
+        Partial()
+
+
+# --- locks ---
+
+def test_lock_is_exclusive(backend):
+    events = []
+
+    async def holder(name):
+        async with backend.lock("s1", ttl=5):
+            events.append(f"{name} in")
+            await asyncio.sleep(0.05)
+            events.append(f"{name} out")
+
+    async def main():
+        await asyncio.gather(holder("a"), holder("b"))
+
+    asyncio.run(main())
+    assert events in (["a in", "a out", "b in", "b out"], ["b in", "b out", "a in", "a out"])
+    assert backend.get("lock:s1") is None
+
+
+def test_lock_timeout(backend):
+    async def main():
+        async with backend.lock("s1", ttl=5):
+            with pytest.raises(TimeoutError, match="busy"):
+                async with backend.lock("s1", ttl=5, timeout=0.05):
+                    pass
+            # Still held by the first owner
+            assert backend.get("lock:s1") is not None
+
+    asyncio.run(main())
+
+
+def test_lock_released_on_error(backend):
+    async def main():
+        with pytest.raises(ValueError):
+            async with backend.lock("s1", ttl=5):
+                raise ValueError("turn failed")
+        async with backend.lock("s1", ttl=5, timeout=0.05):
+            pass
+
+    asyncio.run(main())
+
+
+def test_expired_lock_is_taken_over(backend):
+    async def main():
+        async with backend.lock("s1", ttl=0.05):
+            await asyncio.sleep(0.1)
+            # Past its ttl: another worker gets it, and the late release leaves it alone
+            backend.set_if_absent("lock:s1", b"other", ttl=5)
+        assert backend.get("lock:s1") == b"other"
+
+    asyncio.run(main())
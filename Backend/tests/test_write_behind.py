@@ -0,0 +1,178 @@
+import asyncio
+import json
+
+import pytest
+
+import app.db.models as models
+import app.db.write_behind as write_behind
+from app.db.session import ConnectionPool
+from app.db.write_behind import LoanWriter
+
+
+@pytest.fixture
+def db(monkeypatch):
+    """A fresh loans.db in the test's directory, behind its own connection pool."""
+    models.init_db()
+    pool = ConnectionPool(size=2)
+    monkeypatch.setattr(models, "pool", pool)
+    yield pool
+    pool.close()
+
+
+@pytest.fixture
+def inserts(db, monkeypatch):
+    """Records every insert_loans call; rows for user "bad" fail."""
+    calls = []
+
+    async def insert_loans(rows):
+        calls.append([row[0] for row in rows])
+        if any(row[1] == "bad" for row in rows):
+            raise ValueError("constraint failed")
+        return await models.insert_loans(rows)
+
+    monkeypatch.setattr(write_behind, "insert_loans", insert_loans)
+    return calls
+
+
+def stored(db) -> list[tuple]:
+    async def rows():
+        return await db.run(lambda conn: conn.execute(
+            "SELECT id, user_id, details FROM loan_applications ORDER BY seq").fetchall())
+    return asyncio.run(rows())
+
+
+def test_concurrent_submissions_are_group_committed(db, inserts):
+    writer = LoanWriter(batch_size=8, max_delay_ms=50, durable=False, id_block=5)
+
+    async def main():
+        ids = await asyncio.gather(*(writer.submit(f"u{i}", {"n": i}) for i in range(20)))
+        await writer.flush()
+        return ids
+
+    ids = asyncio.run(main())
+    assert len(set(ids)) == 20
+    assert sorted(i for batch in inserts for i in batch) == sorted(ids)
+    assert all(len(batch) <= 8 for batch in inserts)
+    assert len(inserts) < 20
+    stats = writer.stats()
+    assert stats["committed"] == 20 and stats["failed"] == 0 and stats["pending"] == 0
+    assert stats["batches"] == len(inserts) and stats["max_batch"] == max(map(len, inserts))
+    # Details are stored as JSON objects
+    assert json.loads(stored(db)[0][2]) == {"n": 0}
+
+
+def test_ids_come_in_blocks(db, monkeypatch):
+    allocations = []
+
+    async def allocate_loan_ids(count):
+        allocations.append(count)
+        return await models.allocate_loan_ids(count)
+
+    monkeypatch.setattr(write_behind, "allocate_loan_ids", allocate_loan_ids)
+    writer = LoanWriter(batch_size=8, max_delay_ms=1, durable=True, id_block=4)
+
+    async def main():
+        return [await writer.submit("u1", "text") for _ in range(9)]
+
+    ids = asyncio.run(main())
+    assert allocations == [4, 4, 4]
+    assert ids == list(range(ids[0], ids[0] + 9))
+    assert json.loads(stored(db)[0][2]) == {"text": "text"}
+
+
+def test_durable_submit_waits_for_commit_and_raises_on_failure(db, inserts):
+    writer = LoanWriter(batch_size=8, max_delay_ms=50, durable=True)
+
+    async def main():
+        return await asyncio.gather(writer.submit("u1", {}), writer.submit("bad", {}), writer.submit("u2", {}),
+                                    return_exceptions=True)
+
+    ok1, failed, ok2 = asyncio.run(main())
+    assert isinstance(failed, ValueError)
+    # The failed batch was retried row by row: the good rows still made it
+    assert [row[1] for row in stored(db)] == ["u1", "u2"]
+    assert {ok1, ok2} == {row[0] for row in stored(db)}
+    stats = writer.stats()
+    assert stats["committed"] == 2 and stats["failed"] == 1
+
+
+def test_non_durable_failure_is_counted_not_raised(db, inserts):
+    writer = LoanWriter(batch_size=8, max_delay_ms=1, durable=False)
+
+    async def main():
+        loan_id = await writer.submit("bad", {})
+        await writer.flush()
+        return loan_id
+
+    assert isinstance(asyncio.run(main()), int)
+    assert stored(db) == []
+    assert writer.stats()["failed"] == 1
+
+
+def test_per_call_durable_overrides_default(db, inserts):
+    writer = LoanWriter(batch_size=8, max_delay_ms=1, durable=False)
+
+    async def main():
+        with pytest.raises(ValueError):
+            await writer.submit("bad", {}, durable=True)
+
+    asyncio.run(main())
+
+
+def test_close_drains_the_queue_and_stops_intake(db, inserts):
+    writer = LoanWriter(batch_size=3, max_delay_ms=10_000, durable=False)
+
+    async def main():
+        for i in range(7):
+            await writer.submit(f"u{i}", {})
+        assert writer.stats()["committed"] < 7
+        await writer.close()
+        with pytest.raises(RuntimeError, match="shut down"):
+            await writer.submit("late", {})
+
+    asyncio.run(main())
+    assert [row[1] for row in stored(db)] == [f"u{i}" for i in range(7)]
+    assert writer.stats()["pending"] == 0
+
+
+def test_listing_and_export_follow_commit_order(db):
+    async def main():
+        # Ids reserved out of order (two workers' blocks), committed low id last
+        await models.insert_loans([(200, "u1", "{}", "SUBMITTED"), (201, "u1", "{}", "SUBMITTED")])
+        await models.insert_loans([(100, "u1", "{}", "SUBMITTED")])
+        page = await models.get_loan_page("u1", limit=2)
+        rest = await models.get_loan_page("u1", cursor=page["next_cursor"], limit=2)
+        exported = [row[0] for rows in [r async for r in models.iter_loans(chunk_size=1)] for row in rows]
+        return page, rest, exported
+
+    page, rest, exported = asyncio.run(main())
+    assert [loan["loan_id"] for loan in page["loans"]] == ["sub0000100", "sub0000201"]
+    assert [loan["loan_id"] for loan in rest["loans"]] == ["sub0000200"] and rest["next_cursor"] is None
+    assert exported == [200, 201, 100]
+
+
+def test_durable_by_default():
+    assert LoanWriter().durable
+
+
+def test_commit_crash_keeps_the_writer_alive(db, monkeypatch):
+    writer = LoanWriter(batch_size=8, max_delay_ms=1, durable=True)
+    crashes = [RuntimeError("cannot schedule new futures after shutdown")]
+
+    async def commit(batch):
+        if crashes:
+            raise crashes.pop()
+        return await LoanWriter._commit(writer, batch)
+
+    monkeypatch.setattr(writer, "_commit", commit)
+
+    async def main():
+        with pytest.raises(RuntimeError, match="shutdown"):
+            await asyncio.wait_for(writer.submit("u1", {}), 1)
+        # Still running: the next submission commits and close() doesn't hang
+        await writer.submit("u2", {})
+        await asyncio.wait_for(writer.close(), 1)
+
+    asyncio.run(main())
+    assert [row[1] for row in stored(db)] == ["u2"]
+    assert writer.stats()["failed"] == 1 and writer.stats()["committed"] == 1